@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from common import dump_json, ensure_dir, utc_now_iso
+
+
+# Content-addressed store for derived datasets shared across research runs:
+#   root/objects/<key[:2]>/<key>/{manifest.json, ...files}
+# key = sha256 over (kind, params, input fingerprint, code version), so an entry never goes stale;
+# changed inputs or code simply hash to a new key. manifest.json's mtime is the LRU clock.
+MANIFEST_FILE = "manifest.json"
+DEFAULT_MAX_GB = 20.0
+
+
+def canonical_json(payload: Any) -> str:
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def code_version(*paths: Path) -> str:
+    # Digest of the source files that produce an artifact; editing any of them invalidates it.
+    h = hashlib.sha256()
+    for path in sorted(Path(p) for p in paths):
+        h.update(path.name.encode("utf-8"))
+        h.update(path.read_bytes())
+    return h.hexdigest()[:16]
+
+
+def artifact_key(kind: str, params: Dict[str, Any], inputs: Dict[str, Any], code: str) -> str:
+    raw = canonical_json({"kind": kind, "params": params, "inputs": inputs, "code": code})
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def dir_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+class ArtifactCache:
+    def __init__(self, root: Path, max_bytes: Optional[int] = None) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+
+    def entry_dir(self, key: str) -> Path:
+        return self.root / "objects" / key[:2] / key
+
+    def get(self, key: str) -> Optional[Path]:
+        entry = self.entry_dir(key)
+        manifest = entry / MANIFEST_FILE
+        if not manifest.exists():
+            return None
+        os.utime(manifest)
+        return entry
+
+    def put(self, key: str, kind: str, build: Callable[[Path], Dict[str, Any]]) -> Path:
+        # build(tmp_dir) writes the artifact files and returns extra manifest fields. The entry
+        # appears atomically. Two writers of the same key can both get past entry.exists(); the
+        # loser's rename then fails on the non-empty entry dir, and its identical copy is dropped.
+        entry = self.entry_dir(key)
+        tmp = entry.with_name(f"{key}.tmp{os.getpid()}")
+        if tmp.exists():
+            shutil.rmtree(tmp)
+        ensure_dir(tmp)
+        try:
+            meta = build(tmp) or {}
+            dump_json(
+                tmp / MANIFEST_FILE,
+                {"key": key, "kind": kind, "created_at": utc_now_iso(), "size_bytes": dir_size(tmp), **meta},
+            )
+            if not entry.exists():
+                try:
+                    os.replace(tmp, entry)
+                except OSError:
+                    if not (entry / MANIFEST_FILE).exists():
+                        raise
+        finally:
+            if tmp.exists():
+                shutil.rmtree(tmp)
+        if self.max_bytes is not None:
+            self.gc(self.max_bytes, keep=(key,))
+        return entry
+
+    def get_or_build(self, key: str, kind: str, build: Callable[[Path], Dict[str, Any]]) -> Tuple[Path, bool]:
+        # Returns (entry dir, hit).
+        entry = self.get(key)
+        if entry is not None:
+            return entry, True
+        return self.put(key, kind, build), False
+
+    def entries(self) -> List[Dict[str, Any]]:
+        out: List[Dict[str, Any]] = []
+        objects = self.root / "objects"
+        if not objects.exists():
+            return out
+        for manifest in objects.glob(f"*/*/{MANIFEST_FILE}"):
+            try:
+                meta = json.loads(manifest.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            meta["path"] = str(manifest.parent)
+            meta["last_used"] = manifest.stat().st_mtime
+            out.append(meta)
+        return sorted(out, key=lambda m: m["last_used"], reverse=True)
+
+    def gc(self, max_bytes: int, keep: Iterable[str] = ()) -> Tuple[int, int]:
+        # Evicts least recently used entries until the total fits max_bytes. Leftover temp dirs
+        # from interrupted writers older than an hour are removed too. Returns (removed, freed bytes).
+        keep = set(keep)
+        removed = freed = 0
+        for tmp in (self.root / "objects").glob("*/*.tmp*"):
+            if tmp.is_dir() and time.time() - tmp.stat().st_mtime > 3600:
+                freed += dir_size(tmp)
+                shutil.rmtree(tmp, ignore_errors=True)
+        entries = self.entries()
+        total = sum(int(m.get("size_bytes", 0)) for m in entries)
+        for meta in reversed(entries):
+            if total <= max_bytes:
+                break
+            if meta.get("key") in keep:
+                continue
+            shutil.rmtree(meta["path"], ignore_errors=True)
+            total -= int(meta.get("size_bytes", 0))
+            freed += int(meta.get("size_bytes", 0))
+            removed += 1
+        return removed, freed
+
+
+def open_cache(cache_dir: str, max_gb: float) -> Optional[ArtifactCache]:
+    if not cache_dir:
+        return None
+    return ArtifactCache(Path(cache_dir), int(max_gb * 1024**3) if max_gb > 0 else None)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Inspect or trim the shared research artifact cache.")
+    parser.add_argument("--cache-dir", required=True)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("ls", help="List entries, most recently used first.")
+    gc = sub.add_parser("gc", help="Evict least recently used entries down to --max-gb.")
+    gc.add_argument("--max-gb", type=float, default=DEFAULT_MAX_GB)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    cache = ArtifactCache(Path(args.cache_dir))
+    if args.command == "ls":
+        entries = cache.entries()
+        for meta in entries:
+            used = time.strftime("%Y-%m-%d %H:%M", time.localtime(meta["last_used"]))
+            print(f"{meta.get('key', '')[:16]}  {meta.get('kind', ''):24s} {int(meta.get('size_bytes', 0)):>12d}  {used}")
+        print(f"{len(entries)} entries, {sum(int(m.get('size_bytes', 0)) for m in entries)} bytes")
+    else:
+        removed, freed = cache.gc(int(args.max_gb * 1024**3))
+        print(f"Removed {removed} entries, freed {freed} bytes")
+
+
+if __name__ == "__main__":
+    main()
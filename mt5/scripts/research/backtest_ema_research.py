@@ -0,0 +1,669 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import calendar
+import csv
+import dataclasses
+import datetime as dt
+import math
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import indicators as ind
+from bar_store import BarArrays, BarStore, date_to_ts
+from common import ReportDeal, ReportMetrics, ReportSettings, parse_mt5_report, parse_report_settings
+from position_manager import EXIT_OPEN, EXIT_REASONS, ExitParams, PositionBook, atr_by_minute, manage
+from resample_bars import TIMEFRAME_SECONDS, ResampledStore
+from run_strategy_search import TIMEFRAME_TO_ENUM, Candidate
+
+
+EA_FILE = "EMA_small_big_EMA200_Buy_TimeFrame_Symbol_Research.mq5"
+# [start, end) server hours of ENUM_SESSION_FILTER, applied to the hour of the bar that just opened.
+SESSION_HOURS: Dict[int, Tuple[int, int]] = {1: (0, 9), 2: (7, 16), 3: (13, 22), 4: (7, 22)}
+# Input defaults of the research EA. The older buy-only EA is the same strategy with the filter
+# EMA fixed at 200 and no optional filters, so its saved reports double as parity fixtures.
+EA_DEFAULTS: Dict[str, object] = {
+    "trade_mode": 1,
+    "fast": 20,
+    "slow": 50,
+    "filter_ema": 200,
+    "use_adx": 0,
+    "adx_period": 14,
+    "min_adx": 22.0,
+    "use_atr": 0,
+    "atr_period": 14,
+    "min_atr": 1.0,
+    "session_filter": 0,
+    "cooldown_bars": 0,
+    "use_sltp": 0,
+    "sl_atr": 2.0,
+    "tp_atr": 3.0,
+    "evaluate_on_every_tick": 0,
+}
+EXPERT_OVERRIDES: Dict[str, Dict[str, object]] = {
+    "EMA_small_big_EMA200_Buy_TimeFrame_Symbol_Research": {},
+    "EMA_small_big_EMA200_Buy_TimeFrame_Symbol": {"trade_mode": 0, "fast": 9, "slow": 15},
+}
+INPUT_FIELDS: Dict[str, str] = {
+    "InpTradeMode": "trade_mode",
+    "InpFastEmaPeriod": "fast",
+    "InpSlowEmaPeriod": "slow",
+    "InpFilterEmaPeriod": "filter_ema",
+    "InpUseAdxFilter": "use_adx",
+    "InpAdxPeriod": "adx_period",
+    "InpMinAdx": "min_adx",
+    "InpUseAtrFilter": "use_atr",
+    "InpAtrPeriod": "atr_period",
+    "InpMinAtr": "min_atr",
+    "InpSessionFilter": "session_filter",
+    "InpCooldownBars": "cooldown_bars",
+    "InpUseSLTP": "use_sltp",
+    "InpSL_ATR_Mult": "sl_atr",
+    "InpTP_ATR_Mult": "tp_atr",
+    "InpEvaluateOnEveryTick": "evaluate_on_every_tick",
+}
+ENUM_TO_TIMEFRAME = {value: name for name, value in TIMEFRAME_TO_ENUM.items()}
+# (name, ReportMetrics field) of each metric a parity check compares; parity_harness.py's CSV
+# gets <name>_mt5/_py/_delta columns for each.
+PARITY_METRICS: Tuple[Tuple[str, str], ...] = (
+    ("trades", "total_trades"),
+    ("net", "net_profit"),
+    ("pf", "profit_factor"),
+    ("dd", "max_drawdown_abs"),
+    ("dd_pct", "max_drawdown_pct"),
+)
+TRADE_COLUMNS = ("direction", "entry_time", "entry_price", "exit_time", "exit_price", "exit_reason", "profit")
+
+
+@dataclasses.dataclass(frozen=True)
+class SymbolSpec:
+    # P&L is (exit - entry) * contract_size * lot, i.e. USD-quoted symbols only.
+    digits: int
+    contract_size: float
+
+    @property
+    def point(self) -> float:
+        return 10.0 ** -self.digits
+
+
+SYMBOL_SPECS: Dict[str, SymbolSpec] = {
+    "XAUUSD": SymbolSpec(digits=2, contract_size=100.0),
+    "XAGUSD": SymbolSpec(digits=3, contract_size=5000.0),
+    "EURUSD": SymbolSpec(digits=5, contract_size=100000.0),
+    "GBPUSD": SymbolSpec(digits=5, contract_size=100000.0),
+}
+
+
+@dataclasses.dataclass
+class Trade:
+    direction: int
+    entry_time: int
+    entry_price: float
+    exit_time: int
+    exit_price: float
+    exit_reason: str
+    profit: float
+
+
+def candidate_from_inputs(inputs: Dict[str, str], expert: str = "") -> Candidate:
+    values = dict(EA_DEFAULTS)
+    values.update(EXPERT_OVERRIDES.get(expert, {}))
+    for name, raw in inputs.items():
+        field = INPUT_FIELDS.get(name)
+        if field is None:
+            continue
+        if raw.lower() in ("true", "false"):
+            raw = "1" if raw.lower() == "true" else "0"
+        values[field] = float(raw) if field in ("min_adx", "min_atr", "sl_atr", "tp_atr") else int(float(raw))
+    return Candidate(**values)
+
+
+def require_bar_close(c: Candidate) -> None:
+    # InpEvaluateOnEveryTick re-reads the forming bar on every tick; only bar-close mode is modelled.
+    if c.evaluate_on_every_tick:
+        raise ValueError(f"{c.candidate_id()}: InpEvaluateOnEveryTick is not modelled, only bar-close evaluation.")
+
+
+def signal_arrays(bars: BarArrays, c: Candidate) -> Dict[str, np.ndarray]:
+    # Indexed by closed strategy bar i; the EA acts on them when bar i + 1 opens (shift 1 = i,
+    # shift 2 = i - 1). bull/bear already include every per-bar gate except session and cooldown.
+    high = np.asarray(bars.high, dtype=np.float64)
+    low = np.asarray(bars.low, dtype=np.float64)
+    close = np.asarray(bars.close, dtype=np.float64)
+    fast = ind.ema(close, c.fast)
+    slow = ind.ema(close, c.slow)
+    filt = ind.ema(close, c.filter_ema)
+    prev_fast = np.r_[np.nan, fast[:-1]]
+    prev_slow = np.r_[np.nan, slow[:-1]]
+
+    readable = np.isfinite(prev_fast) & np.isfinite(prev_slow) & np.isfinite(filt) & np.isfinite(close)
+    if c.use_adx:
+        adx = ind.adx(high, low, close, c.adx_period)[0]
+        readable &= np.isfinite(adx) & (adx >= c.min_adx)
+    atr = np.zeros(len(close))
+    if c.use_atr or c.use_sltp:
+        atr = ind.atr(high, low, close, c.atr_period)
+        readable &= np.isfinite(atr)
+    if c.use_atr:
+        readable &= atr >= c.min_atr
+
+    with np.errstate(invalid="ignore"):
+        bull = (prev_fast <= prev_slow) & (fast > slow)
+        bear = (prev_fast >= prev_slow) & (fast < slow)
+    return {
+        "bull": bull & readable,
+        "bear": bear & readable,
+        "above": close > filt,
+        "below": close < filt,
+        "atr": atr,
+    }
+
+
+def session_allowed(bar_time: np.ndarray, session_filter: int) -> np.ndarray:
+    hours = SESSION_HOURS.get(int(session_filter))
+    if hours is None:
+        return np.ones(len(bar_time), dtype=bool)
+    hour = (np.asarray(bar_time, dtype=np.int64) // 3600) % 24
+    return (hour >= hours[0]) & (hour < hours[1])
+
+
+def first_stop_hit(
+    m1: BarArrays,
+    lo: int,
+    hi: int,
+    direction: int,
+    sl: float,
+    tp: float,
+    point: float,
+) -> Optional[Tuple[int, float, str]]:
+    # First M1 bar in [lo, hi) whose range reaches SL or TP. Longs exit on bid, shorts on ask
+    # (bid + bar spread). A bar that opens beyond a level fills at its open; a bar touching both
+    # follows MT5's OHLC path: open-low-high-close on up bars, open-high-low-close otherwise.
+    if hi <= lo or (sl <= 0.0 and tp <= 0.0):
+        return None
+    offset = 0.0 if direction > 0 else np.asarray(m1.spread[lo:hi], dtype=np.float64) * point
+    high = np.asarray(m1.high[lo:hi], dtype=np.float64) + offset
+    low = np.asarray(m1.low[lo:hi], dtype=np.float64) + offset
+    if direction > 0:
+        hit_sl = low <= sl if sl > 0.0 else np.zeros(hi - lo, dtype=bool)
+        hit_tp = high >= tp if tp > 0.0 else np.zeros(hi - lo, dtype=bool)
+    else:
+        hit_sl = high >= sl if sl > 0.0 else np.zeros(hi - lo, dtype=bool)
+        hit_tp = low <= tp if tp > 0.0 else np.zeros(hi - lo, dtype=bool)
+    hits = np.flatnonzero(hit_sl | hit_tp)
+    if hits.size == 0:
+        return None
+    k = int(hits[0])
+    bar_open = float(m1.open[lo + k]) + (0.0 if direction > 0 else float(offset[k]))
+    if hit_sl[k] and (bar_open - sl) * direction <= 0.0:
+        return lo + k, bar_open, "sl"
+    if hit_tp[k] and (bar_open - tp) * direction >= 0.0:
+        return lo + k, bar_open, "tp"
+    if hit_sl[k] and hit_tp[k]:
+        low_first = float(m1.close[lo + k]) > float(m1.open[lo + k])
+        sl_first = low_first if direction > 0 else not low_first
+        return (lo + k, sl, "sl") if sl_first else (lo + k, tp, "tp")
+    return (lo + k, sl, "sl") if hit_sl[k] else (lo + k, tp, "tp")
+
+
+def simulate(
+    bars: BarArrays,
+    m1: BarArrays,
+    c: Candidate,
+    spec: SymbolSpec,
+    lot: float,
+    signals: Optional[Dict[str, np.ndarray]] = None,
+    exits: Optional[ExitParams] = None,
+) -> List[Trade]:
+    # bars: the whole strategy-timeframe history (indicator warm-up); m1: the tested window only.
+    # Default bar-close mode: nothing happens on the tester's first tick, then each newly opened
+    # strategy bar is one decision, filled at the first tick (M1 open) of that bar. exits swaps the
+    # plain SL/TP scan for the position manager (break-even, trailing, partials, time stop), with
+    # R = sl_atr * ATR at entry.
+    require_bar_close(c)
+    if len(m1) == 0 or len(bars) < 3:
+        return []
+    sig = signals if signals is not None else signal_arrays(bars, c)
+    point = spec.point
+    bar_time = np.asarray(bars.time, dtype=np.int64)
+    m1_time = np.asarray(m1.time, dtype=np.int64)
+
+    decision = np.arange(1, len(bars))
+    first_bar = int(np.searchsorted(bar_time, m1_time[0], side="right")) - 1
+    live = (decision > first_bar) & (bar_time[decision] <= m1_time[-1])
+    live &= (sig["bull"][:-1] | sig["bear"][:-1]) & session_allowed(bar_time[decision], c.session_filter)
+    events = decision[live]
+
+    managed = exits is not None and exits.active
+    if managed:
+        bar_atr = ind.atr(
+            np.asarray(bars.high, dtype=np.float64),
+            np.asarray(bars.low, dtype=np.float64),
+            np.asarray(bars.close, dtype=np.float64),
+            c.atr_period,
+        )
+        atr_m1 = atr_by_minute(bar_time, bar_atr, m1_time)
+
+    trades: List[Trade] = []
+    position: Optional[Dict[str, object]] = None
+    last_trade_bar = -1
+
+    def scan_exit(hi: int) -> Optional[Tuple[int, float, str]]:
+        if not managed:
+            return first_stop_hit(m1, int(position["scan"]), hi, int(position["direction"]), position["sl"], position["tp"], point)
+        book = position["book"]
+        manage(book, m1, atr_m1, exits, point, spec.digits, limit=hi)
+        position["volume"] = float(book.volume[0])
+        if book.partial_index[0] >= 0:
+            position["partial"] = (
+                (float(book.partial_price[0]) - position["entry_price"])
+                * position["direction"]
+                * spec.contract_size
+                * float(book.partial_volume[0])
+            )
+        if book.exit_reason[0] == EXIT_OPEN:
+            return None
+        return int(book.exit_index[0]), float(book.exit_price[0]), EXIT_REASONS[int(book.exit_reason[0])]
+
+    def close_position(k: int, price: float, reason: str) -> None:
+        nonlocal position
+        profit = (price - position["entry_price"]) * position["direction"] * spec.contract_size * position["volume"]
+        profit += position["partial"]
+        trades.append(
+            Trade(
+                direction=int(position["direction"]),
+                entry_time=int(position["entry_time"]),
+                entry_price=position["entry_price"],
+                exit_time=int(m1_time[k]),
+                exit_price=price,
+                exit_reason=reason,
+                profit=round(profit, 2),
+            )
+        )
+        position = None
+
+    def market_price(k: int, direction: int) -> float:
+        bid = float(m1.open[k])
+        return bid + float(m1.spread[k]) * point if direction > 0 else bid
+
+    for j in events:
+        k = int(np.searchsorted(m1_time, bar_time[j], side="left"))
+        if position is not None:
+            hit = scan_exit(k)
+            if hit is not None:
+                close_position(*hit)
+            else:
+                position["scan"] = k
+        if c.cooldown_bars > 0 and last_trade_bar >= 0 and j - last_trade_bar < c.cooldown_bars:
+            continue
+
+        i = j - 1
+        if sig["bull"][i] and sig["above"][i]:
+            want = 1
+        elif c.trade_mode == 1 and sig["bear"][i] and sig["below"][i]:
+            want = -1
+        else:
+            if c.trade_mode == 0 and sig["bear"][i] and position is not None and position["direction"] > 0:
+                close_position(k, market_price(k, -1), "signal")
+            continue
+
+        if position is not None and position["direction"] == -want:
+            close_position(k, market_price(k, want), "signal")
+        if position is not None:
+            continue
+        entry = market_price(k, want)
+        sl = tp = 0.0
+        atr = float(sig["atr"][i])
+        if c.use_sltp and atr > 0.0:
+            # BuildStops: longs from the ask, shorts from the bid, rounded to the symbol digits.
+            base = float(m1.open[k]) + (float(m1.spread[k]) * point if want > 0 else 0.0)
+            sl = round(base - want * c.sl_atr * atr, spec.digits)
+            tp = round(base + want * c.tp_atr * atr, spec.digits)
+        position = {
+            "direction": want,
+            "entry_time": float(m1_time[k]),
+            "entry_price": entry,
+            "sl": sl,
+            "tp": tp,
+            "scan": k,
+            "volume": lot,
+            "partial": 0.0,
+        }
+        if managed:
+            risk = c.sl_atr * float(bar_atr[i]) if bar_atr[i] > 0.0 else np.nan
+            position["book"] = PositionBook.open(m1, [k], want, entry, sl, tp, lot, risk=risk)
+        last_trade_bar = int(j)
+
+    if position is not None:
+        end = len(m1)
+        hit = scan_exit(end)
+        if hit is not None:
+            close_position(*hit)
+        else:
+            # The tester closes whatever is left at the last tick of the test.
+            last_close = float(m1.close[end - 1])
+            if position["direction"] < 0:
+                last_close += float(m1.spread[end - 1]) * point
+            close_position(end - 1, last_close, "end")
+    return trades
+
+
+def report_trades(deals: List[ReportDeal]) -> List[Trade]:
+    # Closed trades from a report's Deals table (one position at a time, as in the EMA EAs).
+    # profit is the tester's money result: P&L plus swap and the in/out commissions.
+    trades: List[Trade] = []
+    entry: Optional[ReportDeal] = None
+    for d in deals:
+        if d.direction == "in":
+            entry = d
+        elif d.direction == "out" and entry is not None:
+            trades.append(
+                Trade(
+                    direction=1 if entry.type == "buy" else -1,
+                    entry_time=calendar.timegm(entry.time.timetuple()),
+                    entry_price=entry.price,
+                    exit_time=calendar.timegm(d.time.timetuple()),
+                    exit_price=d.price,
+                    exit_reason="end" if d.comment == "end of test" else d.comment,
+                    profit=round(d.profit + d.swap + d.commission + entry.commission, 2),
+                )
+            )
+            entry = None
+    return trades
+
+
+def trade_metrics(trades: List[Trade], deposit: float, label: str) -> ReportMetrics:
+    return profit_metrics(np.array([t.profit for t in trades], dtype=np.float64), deposit, label)
+
+
+def profit_metrics(profit: np.ndarray, deposit: float, label: str) -> ReportMetrics:
+    # profit: closed-trade results in exit order.
+    wins = profit[profit > 0.0]
+    losses = profit[profit < 0.0]
+    gross_profit = float(wins.sum())
+    gross_loss = float(losses.sum())
+    # Balance drawdown as the tester reports it: the largest peak-to-trough drop of the closed-trade
+    # balance, with the percentage taken against the peak it fell from.
+    balance = deposit + np.r_[0.0, np.cumsum(profit)]
+    drawdown = np.maximum.accumulate(balance) - balance
+    worst = int(np.argmax(drawdown))
+    peak = float(np.maximum.accumulate(balance)[worst])
+    return ReportMetrics(
+        report_file=label,
+        status="OK",
+        net_profit=round(float(profit.sum()), 2),
+        gross_profit=round(gross_profit, 2),
+        gross_loss=round(gross_loss, 2),
+        total_trades=len(profit),
+        profit_factor=round(gross_profit / -gross_loss, 2) if gross_loss < 0.0 else 0.0,
+        expected_payoff=round(float(profit.mean()), 2) if len(profit) else 0.0,
+        max_drawdown_abs=round(float(drawdown[worst]), 2),
+        max_drawdown_pct=round(float(drawdown[worst]) / peak * 100.0, 2) if peak > 0.0 else 0.0,
+        win_rate_pct=round(len(wins) / len(profit) * 100.0, 2) if len(profit) else 0.0,
+        avg_win=round(gross_profit / len(wins), 2) if len(wins) else 0.0,
+        avg_loss=round(gross_loss / len(losses), 2) if len(losses) else 0.0,
+    )
+
+
+def load_bars(
+    resampled: ResampledStore,
+    symbol: str,
+    strategy_tf: str,
+    from_date: dt.date,
+    to_date: dt.date,
+) -> Tuple[BarArrays, BarArrays]:
+    # Strategy bars span the whole stored history up to the end of the test so EMA200 and friends
+    # are warmed up as in the terminal; M1 bars cover only the tested dates (to_date inclusive).
+    start_ts = date_to_ts(from_date)
+    end_ts = date_to_ts(to_date + dt.timedelta(days=1))
+    m1 = resampled.m1.load_range(symbol, start_ts, end_ts)
+    months = resampled.m1.months(symbol)
+    history_ts = date_to_ts(months[0]) if months else start_ts
+    if strategy_tf == "M1":
+        bars = resampled.m1.load_range(symbol, history_ts, end_ts)
+    else:
+        bars = resampled.load_range(symbol, strategy_tf, history_ts, end_ts)
+    return bars, m1
+
+
+def backtest(
+    resampled: ResampledStore,
+    symbol: str,
+    strategy_tf: str,
+    c: Candidate,
+    from_date: dt.date,
+    to_date: dt.date,
+    *,
+    lot: float = 1.0,
+    deposit: float = 25000.0,
+    spec: Optional[SymbolSpec] = None,
+    exits: Optional[ExitParams] = None,
+) -> Tuple[ReportMetrics, List[Trade]]:
+    if strategy_tf != "M1" and strategy_tf not in TIMEFRAME_SECONDS:
+        raise ValueError(f"Unsupported strategy timeframe: {strategy_tf}")
+    if spec is None:
+        if symbol not in SYMBOL_SPECS:
+            raise ValueError(f"No contract spec for {symbol}; pass --digits and --contract-size.")
+        spec = SYMBOL_SPECS[symbol]
+    bars, m1 = load_bars(resampled, symbol, strategy_tf, from_date, to_date)
+    trades = simulate(bars, m1, c, spec, lot, exits=exits)
+    label = f"python:{c.candidate_id()}_{strategy_tf}_{from_date:%Y%m%d}_{to_date:%Y%m%d}"
+    return trade_metrics(trades, deposit, label), trades
+
+
+def settings_timeframe(settings: ReportSettings) -> str:
+    # InpStrategyTimeframe wins over the chart period; PERIOD_CURRENT (0) falls back to the chart.
+    tf_enum = int(float(settings.inputs.get("InpStrategyTimeframe", "0")))
+    return ENUM_TO_TIMEFRAME.get(tf_enum, settings.timeframe)
+
+
+def replay_settings(
+    resampled: ResampledStore,
+    settings: ReportSettings,
+    spec: Optional[SymbolSpec] = None,
+) -> ReportMetrics:
+    # Re-run the tester configuration behind a report (its Settings block or its .ini). The
+    # tester's ToDate is exclusive: the saved reports end with the last tick of the day before
+    # (e.g. ToDate=2024.10.31, a Thursday, closes "end of test" at 2024.10.30 22:58:59).
+    candidate = candidate_from_inputs(settings.inputs, settings.expert)
+    ours, _ = backtest(
+        resampled,
+        settings.symbol,
+        settings_timeframe(settings),
+        candidate,
+        settings.from_date,
+        settings.to_date - dt.timedelta(days=1),
+        lot=float(settings.inputs.get("InpLotSize", "1")),
+        deposit=settings.deposit,
+        spec=spec,
+    )
+    return ours
+
+
+def parity_limits(
+    deposit: float,
+    trade_tolerance: int = 0,
+    money_tolerance_pct: float = 1.0,
+    pf_tolerance: float = 0.05,
+    dd_pct_tolerance: float = 1.0,
+) -> Dict[str, float]:
+    # Allowed |python - mt5| per PARITY_METRICS name; money gaps are a share of the deposit.
+    money = deposit * money_tolerance_pct / 100.0
+    return {
+        "trades": float(trade_tolerance),
+        "net": money,
+        "pf": pf_tolerance,
+        "dd": money,
+        "dd_pct": dd_pct_tolerance,
+    }
+
+
+def compare_metrics(
+    mt5: ReportMetrics,
+    ours: ReportMetrics,
+    limits: Dict[str, float],
+) -> Tuple[Dict[str, object], List[str]]:
+    values: Dict[str, object] = {}
+    failed: List[str] = []
+    for name, field in PARITY_METRICS:
+        theirs, mine = getattr(mt5, field), getattr(ours, field)
+        delta = round(mine - theirs, 2)
+        values[f"{name}_mt5"] = theirs
+        values[f"{name}_py"] = mine
+        values[f"{name}_delta"] = delta
+        if abs(delta) > limits[name]:
+            failed.append(name)
+    return values, failed
+
+
+def parity_row(
+    resampled: ResampledStore,
+    report: Path,
+    spec_override: Optional[SymbolSpec],
+    trade_tolerance: int = 0,
+    money_tolerance_pct: float = 1.0,
+    pf_tolerance: float = 0.05,
+    dd_pct_tolerance: float = 1.0,
+    settings: Optional[ReportSettings] = None,
+) -> Dict[str, object]:
+    # settings: the run's .ini when it is known; the report's own Settings block otherwise.
+    settings = settings or parse_report_settings(report)
+    if settings is None:
+        return {"report": report.name, "status": "NO_SETTINGS"}
+    if settings.expert not in EXPERT_OVERRIDES:
+        return {"report": report.name, "status": f"UNSUPPORTED_EXPERT {settings.expert}"}
+    if candidate_from_inputs(settings.inputs, settings.expert).evaluate_on_every_tick:
+        return {"report": report.name, "status": "UNSUPPORTED_MODE InpEvaluateOnEveryTick"}
+    mt5 = parse_mt5_report(report)
+    ours = replay_settings(resampled, settings, spec_override)
+    limits = parity_limits(settings.deposit, trade_tolerance, money_tolerance_pct, pf_tolerance, dd_pct_tolerance)
+    values, failed = compare_metrics(mt5, ours, limits)
+    return {
+        "report": report.name,
+        "status": "FAIL" if failed else "PASS",
+        "failed_metrics": " ".join(failed),
+        **values,
+    }
+
+
+def exit_params_from_args(args: argparse.Namespace) -> ExitParams:
+    friday = -1
+    if args.friday_flat:
+        hour, minute = args.friday_flat.split(":")
+        friday = int(hour) * 60 + int(minute)
+    return ExitParams(
+        be_trigger_r=args.be_trigger_r,
+        trail_start_r=args.trail_start_r,
+        trail_atr=args.trail_atr,
+        partial_at_r=args.partial_at_r,
+        partial_pct=args.partial_pct,
+        max_bars_in_trade=args.max_bars_in_trade,
+        bar_seconds=TIMEFRAME_SECONDS.get(args.strategy_tf.upper(), 60),
+        friday_flat_minute=friday,
+    )
+
+
+def add_exit_args(parser: argparse.ArgumentParser) -> None:
+    # Read back by exit_params_from_args, which also needs --strategy-tf.
+    exits = parser.add_argument_group("position management (off by default; R = sl-atr x ATR at entry)")
+    exits.add_argument("--be-trigger-r", type=float, default=math.inf)
+    exits.add_argument("--trail-start-r", type=float, default=math.inf)
+    exits.add_argument("--trail-atr", type=float, default=0.0)
+    exits.add_argument("--partial-at-r", type=float, default=math.inf)
+    exits.add_argument("--partial-pct", type=float, default=0.0)
+    exits.add_argument("--max-bars-in-trade", type=int, default=0)
+    exits.add_argument("--friday-flat", default="", help="HH:MM server time from which Friday positions are closed.")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=f"Python backtest of {EA_FILE} on the M1 bar store.")
+    parser.add_argument("--store-dir", required=True, help="Columnar bar store root holding <SYMBOL>/M1 partitions.")
+    parser.add_argument("--cache-dir", default="", help="Optional root for resampled bars; defaults to --store-dir.")
+    parser.add_argument("--symbol", default="XAUUSD")
+    parser.add_argument("--strategy-tf", default="M15")
+    parser.add_argument("--from-date", default="")
+    parser.add_argument("--to-date", default="")
+    parser.add_argument("--lot", type=float, default=1.0)
+    parser.add_argument("--deposit", type=float, default=25000.0)
+    parser.add_argument("--digits", type=int, default=0, help="Override the symbol's price digits.")
+    parser.add_argument("--contract-size", type=float, default=0.0, help="Override the symbol's contract size.")
+    for field in dataclasses.fields(Candidate):
+        default = EA_DEFAULTS[field.name]
+        parser.add_argument(f"--{field.name.replace('_', '-')}", type=type(default), default=default)
+    parser.add_argument("--trades-csv", default="")
+    add_exit_args(parser)
+    parser.add_argument(
+        "--parity-report",
+        action="append",
+        default=[],
+        help="Saved MT5 tester report to reproduce (repeatable); symbol, dates and inputs come from the report.",
+    )
+    parser.add_argument("--trade-tolerance", type=int, default=0)
+    parser.add_argument("--money-tolerance-pct", type=float, default=1.0, help="Allowed net/DD gap as %% of the deposit.")
+    parser.add_argument("--pf-tolerance", type=float, default=0.05, help="Allowed absolute profit factor gap.")
+    parser.add_argument("--dd-pct-tolerance", type=float, default=1.0, help="Allowed drawdown gap in percentage points.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    cache_root = Path(args.cache_dir) if args.cache_dir else Path(args.store_dir)
+    resampled = ResampledStore(BarStore(Path(args.store_dir)), cache_root)
+    spec_override = None
+    if args.digits or args.contract_size:
+        base = SYMBOL_SPECS.get(args.symbol, SymbolSpec(digits=2, contract_size=100.0))
+        spec_override = SymbolSpec(
+            digits=args.digits or base.digits,
+            contract_size=args.contract_size or base.contract_size,
+        )
+
+    if args.parity_report:
+        rows = [
+            parity_row(
+                resampled,
+                Path(p),
+                spec_override,
+                args.trade_tolerance,
+                args.money_tolerance_pct,
+                args.pf_tolerance,
+                args.dd_pct_tolerance,
+            )
+            for p in args.parity_report
+        ]
+        for row in rows:
+            print("  ".join(f"{k}={v}" for k, v in row.items()))
+        failed = [r for r in rows if r["status"] != "PASS"]
+        print(f"{len(rows) - len(failed)}/{len(rows)} reports within tolerance")
+        sys.exit(1 if failed else 0)
+
+    if not args.from_date or not args.to_date:
+        raise ValueError("--from-date and --to-date are required without --parity-report")
+    candidate = Candidate(**{f.name: getattr(args, f.name) for f in dataclasses.fields(Candidate)})
+    metrics, trades = backtest(
+        resampled,
+        args.symbol,
+        args.strategy_tf.upper(),
+        candidate,
+        dt.date.fromisoformat(args.from_date),
+        dt.date.fromisoformat(args.to_date),
+        lot=args.lot,
+        deposit=args.deposit,
+        spec=spec_override,
+        exits=exit_params_from_args(args),
+    )
+    for field in dataclasses.fields(ReportMetrics):
+        print(f"{field.name}: {getattr(metrics, field.name)}")
+    if args.trades_csv:
+        with Path(args.trades_csv).open("w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=TRADE_COLUMNS)
+            writer.writeheader()
+            for t in trades:
+                writer.writerow(dataclasses.asdict(t))
+
+
+if __name__ == "__main__":
+    main()
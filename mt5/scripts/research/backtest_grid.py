@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import datetime as dt
+import random
+import statistics
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import indicators as ind
+from backtest_ema_research import (
+    SYMBOL_SPECS,
+    SymbolSpec,
+    first_stop_hit,
+    load_bars,
+    profit_metrics,
+    require_bar_close,
+    session_allowed,
+    simulate,
+)
+from bar_store import BarArrays, BarStore, date_to_ts
+from common import ReportMetrics, append_csv, quarter_ranges
+from resample_bars import ResampledStore
+from run_strategy_search import Candidate, stage1_grid
+
+
+def gate_key(c: Candidate) -> tuple:
+    # The candidate fields that decide IndicatorCache.gate.
+    needs_atr = bool(c.use_atr or c.use_sltp)
+    return (
+        c.filter_ema,
+        (c.adx_period, c.min_adx) if c.use_adx else None,
+        c.atr_period if needs_atr else None,
+        c.min_atr if c.use_atr else None,
+    )
+
+
+class IndicatorCache:
+    # Each distinct EMA/ADX/ATR period is computed once per bar history and shared by every
+    # candidate that reads it; derived boolean rows (crosses, gates) are memoized the same way.
+    def __init__(self, bars: BarArrays) -> None:
+        self.high = np.asarray(bars.high, dtype=np.float64)
+        self.low = np.asarray(bars.low, dtype=np.float64)
+        self.close = np.asarray(bars.close, dtype=np.float64)
+        self._memo: Dict[tuple, np.ndarray] = {}
+
+    def _get(self, key: tuple, build) -> np.ndarray:
+        out = self._memo.get(key)
+        if out is None:
+            out = self._memo[key] = build()
+        return out
+
+    def ema(self, period: int) -> np.ndarray:
+        return self._get(("ema", period), lambda: ind.ema(self.close, period))
+
+    def adx(self, period: int) -> np.ndarray:
+        return self._get(("adx", period), lambda: ind.adx(self.high, self.low, self.close, period)[0])
+
+    def atr(self, period: int) -> np.ndarray:
+        return self._get(("atr", period), lambda: ind.atr(self.high, self.low, self.close, period))
+
+    def cross(self, fast: int, slow: int) -> Tuple[np.ndarray, np.ndarray]:
+        # (bull, bear) at closed bar i, including the "both EMA pairs readable" check.
+        def build() -> np.ndarray:
+            f, s = self.ema(fast), self.ema(slow)
+            pf, ps = np.r_[np.nan, f[:-1]], np.r_[np.nan, s[:-1]]
+            with np.errstate(invalid="ignore"):
+                return np.stack([(pf <= ps) & (f > s), (pf >= ps) & (f < s)])
+
+        pair = self._get(("cross", fast, slow), build)
+        return pair[0], pair[1]
+
+    def gate(self, c: Candidate) -> np.ndarray:
+        # The per-bar part of the EA's early returns: readable filter EMA, ADX and ATR filters, and
+        # a readable ATR whenever SL/TP needs it.
+        needs_atr = bool(c.use_atr or c.use_sltp)
+
+        def build() -> np.ndarray:
+            ok = np.isfinite(self.ema(c.filter_ema)) & np.isfinite(self.close)
+            if c.use_adx:
+                adx = self.adx(c.adx_period)
+                ok &= np.isfinite(adx) & (adx >= c.min_adx)
+            if needs_atr:
+                atr = self.atr(c.atr_period)
+                ok &= np.isfinite(atr)
+                if c.use_atr:
+                    ok &= atr >= c.min_atr
+            return ok
+
+        return self._get(("gate",) + gate_key(c), build)
+
+
+def unique_rows(keys: Sequence[tuple], build) -> Tuple[np.ndarray, np.ndarray]:
+    # Stacks build(key) for each distinct key into a (bars, rows) table and returns it with the
+    # row index of every candidate, so per-bar lookups are one gather across the whole grid.
+    order: Dict[tuple, int] = {}
+    rows = np.empty(len(keys), dtype=np.int64)
+    for n, key in enumerate(keys):
+        rows[n] = order.setdefault(key, len(order))
+    table = np.stack([build(key) for key in order], axis=1)
+    return np.ascontiguousarray(table), rows
+
+
+def simulate_grid(
+    bars: BarArrays,
+    m1: BarArrays,
+    candidates: Sequence[Candidate],
+    spec: SymbolSpec,
+    lot: float,
+    cache: Optional[IndicatorCache] = None,
+) -> List[List[float]]:
+    # Same rules as backtest_ema_research.simulate, stepped bar by bar with every candidate's
+    # position state held in arrays. Returns each candidate's closed-trade profits in exit order.
+    count = len(candidates)
+    profits: List[List[float]] = [[] for _ in range(count)]
+    if len(m1) == 0 or len(bars) < 3 or count == 0:
+        return profits
+    cache = cache if cache is not None else IndicatorCache(bars)
+    point = spec.point
+    bar_time = np.asarray(bars.time, dtype=np.int64)
+    m1_time = np.asarray(m1.time, dtype=np.int64)
+
+    signal_keys = [(c.fast, c.slow) + gate_key(c) for c in candidates]
+    by_key = dict(zip(signal_keys, candidates))
+    bull_t, signal_row = unique_rows(signal_keys, lambda k: cache.cross(k[0], k[1])[0] & cache.gate(by_key[k]))
+    bear_t, _ = unique_rows(signal_keys, lambda k: cache.cross(k[0], k[1])[1] & cache.gate(by_key[k]))
+    close = cache.close
+    above_t, filter_row = unique_rows([(c.filter_ema,) for c in candidates], lambda k: close > cache.ema(k[0]))
+    below_t, _ = unique_rows([(c.filter_ema,) for c in candidates], lambda k: close < cache.ema(k[0]))
+    atr_t, atr_row = unique_rows(
+        [(c.atr_period if c.use_sltp else 0,) for c in candidates],
+        lambda k: cache.atr(k[0]) if k[0] else np.zeros(len(close)),
+    )
+    session_t, session_row = unique_rows([(c.session_filter,) for c in candidates], lambda k: session_allowed(bar_time, k[0]))
+
+    mode = np.array([c.trade_mode for c in candidates], dtype=np.int64)
+    cooldown = np.array([c.cooldown_bars for c in candidates], dtype=np.int64)
+    use_sltp = np.array([bool(c.use_sltp) for c in candidates])
+    sl_mult = np.array([c.sl_atr for c in candidates], dtype=np.float64)
+    tp_mult = np.array([c.tp_atr for c in candidates], dtype=np.float64)
+
+    direction = np.zeros(count, dtype=np.int64)
+    entry = np.zeros(count)
+    sl = np.zeros(count)
+    tp = np.zeros(count)
+    last_trade = np.full(count, -1, dtype=np.int64)
+
+    def close_positions(idx: np.ndarray, price: np.ndarray) -> None:
+        pnl = (price - entry[idx]) * direction[idx] * spec.contract_size * lot
+        for n, value in zip(idx.tolist(), pnl.tolist()):
+            profits[n].append(round(value, 2))
+        direction[idx] = 0
+
+    first_bar = int(np.searchsorted(bar_time, m1_time[0], side="right")) - 1
+    last_bar = int(np.searchsorted(bar_time, m1_time[-1], side="right")) - 1
+    # M1 span of every bar in the window and its bid/ask extremes for the stop pre-check.
+    starts = np.searchsorted(m1_time, bar_time[first_bar : last_bar + 1], side="left")
+    ends = np.r_[starts[1:], len(m1)]
+    ask_offset = np.asarray(m1.spread, dtype=np.float64) * point
+    m1_high = np.asarray(m1.high, dtype=np.float64)
+    m1_low = np.asarray(m1.low, dtype=np.float64)
+    bid_high = np.maximum.reduceat(m1_high, starts)
+    bid_low = np.minimum.reduceat(m1_low, starts)
+    ask_high = np.maximum.reduceat(m1_high + ask_offset, starts)
+    ask_low = np.minimum.reduceat(m1_low + ask_offset, starts)
+
+    for n, j in enumerate(range(first_bar, last_bar + 1)):
+        k = int(starts[n])
+        if j > first_bar:
+            i = j - 1
+            bull = bull_t[i][signal_row]
+            bear = bear_t[i][signal_row]
+            event = (bull | bear) & session_t[j][session_row]
+            event &= (cooldown <= 0) | (last_trade < 0) | (j - last_trade >= cooldown)
+            if event.any():
+                bid = float(m1.open[k])
+                ask = bid + float(ask_offset[k])
+                buy = event & bull & above_t[i][filter_row]
+                sell = event & ~buy & (mode == 1) & bear & below_t[i][filter_row]
+                exit_long = event & ~buy & ~sell & (mode == 0) & bear & (direction > 0)
+                flip_short = buy & (direction < 0)
+                flip_long = sell & (direction > 0)
+                if flip_short.any():
+                    close_positions(np.flatnonzero(flip_short), np.full(int(flip_short.sum()), ask))
+                flat = exit_long | flip_long
+                if flat.any():
+                    close_positions(np.flatnonzero(flat), np.full(int(flat.sum()), bid))
+                for want, side, price, base in ((1, buy, ask, ask), (-1, sell, bid, bid)):
+                    opened = np.flatnonzero(side & (direction == 0))
+                    if opened.size == 0:
+                        continue
+                    direction[opened] = want
+                    entry[opened] = price
+                    last_trade[opened] = j
+                    for c_idx in opened[use_sltp[opened]].tolist():
+                        atr = float(atr_t[i][atr_row[c_idx]])
+                        if atr > 0.0:
+                            sl[c_idx] = round(base - want * float(sl_mult[c_idx]) * atr, spec.digits)
+                            tp[c_idx] = round(base + want * float(tp_mult[c_idx]) * atr, spec.digits)
+                        else:
+                            sl[c_idx] = tp[c_idx] = 0.0
+                    plain = opened[~use_sltp[opened]]
+                    sl[plain] = 0.0
+                    tp[plain] = 0.0
+
+        # Stops inside bar j: a cheap test against the bar's extremes, then the exact M1 walk only
+        # for the few positions whose levels the bar actually reached.
+        longs = direction > 0
+        shorts = direction < 0
+        touched = longs & (((sl > 0.0) & (bid_low[n] <= sl)) | ((tp > 0.0) & (bid_high[n] >= tp)))
+        touched |= shorts & (((sl > 0.0) & (ask_high[n] >= sl)) | ((tp > 0.0) & (ask_low[n] <= tp)))
+        for c_idx in np.flatnonzero(touched).tolist():
+            hit = first_stop_hit(m1, k, int(ends[n]), int(direction[c_idx]), float(sl[c_idx]), float(tp[c_idx]), point)
+            if hit is not None:
+                close_positions(np.array([c_idx]), np.array([hit[1]]))
+
+    still_open = np.flatnonzero(direction != 0)
+    if still_open.size:
+        # Leftovers close at the last tick: bid for longs, ask for shorts.
+        last = float(m1.close[-1])
+        price = np.where(direction[still_open] > 0, last, last + float(ask_offset[-1]))
+        close_positions(still_open, price)
+    return profits
+
+
+def backtest_grid(
+    resampled: ResampledStore,
+    symbol: str,
+    strategy_tf: str,
+    candidates: Sequence[Candidate],
+    periods: Sequence[Tuple[str, dt.date, dt.date]],
+    *,
+    lot: float = 1.0,
+    deposit: float = 25000.0,
+    spec: Optional[SymbolSpec] = None,
+) -> List[List[ReportMetrics]]:
+    # metrics[candidate][period]. Indicators are causal, so one history loaded to the last period
+    # end serves every period and every candidate.
+    for c in candidates:
+        require_bar_close(c)
+    spec = spec or SYMBOL_SPECS[symbol]
+    last_end = max(to_d for _, _, to_d in periods)
+    bars, _ = load_bars(resampled, symbol, strategy_tf, last_end, last_end)
+    cache = IndicatorCache(bars)
+    out: List[List[ReportMetrics]] = [[] for _ in candidates]
+    for label, from_d, to_d in periods:
+        m1 = resampled.m1.load_range(symbol, date_to_ts(from_d), date_to_ts(to_d + dt.timedelta(days=1)))
+        profits = simulate_grid(bars, m1, candidates, spec, lot, cache)
+        for n, c in enumerate(candidates):
+            label_n = f"python:{c.candidate_id()}_{strategy_tf}_{label}"
+            out[n].append(profit_metrics(np.array(profits[n], dtype=np.float64), deposit, label_n))
+    return out
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Score the whole stage-1 candidate grid with the batched Python backtester.")
+    parser.add_argument("--store-dir", required=True, help="Columnar bar store root holding <SYMBOL>/M1 partitions.")
+    parser.add_argument("--cache-dir", default="", help="Optional root for resampled bars; defaults to --store-dir.")
+    parser.add_argument("--symbol", default="XAUUSD")
+    parser.add_argument("--strategy-tf", default="M15")
+    parser.add_argument("--from-year", type=int, default=2021)
+    parser.add_argument("--to-year", type=int, default=2022)
+    parser.add_argument("--lot", type=float, default=1.0)
+    parser.add_argument("--deposit", type=float, default=25000.0)
+    parser.add_argument("--out-csv", default="", help="Per-candidate summary, best first.")
+    parser.add_argument(
+        "--check-samples",
+        type=int,
+        default=0,
+        help="Re-run this many random candidates through the single-candidate backtester and compare.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    cache_root = Path(args.cache_dir) if args.cache_dir else Path(args.store_dir)
+    resampled = ResampledStore(BarStore(Path(args.store_dir)), cache_root)
+    tf = args.strategy_tf.upper()
+    grid = stage1_grid()
+    periods = quarter_ranges(args.from_year, args.to_year)
+    started = time.perf_counter()
+    metrics = backtest_grid(resampled, args.symbol, tf, grid, periods, lot=args.lot, deposit=args.deposit)
+    elapsed = time.perf_counter() - started
+    print(f"{len(grid)} candidates x {len(periods)} periods in {elapsed:.1f}s")
+
+    rows: List[Dict[str, object]] = []
+    for c, per in zip(grid, metrics):
+        nets = [m.net_profit for m in per]
+        rows.append(
+            {
+                "candidate_id": c.candidate_id(),
+                **dataclasses.asdict(c),
+                "min_net": round(min(nets), 2),
+                "avg_net": round(sum(nets) / len(nets), 2),
+                "median_net": round(statistics.median(nets), 2),
+                "avg_pf": round(sum(m.profit_factor for m in per) / len(per), 4),
+                "max_dd_pct": round(max(m.max_drawdown_pct for m in per), 4),
+                "trades": sum(m.total_trades for m in per),
+            }
+        )
+    rows.sort(key=lambda r: (r["min_net"], r["avg_net"], r["avg_pf"]), reverse=True)
+    for r in rows[:10]:
+        print(f"{r['candidate_id']}  min_net={r['min_net']}  avg_net={r['avg_net']}  avg_pf={r['avg_pf']}  trades={r['trades']}")
+    if args.out_csv:
+        out = Path(args.out_csv)
+        if out.exists():
+            out.unlink()
+        append_csv(out, rows, fieldnames=list(rows[0].keys()))
+
+    if args.check_samples:
+        spec = SYMBOL_SPECS[args.symbol]
+        bars, _ = load_bars(resampled, args.symbol, tf, periods[-1][2], periods[-1][2])
+        mismatches = 0
+        for n in random.Random(0).sample(range(len(grid)), min(args.check_samples, len(grid))):
+            for p, (_, from_d, to_d) in enumerate(periods):
+                m1 = resampled.m1.load_range(args.symbol, date_to_ts(from_d), date_to_ts(to_d + dt.timedelta(days=1)))
+                single = [t.profit for t in simulate(bars, m1, grid[n], spec, args.lot)]
+                if abs(sum(single) - metrics[n][p].net_profit) > 0.01 or len(single) != metrics[n][p].total_trades:
+                    mismatches += 1
+        print(f"check: {mismatches} mismatching candidate-periods")
+        if mismatches:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
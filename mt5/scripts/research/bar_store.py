@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import datetime as dt
+import hashlib
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from common import ensure_dir
+from research_db import iter_bar_columns
+
+
+# Columnar layout for one symbol/month partition:
+#   [64-byte header][column 0][column 1]...
+# Every column is a contiguous little-endian array padded to 64 bytes, so a column can be
+# opened directly with numpy.memmap at a fixed offset derived from the row count.
+BAR_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("time", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("tick_volume", "<i8"),
+    ("spread", "<i4"),
+    ("real_volume", "<i8"),
+)
+BAR_MAGIC = b"MT5BARS1"
+HEADER_SIZE = 64
+ALIGN = 64
+PARTITION_SUFFIX = ".bars"
+
+
+def _aligned(n: int) -> int:
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def column_offsets(rows: int) -> Dict[str, int]:
+    offsets: Dict[str, int] = {}
+    pos = HEADER_SIZE
+    for name, dtype in BAR_COLUMNS:
+        offsets[name] = pos
+        pos += _aligned(rows * np.dtype(dtype).itemsize)
+    return offsets
+
+
+def month_start_ts(month: dt.date) -> int:
+    return int(dt.datetime(month.year, month.month, 1, tzinfo=dt.UTC).timestamp())
+
+
+def next_month(month: dt.date) -> dt.date:
+    if month.month == 12:
+        return dt.date(month.year + 1, 1, 1)
+    return dt.date(month.year, month.month + 1, 1)
+
+
+def ts_to_month(ts: int) -> dt.date:
+    d = dt.datetime.fromtimestamp(int(ts), dt.UTC)
+    return dt.date(d.year, d.month, 1)
+
+
+def date_to_ts(d: dt.date) -> int:
+    return int(dt.datetime(d.year, d.month, d.day, tzinfo=dt.UTC).timestamp())
+
+
+@dataclasses.dataclass
+class BarArrays:
+    time: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    tick_volume: np.ndarray
+    spread: np.ndarray
+    real_volume: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.time.shape[0])
+
+    @classmethod
+    def empty(cls) -> "BarArrays":
+        return cls(**{name: np.empty(0, dtype=dtype) for name, dtype in BAR_COLUMNS})
+
+    @classmethod
+    def from_rates(cls, rates) -> "BarArrays":
+        # Accepts the numpy record array returned by MetaTrader5.copy_rates_range.
+        if rates is None or len(rates) == 0:
+            return cls.empty()
+        return cls(**{name: np.ascontiguousarray(rates[name], dtype=dtype) for name, dtype in BAR_COLUMNS})
+
+    @classmethod
+    def concat(cls, parts: List["BarArrays"]) -> "BarArrays":
+        parts = [p for p in parts if len(p) > 0]
+        if not parts:
+            return cls.empty()
+        if len(parts) == 1:
+            return parts[0]
+        return cls(**{name: np.concatenate([getattr(p, name) for p in parts]) for name, _ in BAR_COLUMNS})
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        return {name: getattr(self, name) for name, _ in BAR_COLUMNS}
+
+    def slice(self, start: int, stop: int) -> "BarArrays":
+        return BarArrays(**{name: getattr(self, name)[start:stop] for name, _ in BAR_COLUMNS})
+
+    def take(self, index: np.ndarray) -> "BarArrays":
+        return BarArrays(**{name: getattr(self, name)[index] for name, _ in BAR_COLUMNS})
+
+    def between(self, start_ts: int, end_ts: int) -> "BarArrays":
+        # Half-open [start_ts, end_ts) view; relies on time being sorted.
+        lo = int(np.searchsorted(self.time, start_ts, side="left"))
+        hi = int(np.searchsorted(self.time, end_ts, side="left"))
+        return self.slice(lo, hi)
+
+
+def merge_bars(existing: BarArrays, incoming: BarArrays) -> BarArrays:
+    # Incoming rows win on duplicate timestamps, mirroring the SQLite upsert.
+    if len(existing) == 0:
+        order = np.argsort(incoming.time, kind="stable")
+        merged = incoming.take(order)
+    else:
+        both = BarArrays.concat([incoming, existing])
+        order = np.argsort(both.time, kind="stable")
+        merged = both.take(order)
+    if len(merged) == 0:
+        return merged
+    keep = np.ones(len(merged), dtype=bool)
+    keep[1:] = merged.time[1:] != merged.time[:-1]
+    return merged.take(np.flatnonzero(keep))
+
+
+def partition_digest(bars: BarArrays) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    for name, dtype in BAR_COLUMNS:
+        h.update(np.ascontiguousarray(getattr(bars, name), dtype=dtype).tobytes())
+    return h.digest()
+
+
+def write_partition(path: Path, bars: BarArrays) -> None:
+    rows = len(bars)
+    offsets = column_offsets(rows)
+    header = bytearray(HEADER_SIZE)
+    header[0:8] = BAR_MAGIC
+    header[8:16] = np.int64(rows).tobytes()
+    header[16:32] = partition_digest(bars)
+
+    ensure_dir(path.parent)
+    # Per-process temp name: concurrent writers of one partition each replace it whole.
+    tmp = path.with_name(f"{path.name}.tmp{os.getpid()}")
+    with tmp.open("wb") as f:
+        f.write(bytes(header))
+        for name, dtype in BAR_COLUMNS:
+            f.seek(offsets[name])
+            f.write(np.ascontiguousarray(getattr(bars, name), dtype=dtype).tobytes())
+        end = offsets[BAR_COLUMNS[-1][0]] + _aligned(rows * np.dtype(BAR_COLUMNS[-1][1]).itemsize)
+        f.truncate(end)
+    os.replace(tmp, path)
+
+
+def read_header(path: Path) -> Tuple[int, str]:
+    with path.open("rb") as f:
+        header = f.read(HEADER_SIZE)
+    if len(header) != HEADER_SIZE or header[0:8] != BAR_MAGIC:
+        raise ValueError(f"Not a bar partition file: {path}")
+    rows = int(np.frombuffer(header[8:16], dtype="<i8")[0])
+    return rows, header[16:32].hex()
+
+
+def open_partition(path: Path) -> BarArrays:
+    rows, _ = read_header(path)
+    if rows == 0:
+        return BarArrays.empty()
+    offsets = column_offsets(rows)
+    arrays = {
+        name: np.memmap(path, dtype=dtype, mode="r", offset=offsets[name], shape=(rows,))
+        for name, dtype in BAR_COLUMNS
+    }
+    return BarArrays(**arrays)
+
+
+class BarStore:
+    # One memory-mapped partition file per symbol/timeframe/month under root.
+    def __init__(self, root: Path, timeframe: str = "M1") -> None:
+        self.root = Path(root)
+        self.timeframe = timeframe
+
+    def symbol_dir(self, symbol: str) -> Path:
+        return self.root / symbol / self.timeframe
+
+    def partition_path(self, symbol: str, month: dt.date) -> Path:
+        return self.symbol_dir(symbol) / f"{month.strftime('%Y-%m')}{PARTITION_SUFFIX}"
+
+    def months(self, symbol: str) -> List[dt.date]:
+        sdir = self.symbol_dir(symbol)
+        if not sdir.exists():
+            return []
+        out: List[dt.date] = []
+        for p in sdir.glob(f"*{PARTITION_SUFFIX}"):
+            try:
+                out.append(dt.datetime.strptime(p.stem, "%Y-%m").date())
+            except ValueError:
+                continue
+        return sorted(out)
+
+    def partition_version(self, symbol: str, month: dt.date) -> Optional[str]:
+        path = self.partition_path(symbol, month)
+        if not path.exists():
+            return None
+        return read_header(path)[1]
+
+    def open_month(self, symbol: str, month: dt.date) -> BarArrays:
+        path = self.partition_path(symbol, month)
+        if not path.exists():
+            return BarArrays.empty()
+        return open_partition(path)
+
+    def write(self, symbol: str, bars: BarArrays) -> int:
+        # Splits incoming bars by month and merges each slice into its partition file.
+        if len(bars) == 0:
+            return 0
+        order = np.argsort(bars.time, kind="stable")
+        bars = bars.take(order)
+        written = 0
+        month = ts_to_month(int(bars.time[0]))
+        last_month = ts_to_month(int(bars.time[-1]))
+        while month <= last_month:
+            part = bars.between(month_start_ts(month), month_start_ts(next_month(month)))
+            if len(part) > 0:
+                path = self.partition_path(symbol, month)
+                existing = open_partition(path) if path.exists() else BarArrays.empty()
+                # merge_bars gathers into fresh arrays, so the memmap can be dropped before replacing.
+                merged = merge_bars(existing, part)
+                del existing
+                write_partition(path, merged)
+                written += len(part)
+            month = next_month(month)
+        return written
+
+    def iter_range(self, symbol: str, start_ts: int, end_ts: int) -> Iterator[BarArrays]:
+        # Yields zero-copy memmap views, one per month partition overlapping [start_ts, end_ts).
+        if end_ts <= start_ts:
+            return
+        for month in self.months(symbol):
+            if month_start_ts(next_month(month)) <= start_ts or month_start_ts(month) >= end_ts:
+                continue
+            view = self.open_month(symbol, month).between(start_ts, end_ts)
+            if len(view) > 0:
+                yield view
+
+    def load_range(self, symbol: str, start_ts: int, end_ts: int) -> BarArrays:
+        # Zero-copy when the range falls inside a single partition; otherwise one concatenation.
+        return BarArrays.concat(list(self.iter_range(symbol, start_ts, end_ts)))
+
+    def load_dates(self, symbol: str, from_date: dt.date, to_date: dt.date) -> BarArrays:
+        return self.load_range(symbol, date_to_ts(from_date), date_to_ts(to_date + dt.timedelta(days=1)))
+
+
+def export_sqlite_to_store(
+    conn: sqlite3.Connection,
+    store: BarStore,
+    symbol: str,
+    from_ts: Optional[int] = None,
+    to_ts: Optional[int] = None,
+) -> int:
+    total = 0
+    for cols in iter_bar_columns(conn, symbol, from_ts, to_ts):
+        total += store.write(symbol, BarArrays(**cols))
+    return total
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Export bars_m1 from SQLite into the columnar memmap bar store.")
+    parser.add_argument("--db-path", required=True)
+    parser.add_argument("--store-dir", required=True)
+    parser.add_argument("--symbol", default="XAUUSD")
+    parser.add_argument("--from-date", default="")
+    parser.add_argument("--to-date", default="")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    from_ts = date_to_ts(dt.date.fromisoformat(args.from_date)) if args.from_date else None
+    to_ts = date_to_ts(dt.date.fromisoformat(args.to_date) + dt.timedelta(days=1)) if args.to_date else None
+    store = BarStore(Path(args.store_dir))
+    conn = sqlite3.connect(args.db_path)
+    try:
+        rows = export_sqlite_to_store(conn, store, args.symbol, from_ts, to_ts)
+    finally:
+        conn.close()
+    print(f"Exported {rows} bars for {args.symbol} into {store.symbol_dir(args.symbol)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+import numpy as np
+
+from common import dump_json, utc_now_iso
+from pull_mt5_m1_to_sqlite import insert_rates
+from research_db import create_schema
+
+
+RATES_DTYPE = np.dtype(
+    [
+        ("time", "<i8"),
+        ("open", "<f8"),
+        ("high", "<f8"),
+        ("low", "<f8"),
+        ("close", "<f8"),
+        ("tick_volume", "<u8"),
+        ("spread", "<i4"),
+        ("real_volume", "<u8"),
+    ]
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Microbenchmark M1 insert paths (rows/sec).")
+    parser.add_argument("--bars", type=int, default=200000)
+    parser.add_argument("--chunk-bars", type=int, default=30000)
+    parser.add_argument("--output-json", default="")
+    return parser.parse_args()
+
+
+def synthetic_rates(n: int) -> np.ndarray:
+    rng = np.random.default_rng(7)
+    start = int(dt.datetime(2024, 1, 1, tzinfo=dt.UTC).timestamp())
+    close = 2000.0 + np.cumsum(rng.normal(0.0, 0.4, n))
+    rates = np.empty(n, dtype=RATES_DTYPE)
+    rates["time"] = start + 60 * np.arange(n, dtype=np.int64)
+    rates["open"] = np.r_[close[0], close[:-1]]
+    rates["high"] = np.maximum(rates["open"], close) + rng.random(n)
+    rates["low"] = np.minimum(rates["open"], close) - rng.random(n)
+    rates["close"] = close
+    rates["tick_volume"] = rng.integers(1, 400, n)
+    rates["spread"] = rng.integers(5, 40, n)
+    rates["real_volume"] = 0
+    return rates
+
+
+def legacy_insert_rates(
+    conn: sqlite3.Connection,
+    symbol: str,
+    rates,
+    range_start: dt.datetime,
+    range_end: dt.datetime,
+    source_terminal: str,
+) -> int:
+    # Pre-vectorization path: per-bar datetime/strftime conversion into the v1 TEXT-keyed table.
+    ingested_at = utc_now_iso()
+    rows = []
+    for r in rates:
+        ts_dt = dt.datetime.fromtimestamp(int(r["time"]), dt.UTC)
+        if ts_dt < range_start or ts_dt >= range_end:
+            continue
+        ts = ts_dt.strftime("%Y-%m-%d %H:%M:%S")
+        rows.append(
+            (
+                symbol,
+                ts,
+                float(r["open"]),
+                float(r["high"]),
+                float(r["low"]),
+                float(r["close"]),
+                int(r["tick_volume"]),
+                int(r["spread"]),
+                int(r["real_volume"]),
+                source_terminal,
+                ingested_at,
+            )
+        )
+    if not rows:
+        return 0
+    conn.executemany(
+        """
+        INSERT INTO bars_m1 (
+            symbol, ts_server, open, high, low, close,
+            tick_volume, spread, real_volume, source_terminal, ingested_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(symbol, ts_server) DO UPDATE SET
+            open=excluded.open,
+            high=excluded.high,
+            low=excluded.low,
+            close=excluded.close,
+            tick_volume=excluded.tick_volume,
+            spread=excluded.spread,
+            real_volume=excluded.real_volume,
+            source_terminal=excluded.source_terminal,
+            ingested_at=excluded.ingested_at
+        """,
+        rows,
+    )
+    conn.commit()
+    return len(rows)
+
+
+def create_legacy_schema(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE bars_m1 (
+            symbol TEXT NOT NULL,
+            ts_server TEXT NOT NULL,
+            open REAL NOT NULL,
+            high REAL NOT NULL,
+            low REAL NOT NULL,
+            close REAL NOT NULL,
+            tick_volume INTEGER NOT NULL,
+            spread INTEGER NOT NULL,
+            real_volume INTEGER NOT NULL,
+            source_terminal TEXT NOT NULL,
+            ingested_at TEXT NOT NULL,
+            PRIMARY KEY (symbol, ts_server)
+        )
+        """
+    )
+    conn.execute("CREATE INDEX idx_bars_m1_symbol_ts ON bars_m1(symbol, ts_server)")
+    conn.execute("CREATE INDEX idx_bars_m1_ts ON bars_m1(ts_server)")
+    conn.commit()
+
+
+def time_path(
+    db_path: Path,
+    setup: Callable[[sqlite3.Connection], None],
+    insert: Callable[[sqlite3.Connection, np.ndarray, dt.datetime, dt.datetime], int],
+    rates: np.ndarray,
+    chunk_bars: int,
+) -> Dict[str, float]:
+    conn = sqlite3.connect(db_path)
+    try:
+        setup(conn)
+        rows = 0
+        started = time.perf_counter()
+        for i in range(0, len(rates), chunk_bars):
+            chunk = rates[i : i + chunk_bars]
+            start = dt.datetime.fromtimestamp(int(chunk["time"][0]), dt.UTC)
+            end = dt.datetime.fromtimestamp(int(chunk["time"][-1]) + 60, dt.UTC)
+            rows += insert(conn, chunk, start, end)
+        elapsed = time.perf_counter() - started
+    finally:
+        conn.close()
+    return {"rows": rows, "elapsed_sec": round(elapsed, 4), "rows_per_sec": round(rows / elapsed, 1)}
+
+
+def main() -> None:
+    args = parse_args()
+    rates = synthetic_rates(args.bars)
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {
+            "legacy_row_loop_upsert": time_path(
+                Path(tmp) / "legacy.sqlite",
+                create_legacy_schema,
+                lambda c, r, a, b: legacy_insert_rates(c, "XAUUSD", r, a, b, "bench"),
+                rates,
+                args.chunk_bars,
+            ),
+            "vectorized_upsert": time_path(
+                Path(tmp) / "upsert.sqlite",
+                create_schema,
+                lambda c, r, a, b: insert_rates(c, "XAUUSD", r, a, b),
+                rates,
+                args.chunk_bars,
+            ),
+            "vectorized_append_only": time_path(
+                Path(tmp) / "append.sqlite",
+                create_schema,
+                lambda c, r, a, b: insert_rates(c, "XAUUSD", r, a, b, append_only=True),
+                rates,
+                args.chunk_bars,
+            ),
+        }
+
+    base = results["legacy_row_loop_upsert"]["rows_per_sec"]
+    for name, stats in results.items():
+        print(f"{name:24s} {stats['rows_per_sec']:>12,.0f} rows/sec  ({stats['rows_per_sec'] / base:.2f}x)")
+    if args.output_json:
+        dump_json(
+            Path(args.output_json),
+            {"generated_at": utc_now_iso(), "bars": args.bars, "chunk_bars": args.chunk_bars, "results": results},
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,69 @@
 from __future__ import annotations
 
 import argparse
+import datetime as dt
 import sqlite3
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
+from artifact_cache import DEFAULT_MAX_GB, ArtifactCache, artifact_key, code_version, open_cache
+from bar_store import BarStore, date_to_ts, month_start_ts, next_month
 from common import ensure_dir, utc_now_iso
+from indicators import ADXState, adx, atr, ema, true_range
+from research_db import add_missing_columns, bars_fingerprint, create_schema, iter_bar_columns, write_frame_upsert
+from trading_calendar import DST_MODES, SESSION_NAMES, TradingCalendar, calendar_for
+
+
+# Daily aggregates and EMA/ADX state persisted per day, so later runs can resume without re-reading M1 history.
+STATE_COLUMNS = [
+    "symbol",
+    "day",
+    "open",
+    "high",
+    "low",
+    "close",
+    "ret_std",
+    "sign_changes",
+    "bars",
+    "session_bucket",
+    "ema20",
+    "ema50",
+    "pdi14",
+    "ndi14",
+    "adx14",
+]
+SESSION_STATS = ("high", "low", "range", "volume", "spread")
+# Per-session daily stats, e.g. asia_high, london_range, newyork_volume (tick volume), offhours_spread
+# (mean spread in points). High/low are NULL on days without bars in that session.
+SESSION_STAT_COLUMNS = [f"{name.lower()}_{stat}" for name in SESSION_NAMES for stat in SESSION_STATS]
+DAILY_COLUMNS = ["day", "open", "high", "low", "close", "ret_std", "sign_changes", "bars", "session_bucket"] + SESSION_STAT_COLUMNS
+M1_COLUMNS = ("time", "open", "high", "low", "close", "tick_volume", "spread")
+M1_CHUNK_ROWS = 50000
+EPOCH_DAY = dt.date(1970, 1, 1)
+# ATR14 at day t depends on TR back to t-13 and close at t-14; EMA/ADX resume from persisted state.
+WARMUP_DAYS = 15
+ARTIFACT_KIND = "daily_features"
+# research_db.py and bar_store.py produce the M1 rows the features are built from.
+CODE_VERSION = code_version(
+    *(
+        Path(__file__).with_name(n)
+        for n in ("build_research_features.py", "indicators.py", "trading_calendar.py", "research_db.py", "bar_store.py")
+    )
+)
+FEATURE_COLUMNS = [
+    "symbol",
+    "day",
+    "atr14",
+    "adx14",
+    "range_pct",
+    "session_bucket",
+    "trend_state",
+    "whipsaw_score",
+] + SESSION_STAT_COLUMNS
 
 
 def parse_args() -> argparse.Namespace:
@@ -17,17 +74,416 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--symbol", default="XAUUSD")
     parser.add_argument("--from-date", default="2021-01-01")
     parser.add_argument("--to-date", default="2025-12-31")
+    parser.add_argument(
+        "--bar-store-dir",
+        default="",
+        help="Optional columnar memmap bar store root. When set, M1 bars are read from it instead of bars_m1.",
+    )
+    parser.add_argument(
+        "--dst-mode",
+        choices=DST_MODES,
+        default="ny",
+        help="Broker server clock used for session bucketing; see trading_calendar.py.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Resume from feature_daily_state: only days from the last persisted day onward are rebuilt from M1.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes for the M1 -> daily aggregation, one calendar year each. Requires --bar-store-dir.",
+    )
+    parser.add_argument(
+        "--artifact-cache-dir",
+        default="",
+        help="Shared content-addressed artifact cache; a full build with unchanged inputs is loaded from it.",
+    )
+    parser.add_argument("--cache-max-gb", type=float, default=DEFAULT_MAX_GB, help="LRU size bound for --artifact-cache-dir.")
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="After the build, recompute the whole range from M1 and fail unless every feature matches exactly.",
+    )
     return parser.parse_args()
 
 
-def classify_session(hour: int) -> str:
-    if 0 <= hour <= 8:
-        return "ASIA"
-    if 9 <= hour <= 15:
-        return "LONDON"
-    if 16 <= hour <= 22:
-        return "NEWYORK"
-    return "OFFHOURS"
+def iter_m1_chunks(
+    conn: sqlite3.Connection,
+    args: argparse.Namespace,
+    from_day: dt.date,
+    to_day: dt.date,
+) -> Iterator[Dict[str, np.ndarray]]:
+    # Month partitions from the bar store, or fixed-size row chunks from bars_m1.
+    from_ts = date_to_ts(from_day)
+    to_ts = date_to_ts(to_day + dt.timedelta(days=1))
+    if args.bar_store_dir:
+        for part in BarStore(Path(args.bar_store_dir)).iter_range(args.symbol, from_ts, to_ts):
+            yield {name: np.asarray(getattr(part, name)) for name in M1_COLUMNS}
+    else:
+        yield from iter_bar_columns(conn, args.symbol, from_ts, to_ts, columns=M1_COLUMNS[1:], chunk_rows=M1_CHUNK_ROWS)
+
+
+def group_std(values: np.ndarray, starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    # Sample std per contiguous group using the same Welford update order as pandas' groupby std,
+    # vectorized across groups and looping over the position inside the group (<= 1440 for M1 days).
+    mean = np.zeros(len(starts))
+    m2 = np.zeros(len(starts))
+    for k in range(int(counts.max()) if len(counts) else 0):
+        active = np.flatnonzero(counts > k)
+        val = values[starts[active] + k]
+        old = mean[active]
+        new = old + (val - old) / float(k + 1)
+        mean[active] = new
+        m2[active] += (val - new) * (val - old)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = np.sqrt(m2 / (counts - 1))
+    out[counts <= 1] = 0.0
+    return out
+
+
+def aggregate_chunk(
+    cols: Dict[str, np.ndarray],
+    session_code: np.ndarray,
+    prev_close: Optional[float],
+    prev_up: Optional[bool],
+) -> Tuple[pd.DataFrame, float, bool]:
+    # Whole days of M1 -> daily OHLC, return noise and widest session. prev_close/prev_up are the
+    # close and return direction of the bar just before this chunk (None at the range start);
+    # the same pair for the chunk's last bar is returned alongside the daily rows.
+    close = cols["close"]
+    ret = np.empty(len(close))
+    ret[0] = close[0] / prev_close - 1.0 if prev_close is not None else 0.0
+    ret[1:] = close[1:] / close[:-1] - 1.0
+    up = ret > 0
+    sign_change = np.empty(len(close), dtype=np.int64)
+    sign_change[0] = int(prev_up is not None and up[0] != prev_up)
+    sign_change[1:] = up[1:] != up[:-1]
+
+    day = cols["time"] // 86400
+    starts = np.flatnonzero(np.r_[True, day[1:] != day[:-1]])
+    counts = np.diff(np.r_[starts, len(day)])
+    day_idx = np.repeat(np.arange(len(starts)), counts)
+
+    # Segmented reductions over runs of equal (day, session); a day has only a handful of runs, so
+    # folding runs into the (day, session) grid with ufunc.at touches a few values per day.
+    runs = np.flatnonzero(np.r_[True, (day[1:] != day[:-1]) | (session_code[1:] != session_code[:-1])])
+    cell = (day_idx[runs], session_code[runs])
+    shape = (len(starts), len(SESSION_NAMES))
+    session_high = np.full(shape, -np.inf)
+    session_low = np.full(shape, np.inf)
+    session_volume = np.zeros(shape)
+    session_spread = np.zeros(shape)
+    session_bars = np.zeros(shape)
+    np.maximum.at(session_high, cell, np.maximum.reduceat(cols["high"], runs))
+    np.minimum.at(session_low, cell, np.minimum.reduceat(cols["low"], runs))
+    np.add.at(session_volume, cell, np.add.reduceat(cols["tick_volume"].astype(np.float64), runs))
+    np.add.at(session_spread, cell, np.add.reduceat(cols["spread"].astype(np.float64), runs))
+    np.add.at(session_bars, cell, np.diff(np.r_[runs, len(day)]))
+    present = session_bars > 0
+    session_range = np.where(present, session_high - session_low, 0.0)
+    stats = {
+        "high": np.where(present, session_high, np.nan),
+        "low": np.where(present, session_low, np.nan),
+        "range": session_range,
+        "volume": session_volume,
+        "spread": np.divide(session_spread, session_bars, out=np.zeros(shape), where=present),
+    }
+
+    daily = pd.DataFrame(
+        {
+            "day": [EPOCH_DAY + dt.timedelta(days=int(d)) for d in day[starts]],
+            "open": cols["open"][starts],
+            "high": np.maximum.reduceat(cols["high"], starts),
+            "low": np.minimum.reduceat(cols["low"], starts),
+            "close": close[starts + counts - 1],
+            "ret_std": group_std(ret, starts, counts),
+            "sign_changes": np.add.reduceat(sign_change, starts),
+            "bars": counts,
+            "session_bucket": np.asarray(SESSION_NAMES, dtype=object)[session_range.argmax(axis=1)],
+            **{
+                f"{name.lower()}_{stat}": stats[stat][:, k]
+                for k, name in enumerate(SESSION_NAMES)
+                for stat in SESSION_STATS
+            },
+        }
+    )
+    return daily, float(close[-1]), bool(up[-1])
+
+
+def iter_daily_aggregates(
+    chunks: Iterator[Dict[str, np.ndarray]],
+    calendar: TradingCalendar,
+    prev_close: Optional[float] = None,
+    prev_up: Optional[bool] = None,
+) -> Iterator[pd.DataFrame]:
+    # Streams M1 chunks into daily aggregates. Only the last (possibly incomplete) day of each
+    # chunk plus the previous close/return direction cross a chunk boundary, so peak memory is
+    # one chunk regardless of the range length.
+    pending: Optional[Dict[str, np.ndarray]] = None
+    for chunk in chunks:
+        if len(chunk["time"]) == 0:
+            continue
+        cols = chunk if pending is None else {k: np.concatenate([pending[k], chunk[k]]) for k in M1_COLUMNS}
+        day = cols["time"] // 86400
+        tail = int(np.searchsorted(day, day[-1], side="left"))
+        if tail > 0:
+            done = {k: v[:tail] for k, v in cols.items()}
+            daily, prev_close, prev_up = aggregate_chunk(
+                done, calendar.session_codes(done["time"]), prev_close, prev_up
+            )
+            yield daily
+        pending = {k: np.array(v[tail:]) for k, v in cols.items()}
+    if pending is not None:
+        yield aggregate_chunk(pending, calendar.session_codes(pending["time"]), prev_close, prev_up)[0]
+
+
+def aggregate_daily(
+    conn: sqlite3.Connection,
+    args: argparse.Namespace,
+    from_day: dt.date,
+    to_day: dt.date,
+) -> pd.DataFrame:
+    if args.workers > 1 and args.bar_store_dir:
+        return aggregate_daily_parallel(args, from_day, to_day)
+    calendar = calendar_for(args.symbol, args.dst_mode)
+    parts = list(iter_daily_aggregates(iter_m1_chunks(conn, args, from_day, to_day), calendar))
+    if not parts:
+        return pd.DataFrame(columns=DAILY_COLUMNS)
+    return pd.concat(parts, ignore_index=True)
+
+
+def carry_before(store: BarStore, symbol: str, from_ts: int, boundary_ts: int) -> Tuple[Optional[float], Optional[bool]]:
+    # (close, return direction) of the last bar in [from_ts, boundary_ts): exactly what a serial
+    # pass would carry into the first bar at boundary_ts. Reads at most a couple of partitions.
+    closes = np.empty(0)
+    for month in reversed(store.months(symbol)):
+        if month_start_ts(month) >= boundary_ts:
+            continue
+        if month_start_ts(next_month(month)) <= from_ts or len(closes) >= 2:
+            break
+        part = store.open_month(symbol, month).between(from_ts, boundary_ts)
+        closes = np.concatenate([np.asarray(part.close[-2:]), closes])
+    if len(closes) == 0:
+        return None, None
+    if len(closes) == 1:
+        return float(closes[-1]), False
+    return float(closes[-1]), bool(closes[-1] / closes[-2] - 1.0 > 0)
+
+
+def aggregate_partition(
+    store_dir: str,
+    symbol: str,
+    dst_mode: str,
+    from_day: dt.date,
+    to_day: dt.date,
+    prev_close: Optional[float],
+    prev_up: Optional[bool],
+) -> pd.DataFrame:
+    # Process-pool worker: memory-maps its own slice of the bar store, so only the small daily
+    # frame travels back through pickle.
+    store = BarStore(Path(store_dir))
+    chunks = (
+        {name: np.asarray(getattr(part, name)) for name in M1_COLUMNS}
+        for part in store.iter_range(symbol, date_to_ts(from_day), date_to_ts(to_day + dt.timedelta(days=1)))
+    )
+    parts = list(iter_daily_aggregates(chunks, calendar_for(symbol, dst_mode), prev_close, prev_up))
+    if not parts:
+        return pd.DataFrame(columns=DAILY_COLUMNS)
+    return pd.concat(parts, ignore_index=True)
+
+
+def year_partitions(from_day: dt.date, to_day: dt.date) -> List[Tuple[dt.date, dt.date]]:
+    return [
+        (max(from_day, dt.date(year, 1, 1)), min(to_day, dt.date(year, 12, 31)))
+        for year in range(from_day.year, to_day.year + 1)
+    ]
+
+
+def aggregate_daily_parallel(args: argparse.Namespace, from_day: dt.date, to_day: dt.date) -> pd.DataFrame:
+    # Years are independent once each gets the close/direction carried from the bar before it;
+    # results are concatenated in year order, so the frame equals the serial one.
+    store = BarStore(Path(args.bar_store_dir))
+    from_ts = date_to_ts(from_day)
+    partitions = year_partitions(from_day, to_day)
+    carries = [carry_before(store, args.symbol, from_ts, date_to_ts(start)) for start, _ in partitions]
+    with ProcessPoolExecutor(max_workers=min(args.workers, len(partitions))) as pool:
+        futures = [
+            pool.submit(aggregate_partition, args.bar_store_dir, args.symbol, args.dst_mode, start, end, *carry)
+            for (start, end), carry in zip(partitions, carries)
+        ]
+        parts = [f.result() for f in futures]
+    parts = [p for p in parts if not p.empty]
+    if not parts:
+        return pd.DataFrame(columns=DAILY_COLUMNS)
+    return pd.concat(parts, ignore_index=True)
+
+
+def daily_indicators(
+    daily: pd.DataFrame,
+    carry: Optional[pd.Series] = None,
+) -> pd.DataFrame:
+    # ATR/ADX (MT5 iATR/iADX), EMA20/50 trend state and whipsaw score over the daily aggregates.
+    # carry is the persisted state row of the day before daily's first row; EMAs and ADX resume from it.
+    daily = daily.copy()
+    daily["range_abs"] = daily["high"] - daily["low"]
+    daily["range_pct"] = (daily["range_abs"] / daily["close"].replace(0, pd.NA)).fillna(0.0) * 100.0
+
+    high = daily["high"].to_numpy(dtype=float)
+    low = daily["low"].to_numpy(dtype=float)
+    close = daily["close"].to_numpy(dtype=float)
+    daily["tr"] = true_range(high, low, close)
+    # Partial windows over the first 13 days instead of iATR's warm-up gap, so every day has a value.
+    daily["atr14"] = atr(high, low, close, 14, min_periods=1)
+
+    adx_state = ADXState(14)
+    if carry is not None:
+        adx_state.prev = (float(carry["high"]), float(carry["low"]), float(carry["close"]))
+        adx_state.pdi, adx_state.ndi, adx_state.adx = float(carry["pdi14"]), float(carry["ndi14"]), float(carry["adx14"])
+    daily["adx14"], daily["pdi14"], daily["ndi14"] = adx(high, low, close, 14, state=adx_state)
+
+    for col, span in (("ema20", 20), ("ema50", 50)):
+        daily[col] = ema(close, span, seed=None if carry is None else float(carry[col]))
+    daily["trend_state"] = "RANGE"
+    daily.loc[daily["ema20"] > daily["ema50"], "trend_state"] = "UP"
+    daily.loc[daily["ema20"] < daily["ema50"], "trend_state"] = "DOWN"
+
+    daily["whipsaw_score"] = (
+        (daily["sign_changes"] / daily["bars"].replace(0, pd.NA)).fillna(0.0) * 10000.0
+        + daily["ret_std"] * 100000.0
+    )
+    return daily
+
+
+def build_full(conn: sqlite3.Connection, args: argparse.Namespace, from_day: dt.date, to_day: dt.date) -> pd.DataFrame:
+    daily = aggregate_daily(conn, args, from_day, to_day)
+    if daily.empty:
+        raise RuntimeError("No bars found for requested symbol/date range.")
+    features = daily_indicators(daily)
+    features["symbol"] = args.symbol
+    return features
+
+
+def input_fingerprint(conn: sqlite3.Connection, args: argparse.Namespace, from_day: dt.date, to_day: dt.date) -> Dict[str, object]:
+    from_ts = date_to_ts(from_day)
+    to_ts = date_to_ts(to_day + dt.timedelta(days=1))
+    if args.bar_store_dir:
+        store = BarStore(Path(args.bar_store_dir))
+        return {
+            m.strftime("%Y-%m"): store.partition_version(args.symbol, m)
+            for m in store.months(args.symbol)
+            if month_start_ts(next_month(m)) > from_ts and month_start_ts(m) < to_ts
+        }
+    return bars_fingerprint(conn, args.symbol, from_ts, to_ts)
+
+
+def build_full_cached(
+    conn: sqlite3.Connection,
+    args: argparse.Namespace,
+    from_day: dt.date,
+    to_day: dt.date,
+    cache: ArtifactCache,
+) -> Tuple[pd.DataFrame, bool]:
+    # Returns (features, cache hit). The frame is pickled, so the pandas version is part of the key.
+    params = {"symbol": args.symbol, "from": from_day, "to": to_day, "dst_mode": args.dst_mode, "pandas": pd.__version__}
+    key = artifact_key(ARTIFACT_KIND, params, input_fingerprint(conn, args, from_day, to_day), CODE_VERSION)
+
+    def write(tmp: Path) -> Dict[str, object]:
+        features = build_full(conn, args, from_day, to_day)
+        features.to_pickle(tmp / "features.pkl")
+        return {"symbol": args.symbol, "from": from_day.isoformat(), "to": to_day.isoformat(), "rows": len(features)}
+
+    entry, hit = cache.get_or_build(key, ARTIFACT_KIND, write)
+    return pd.read_pickle(entry / "features.pkl"), hit
+
+
+def load_state(conn: sqlite3.Connection, symbol: str, to_day: dt.date) -> pd.DataFrame:
+    state = pd.read_sql_query(
+        f"SELECT {', '.join(STATE_COLUMNS)} FROM feature_daily_state WHERE symbol = ? AND day <= ? ORDER BY day",
+        conn,
+        params=(symbol, to_day.isoformat()),
+    )
+    state["day"] = pd.to_datetime(state["day"]).dt.date
+    return state
+
+
+def build_incremental(
+    conn: sqlite3.Connection,
+    args: argparse.Namespace,
+    from_day: dt.date,
+    to_day: dt.date,
+) -> Tuple[pd.DataFrame, Optional[dt.date]]:
+    # Returns (features for rebuilt days, first rebuilt day); falls back to a full build when no
+    # state exists or the persisted series was anchored at a different --from-date.
+    state = load_state(conn, args.symbol, to_day)
+    anchored = len(state) >= 3 and state["day"].iloc[0] >= from_day
+    if anchored and state["day"].iloc[0] > from_day:
+        before = iter_m1_chunks(conn, args, from_day, state["day"].iloc[0] - dt.timedelta(days=1))
+        anchored = next(before, None) is None
+    if not anchored:
+        return build_full(conn, args, from_day, to_day), None
+
+    # The last persisted day may have been partial, so it is rebuilt; two earlier days of M1
+    # give its first bar the same previous close and return sign as in a full run.
+    resume_day = state["day"].iloc[-1]
+    daily = aggregate_daily(conn, args, state["day"].iloc[-3], to_day)
+    daily = daily[daily["day"] >= resume_day]
+
+    warm = state[state["day"] < resume_day].tail(WARMUP_DAYS)
+    # Session stats are not persisted in the state; warm-up rows only feed the ATR window.
+    history = pd.concat([warm.reindex(columns=daily.columns), daily], ignore_index=True)
+    # Warm-up rows reach back to the range start when fewer than WARMUP_DAYS exist, so partial
+    # windows line up with the full run; EMAs and ADX resume from the last warm-up day's state.
+    features = daily_indicators(history)
+    new = features.iloc[len(warm) :].reset_index(drop=True)
+    resumed = daily_indicators(daily.reset_index(drop=True), carry=warm.iloc[-1])
+    cols = ["ema20", "ema50", "trend_state", "adx14", "pdi14", "ndi14"]
+    new[cols] = resumed[cols]
+    new["symbol"] = args.symbol
+    return new, resume_day
+
+
+def save_state(conn: sqlite3.Connection, features: pd.DataFrame, symbol: str, replace: bool) -> None:
+    if replace:
+        with conn:
+            conn.execute("DELETE FROM feature_daily_state WHERE symbol = ?", (symbol,))
+    write_frame_upsert(conn, "feature_daily_state", features[STATE_COLUMNS], keys=("symbol", "day"))
+
+
+def read_features(conn: sqlite3.Connection, symbol: str, from_day: dt.date, to_day: dt.date) -> pd.DataFrame:
+    return pd.read_sql_query(
+        f"SELECT {', '.join(FEATURE_COLUMNS)} FROM feature_regime_daily WHERE symbol = ? AND day >= ? AND day <= ? ORDER BY day",
+        conn,
+        params=(symbol, from_day.isoformat(), to_day.isoformat()),
+    )
+
+
+def verify_against_full(
+    conn: sqlite3.Connection,
+    args: argparse.Namespace,
+    from_day: dt.date,
+    to_day: dt.date,
+) -> int:
+    # Exact comparison of the persisted features with an in-memory full recompute.
+    expected = build_full(conn, args, from_day, to_day)
+    expected["day"] = expected["day"].astype(str)
+    expected = expected[FEATURE_COLUMNS].reset_index(drop=True)
+    actual = read_features(conn, args.symbol, from_day, to_day)
+    if len(actual) != len(expected):
+        raise RuntimeError(f"Verify failed: {len(actual)} persisted days vs {len(expected)} recomputed.")
+    for col in FEATURE_COLUMNS:
+        a = actual[col].to_numpy()
+        b = expected[col].to_numpy()
+        bad = np.flatnonzero((a != b) & ~(pd.isna(a) & pd.isna(b)))
+        if bad.size:
+            i = int(bad[0])
+            raise RuntimeError(
+                f"Verify failed: {col} differs on {bad.size} days, first {expected['day'].iloc[i]}: "
+                f"{a[i]!r} vs {b[i]!r}"
+            )
+    return len(expected)
 
 
 def main() -> None:
@@ -40,134 +496,34 @@ def main() -> None:
     if not db_path.exists():
         raise FileNotFoundError(f"SQLite database not found: {db_path}")
 
+    from_day = dt.date.fromisoformat(args.from_date)
+    to_day = dt.date.fromisoformat(args.to_date)
+    if args.workers > 1 and not args.bar_store_dir:
+        raise ValueError("--workers > 1 needs --bar-store-dir: workers memory-map the bar store instead of sharing SQLite.")
     conn = sqlite3.connect(db_path)
     try:
-        df = pd.read_sql_query(
-            """
-            SELECT ts_server, open, high, low, close
-            FROM bars_m1
-            WHERE symbol = ?
-              AND ts_server >= ?
-              AND ts_server <= ?
-            ORDER BY ts_server
-            """,
+        create_schema(conn)
+        add_missing_columns(conn, "feature_regime_daily", [(c, "REAL") for c in SESSION_STAT_COLUMNS])
+        resume_day: Optional[dt.date] = None
+        cache = open_cache(args.artifact_cache_dir, args.cache_max_gb)
+        cache_hit = False
+        if args.incremental:
+            new, resume_day = build_incremental(conn, args, from_day, to_day)
+        elif cache is not None:
+            new, cache_hit = build_full_cached(conn, args, from_day, to_day, cache)
+        else:
+            new = build_full(conn, args, from_day, to_day)
+        save_state(conn, new, args.symbol, replace=resume_day is None)
+        write_frame_upsert(
             conn,
-            params=(args.symbol, f"{args.from_date} 00:00:00", f"{args.to_date} 23:59:59"),
-        )
-        if df.empty:
-            raise RuntimeError("No bars found for requested symbol/date range.")
-
-        df["ts_server"] = pd.to_datetime(df["ts_server"], utc=False)
-        df["day"] = df["ts_server"].dt.date
-        df["hour"] = df["ts_server"].dt.hour
-        df["ret"] = df["close"].pct_change().fillna(0.0)
-        df["ret_sign_change"] = ((df["ret"] > 0).astype(int).diff().abs() > 0).astype(int)
-        df["session"] = df["hour"].map(classify_session)
-
-        daily = (
-            df.groupby("day")
-            .agg(
-                open=("open", "first"),
-                high=("high", "max"),
-                low=("low", "min"),
-                close=("close", "last"),
-                ret_std=("ret", "std"),
-                sign_changes=("ret_sign_change", "sum"),
-                bars=("close", "count"),
-            )
-            .reset_index()
-        )
-        daily["ret_std"] = daily["ret_std"].fillna(0.0)
-        daily["range_abs"] = daily["high"] - daily["low"]
-        daily["range_pct"] = (daily["range_abs"] / daily["close"].replace(0, pd.NA)).fillna(0.0) * 100.0
-
-        daily["prev_close"] = daily["close"].shift(1)
-        tr_1 = daily["high"] - daily["low"]
-        tr_2 = (daily["high"] - daily["prev_close"]).abs()
-        tr_3 = (daily["low"] - daily["prev_close"]).abs()
-        daily["tr"] = pd.concat([tr_1, tr_2, tr_3], axis=1).max(axis=1)
-        daily["atr14"] = daily["tr"].rolling(14, min_periods=1).mean()
-
-        up_move = daily["high"].diff()
-        down_move = -daily["low"].diff()
-        plus_dm = up_move.where((up_move > down_move) & (up_move > 0), 0.0)
-        minus_dm = down_move.where((down_move > up_move) & (down_move > 0), 0.0)
-        atr = daily["atr14"].replace(0, pd.NA)
-        plus_di = 100.0 * plus_dm.rolling(14, min_periods=1).sum() / atr
-        minus_di = 100.0 * minus_dm.rolling(14, min_periods=1).sum() / atr
-        dx = (100.0 * (plus_di - minus_di).abs() / (plus_di + minus_di).replace(0, pd.NA)).fillna(0.0)
-        daily["adx14"] = dx.rolling(14, min_periods=1).mean().fillna(0.0)
-
-        daily["ema20"] = daily["close"].ewm(span=20, adjust=False).mean()
-        daily["ema50"] = daily["close"].ewm(span=50, adjust=False).mean()
-        daily["trend_state"] = "RANGE"
-        daily.loc[daily["ema20"] > daily["ema50"], "trend_state"] = "UP"
-        daily.loc[daily["ema20"] < daily["ema50"], "trend_state"] = "DOWN"
-
-        daily["whipsaw_score"] = (
-            (daily["sign_changes"] / daily["bars"].replace(0, pd.NA)).fillna(0.0) * 10000.0
-            + daily["ret_std"] * 100000.0
+            "feature_regime_daily",
+            new[FEATURE_COLUMNS],
+            keys=("symbol", "day"),
         )
-
-        session_ranges = (
-            df.groupby(["day", "session"])
-            .agg(session_high=("high", "max"), session_low=("low", "min"))
-            .reset_index()
-        )
-        session_ranges["session_range"] = session_ranges["session_high"] - session_ranges["session_low"]
-        session_pivot = session_ranges.pivot(index="day", columns="session", values="session_range").fillna(0.0)
-        session_pivot["session_bucket"] = session_pivot.idxmax(axis=1)
-        session_bucket = session_pivot["session_bucket"].reset_index()
-
-        features = daily.merge(session_bucket, on="day", how="left")
-        features["session_bucket"] = features["session_bucket"].fillna("OFFHOURS")
-        features["symbol"] = args.symbol
-
-        upserts = []
-        for _, row in features.iterrows():
-            upserts.append(
-                (
-                    row["symbol"],
-                    str(row["day"]),
-                    float(row["atr14"]),
-                    float(row["adx14"]),
-                    float(row["range_pct"]),
-                    str(row["session_bucket"]),
-                    str(row["trend_state"]),
-                    float(row["whipsaw_score"]),
-                )
-            )
-
-        conn.executemany(
-            """
-            INSERT INTO feature_regime_daily (
-                symbol, day, atr14, adx14, range_pct, session_bucket, trend_state, whipsaw_score
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(symbol, day) DO UPDATE SET
-                atr14=excluded.atr14,
-                adx14=excluded.adx14,
-                range_pct=excluded.range_pct,
-                session_bucket=excluded.session_bucket,
-                trend_state=excluded.trend_state,
-                whipsaw_score=excluded.whipsaw_score
-            """,
-            upserts,
-        )
-        conn.commit()
+        features = new if resume_day is None else read_features(conn, args.symbol, from_day, to_day)
 
         features_out = summaries_dir / "regime_overview.csv"
-        features[
-            [
-                "symbol",
-                "day",
-                "atr14",
-                "adx14",
-                "range_pct",
-                "session_bucket",
-                "trend_state",
-                "whipsaw_score",
-            ]
-        ].to_csv(features_out, index=False)
+        features[FEATURE_COLUMNS].to_csv(features_out, index=False)
 
         profile_out = summaries_dir / "regime_profile_summary.csv"
         profile = (
@@ -183,11 +539,17 @@ def main() -> None:
         )
         profile.to_csv(profile_out, index=False)
 
+        verified = verify_against_full(conn, args, from_day, to_day) if args.verify else 0
+
         (logs_dir / "build_research_features.log").write_text(
-            f"generated_at={utc_now_iso()}\nrows={len(features)}\nregime_overview={features_out}\n",
+            f"generated_at={utc_now_iso()}\nrows={len(features)}\nrebuilt_days={len(new)}\n"
+            f"resumed_from={resume_day or ''}\nartifact_cache_hit={int(cache_hit)}\nverified_days={verified}\nregime_overview={features_out}\n",
             encoding="utf-8",
         )
-        print(f"Feature build complete. Rows: {len(features)}")
+        source = "from artifact cache" if cache_hit else f"rebuilt {len(new)}"
+        print(f"Feature build complete. Rows: {len(features)} ({source})")
+        if args.verify:
+            print(f"Verify: {verified} days match a full recompute exactly")
         print(f"Daily feature CSV: {features_out}")
         print(f"Profile CSV: {profile_out}")
     finally:
@@ -167,6 +167,134 @@ def parse_mt5_report(path: Path) -> ReportMetrics:
     )
 
 
+@dataclasses.dataclass
+class ReportSettings:
+    expert: str
+    symbol: str
+    timeframe: str
+    from_date: dt.date
+    to_date: dt.date
+    deposit: float
+    inputs: Dict[str, str]
+
+
+def parse_report_settings(path: Path) -> Optional[ReportSettings]:
+    # The Settings block of a tester report: expert, symbol, "H1 (2023.01.01 - 2023.12.31)" and one
+    # "Name=value" row per non-default input between "Inputs:" and "Company:".
+    if not path.exists():
+        return None
+    text = decode_text(path.read_bytes())
+    period = extract_first_metric(text, "Period:") or ""
+    match = re.match(r"(\w+)\s*\((\d{4}\.\d{2}\.\d{2})\s*-\s*(\d{4}\.\d{2}\.\d{2})\)", period)
+    if not match:
+        return None
+    inputs: Dict[str, str] = {}
+    block = re.search(r"Inputs:(.*?)Company:", text, flags=re.IGNORECASE | re.DOTALL)
+    if block:
+        for name, value in re.findall(r"<b>\s*(\w+)=(.*?)\s*</b>", block.group(1)):
+            inputs[name] = value
+    return ReportSettings(
+        expert=extract_first_metric(text, "Expert:") or "",
+        symbol=extract_first_metric(text, "Symbol:") or "",
+        timeframe=match.group(1),
+        from_date=dt.datetime.strptime(match.group(2), "%Y.%m.%d").date(),
+        to_date=dt.datetime.strptime(match.group(3), "%Y.%m.%d").date(),
+        deposit=parse_float(extract_first_metric(text, "Initial Deposit:") or "0"),
+        inputs=inputs,
+    )
+
+
+@dataclasses.dataclass
+class ReportDeal:
+    time: dt.datetime
+    deal: int
+    symbol: str
+    type: str
+    direction: str
+    volume: float
+    price: float
+    commission: float
+    swap: float
+    profit: float
+    balance: float
+    comment: str
+
+
+def parse_report_deals(path: Path) -> List[ReportDeal]:
+    # The Deals table at the end of a tester report: one 13-cell row per deal, including the
+    # initial "balance" deal. Times are broker server time.
+    if not path.exists():
+        return []
+    text = decode_text(path.read_bytes())
+    start = text.find("<b>Deals</b>")
+    if start < 0:
+        return []
+    out: List[ReportDeal] = []
+    for row in re.findall(r"<tr[^>]*>(.*?)</tr>", text[start:], flags=re.DOTALL):
+        cells = [c.strip() for c in re.findall(r"<td[^>]*>(.*?)</td>", row, flags=re.DOTALL)]
+        if len(cells) != 13 or not re.match(r"\d{4}\.\d{2}\.\d{2} ", cells[0]):
+            continue
+        out.append(
+            ReportDeal(
+                time=dt.datetime.strptime(cells[0], "%Y.%m.%d %H:%M:%S"),
+                deal=int(parse_float(cells[1])),
+                symbol=cells[2],
+                type=cells[3],
+                direction=cells[4],
+                volume=parse_float(cells[5]),
+                price=parse_float(cells[6]),
+                commission=parse_float(cells[8]),
+                swap=parse_float(cells[9]),
+                profit=parse_float(cells[10]),
+                balance=parse_float(cells[11]),
+                comment=cells[12],
+            )
+        )
+    return out
+
+
+def parse_ini_settings(path: Path) -> Optional[Tuple[str, ReportSettings]]:
+    # A tester .ini as written by write_ini_file: returns the Report= basename it produces and the
+    # run's settings. [TesterInputs] lines are "Name=value||start||step||stop||Y/N".
+    if not path.exists():
+        return None
+    section = ""
+    tester: Dict[str, str] = {}
+    inputs: Dict[str, str] = {}
+    for line in decode_text(path.read_bytes()).lstrip("\ufeff").splitlines():
+        line = line.strip()
+        if not line or line.startswith(";"):
+            continue
+        if line.startswith("[") and line.endswith("]"):
+            section = line[1:-1].strip().lower()
+            continue
+        name, sep, value = line.partition("=")
+        if not sep:
+            continue
+        if section == "tester":
+            tester[name.strip()] = value.strip()
+        elif section == "testerinputs":
+            inputs[name.strip()] = value.split("||")[0].strip()
+    try:
+        from_date = dt.datetime.strptime(tester["FromDate"], "%Y.%m.%d").date()
+        to_date = dt.datetime.strptime(tester["ToDate"], "%Y.%m.%d").date()
+    except (KeyError, ValueError):
+        return None
+    # Expert= and Report= may carry a folder prefix; Expert= also carries the .ex5 suffix.
+    expert = re.split(r"[\\/]", tester.get("Expert", ""))[-1]
+    report = re.split(r"[\\/]", tester.get("Report", ""))[-1]
+    settings = ReportSettings(
+        expert=re.sub(r"\.ex5$", "", expert, flags=re.IGNORECASE),
+        symbol=tester.get("Symbol", ""),
+        timeframe=tester.get("Period", ""),
+        from_date=from_date,
+        to_date=to_date,
+        deposit=parse_float(tester.get("Deposit", "0")),
+        inputs=inputs,
+    )
+    return re.sub(r"\.html?$", "", report, flags=re.IGNORECASE), settings
+
+
 def reason_for_gross_loss(m: ReportMetrics) -> str:
     if m.status != "OK":
         return "ParseError or missing report."
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import datetime as dt
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from backtest_ema_research import (
+    EA_DEFAULTS,
+    SYMBOL_SPECS,
+    SymbolSpec,
+    Trade,
+    add_exit_args,
+    exit_params_from_args,
+    load_bars,
+    profit_metrics,
+    simulate,
+)
+from bar_store import BarArrays, BarStore
+from common import ReportMetrics
+from position_manager import ExitParams
+from resample_bars import ResampledStore
+from run_strategy_search import Candidate
+
+
+SLIPPAGE_KINDS = ("none", "fixed", "uniform", "exponential")
+# Exits that fill at the order's own price; everything else (stops, time/Friday/signal closes, the
+# end of the test) is a market fill and slips like the entry does.
+LIMIT_EXITS = ("tp",)
+
+
+@dataclasses.dataclass(frozen=True)
+class CostModel:
+    # Spread: the recorded M1 spread is scaled and shifted before the run, so entries, exits and
+    # short-side stop triggers all see it. Commission is CommissionPerLotRT per lot, charged once
+    # per trade. Slippage is adverse only, in points per market fill: "fixed" is slippage_points
+    # every time, "uniform" is U(0, 2 * slippage_points), "exponential" has mean slippage_points.
+    spread_mult: float = 1.0
+    spread_add_points: float = 0.0
+    commission_per_lot_rt: float = 0.0
+    slippage: str = "none"
+    slippage_points: float = 0.0
+    seed: int = 7
+
+    def __post_init__(self) -> None:
+        if self.slippage not in SLIPPAGE_KINDS:
+            raise ValueError(f"Unknown slippage kind: {self.slippage}")
+
+    @property
+    def changes_spread(self) -> bool:
+        return self.spread_mult != 1.0 or self.spread_add_points != 0.0
+
+
+# Named scenarios for --scenarios; "base" is the plain run the others are compared against.
+SCENARIOS: Dict[str, CostModel] = {
+    "base": CostModel(),
+    "commission": CostModel(commission_per_lot_rt=7.0),
+    "spread_x1.5": CostModel(spread_mult=1.5, commission_per_lot_rt=7.0),
+    "spread_x2": CostModel(spread_mult=2.0, commission_per_lot_rt=7.0),
+    "slippage": CostModel(commission_per_lot_rt=7.0, slippage="exponential", slippage_points=10.0),
+    "stress": CostModel(spread_mult=1.5, commission_per_lot_rt=7.0, slippage="exponential", slippage_points=10.0),
+}
+
+
+def with_spread(m1: BarArrays, model: CostModel) -> BarArrays:
+    if not model.changes_spread:
+        return m1
+    spread = np.rint(np.asarray(m1.spread, dtype=np.float64) * model.spread_mult + model.spread_add_points)
+    return dataclasses.replace(m1, spread=np.maximum(spread, 0.0).astype(m1.spread.dtype))
+
+
+def slippage_points(model: CostModel, fills: int, rng: np.random.Generator) -> np.ndarray:
+    if model.slippage == "none" or model.slippage_points <= 0.0:
+        return np.zeros(fills)
+    if model.slippage == "fixed":
+        return np.full(fills, model.slippage_points)
+    if model.slippage == "uniform":
+        return rng.uniform(0.0, 2.0 * model.slippage_points, fills)
+    return rng.exponential(model.slippage_points, fills)
+
+
+def trade_costs(
+    exit_reasons: Sequence[str],
+    spec: SymbolSpec,
+    lot: float,
+    model: CostModel,
+) -> np.ndarray:
+    # Money charged per trade on top of the simulated P&L: commission plus entry and exit slippage.
+    n = len(exit_reasons)
+    rng = np.random.default_rng(model.seed)
+    market_exit = ~np.isin(np.asarray(exit_reasons, dtype=object), LIMIT_EXITS)
+    entry_slip = slippage_points(model, n, rng)
+    exit_slip = slippage_points(model, n, rng) * market_exit
+    slip_money = (entry_slip + exit_slip) * spec.point * spec.contract_size * lot
+    return model.commission_per_lot_rt * lot + slip_money
+
+
+def net_profit(trades: List[Trade], spec: SymbolSpec, lot: float, model: CostModel) -> np.ndarray:
+    profit = np.array([t.profit for t in trades], dtype=np.float64)
+    if not trades:
+        return profit
+    costs = trade_costs([t.exit_reason for t in trades], spec, lot, model)
+    return np.round(profit - costs, 2)
+
+
+def run_scenarios(
+    bars: BarArrays,
+    m1: BarArrays,
+    c: Candidate,
+    spec: SymbolSpec,
+    lot: float,
+    deposit: float,
+    scenarios: Dict[str, CostModel],
+    label: str,
+    exits: Optional[ExitParams] = None,
+) -> Dict[str, ReportMetrics]:
+    # Only a spread change needs a new simulation; commission and slippage reuse its trades.
+    out: Dict[str, ReportMetrics] = {}
+    runs: Dict[tuple, List[Trade]] = {}
+    for name, model in scenarios.items():
+        key = (model.spread_mult, model.spread_add_points)
+        if key not in runs:
+            runs[key] = simulate(bars, with_spread(m1, model), c, spec, lot, exits=exits)
+        out[name] = profit_metrics(net_profit(runs[key], spec, lot, model), deposit, f"{label}_{name}")
+    return out
+
+
+def report_pf(metrics: ReportMetrics) -> float:
+    # profit_metrics gives 0.0 for a run without losing trades; the tester reports that as no limit.
+    if metrics.gross_loss == 0.0 and metrics.gross_profit > 0.0:
+        return float("inf")
+    return metrics.profit_factor
+
+
+def pf_degradation_pct(metrics: ReportMetrics, base: ReportMetrics) -> Optional[float]:
+    # PF lost against the same candidate's cost-free run, in % of the base PF; None when either
+    # PF has no finite value to compare.
+    base_pf, pf = report_pf(base), report_pf(metrics)
+    if not (0.0 < base_pf < float("inf")) or pf == float("inf"):
+        return None
+    return (base_pf - pf) / base_pf * 100.0
+
+
+def write_report_xml(path: Path, metrics: ReportMetrics, base: Optional[ReportMetrics] = None) -> None:
+    # Same element layout as the trade-log fallback report of tools/run_mt5_backtest.ps1, which
+    # tools/wfo_summary.py reads; a "stress" file name puts it in the stress split. With base, the
+    # PF degradation against that Python run is added, so wfo_summary does not compare a cost
+    # stress PF against a terminal IS report.
+    pf = report_pf(metrics)
+    lines = [
+        '<mt5_report source="python_cost_model">',
+        f"  <profit_factor>{'INF' if pf == float('inf') else f'{pf:.6f}'}</profit_factor>",
+        f"  <drawdown_pct>{metrics.max_drawdown_pct:.6f}</drawdown_pct>",
+        f"  <trades>{metrics.total_trades}</trades>",
+        f"  <net_profit>{metrics.net_profit:.2f}</net_profit>",
+        f"  <gross_profit>{metrics.gross_profit:.2f}</gross_profit>",
+        f"  <gross_loss_abs>{abs(metrics.gross_loss):.2f}</gross_loss_abs>",
+    ]
+    degrade = pf_degradation_pct(metrics, base) if base is not None else None
+    if degrade is not None:
+        lines.append(f"  <pf_degradation_pct>{degrade:.6f}</pf_degradation_pct>")
+    path.write_text("\n".join(lines + ["</mt5_report>", ""]), encoding="ascii")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Re-run a candidate under spread/commission/slippage scenarios and write stress-split reports."
+    )
+    parser.add_argument("--store-dir", required=True, help="Columnar bar store root holding <SYMBOL>/M1 partitions.")
+    parser.add_argument("--cache-dir", default="", help="Optional root for resampled bars; defaults to --store-dir.")
+    parser.add_argument("--symbol", default="XAUUSD")
+    parser.add_argument("--strategy-tf", default="M15")
+    parser.add_argument("--from-date", required=True)
+    parser.add_argument("--to-date", required=True)
+    parser.add_argument("--lot", type=float, default=1.0)
+    parser.add_argument("--deposit", type=float, default=25000.0)
+    for field in dataclasses.fields(Candidate):
+        default = EA_DEFAULTS[field.name]
+        parser.add_argument(f"--{field.name.replace('_', '-')}", type=type(default), default=default)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma list from: {', '.join(SCENARIOS)}.")
+    parser.add_argument("--spread-mult", type=float, default=0.0, help="Adds a custom scenario with this spread multiplier.")
+    parser.add_argument(
+        "--spread-add-points",
+        type=float,
+        default=0.0,
+        help="Points added to every M1 spread in the custom scenario (alone, it keeps the multiplier at 1).",
+    )
+    parser.add_argument("--commission-per-lot-rt", type=float, default=7.0, help="Commission of the custom scenario.")
+    parser.add_argument("--slippage", choices=SLIPPAGE_KINDS, default="none", help="Slippage of the custom scenario.")
+    parser.add_argument("--slippage-points", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--label", default="", help="Report file prefix; defaults to the candidate id.")
+    parser.add_argument(
+        "--reports-dir",
+        default="",
+        help="Write <label>_stress_<scenario>.xml here for tools/wfo_summary.py, each with its PF degradation "
+        "against the base scenario (always run; it gets no file of its own).",
+    )
+    add_exit_args(parser)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    cache_root = Path(args.cache_dir) if args.cache_dir else Path(args.store_dir)
+    resampled = ResampledStore(BarStore(Path(args.store_dir)), cache_root)
+    if args.symbol not in SYMBOL_SPECS:
+        raise SystemExit(f"No contract spec for {args.symbol}")
+    spec = SYMBOL_SPECS[args.symbol]
+    candidate = Candidate(**{f.name: getattr(args, f.name) for f in dataclasses.fields(Candidate)})
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(unknown)}")
+    # The stress reports are scored against the base run, so it is always part of the set.
+    scenarios = {name: dataclasses.replace(SCENARIOS[name], seed=args.seed) for name in ["base", *names]}
+    if args.spread_mult > 0.0 or args.spread_add_points != 0.0:
+        mult = args.spread_mult or 1.0
+        name = f"spread_x{mult:g}" + (f"_add{args.spread_add_points:g}" if args.spread_add_points else "")
+        scenarios[f"{name}_custom"] = CostModel(
+            spread_mult=mult,
+            spread_add_points=args.spread_add_points,
+            commission_per_lot_rt=args.commission_per_lot_rt,
+            slippage=args.slippage,
+            slippage_points=args.slippage_points,
+            seed=args.seed,
+        )
+
+    bars, m1 = load_bars(
+        resampled,
+        args.symbol,
+        args.strategy_tf.upper(),
+        dt.date.fromisoformat(args.from_date),
+        dt.date.fromisoformat(args.to_date),
+    )
+    label = args.label or f"{candidate.candidate_id()}_{args.strategy_tf.upper()}"
+    results = run_scenarios(
+        bars,
+        m1,
+        candidate,
+        spec,
+        args.lot,
+        args.deposit,
+        scenarios,
+        label,
+        exits=exit_params_from_args(args),
+    )
+    base = results["base"]
+    for name, m in results.items():
+        degrade = ""
+        pct = pf_degradation_pct(m, base)
+        if pct is not None and name != "base":
+            degrade = f" pf_degrade={pct:.1f}%"
+        print(
+            f"{name:>16}: trades={m.total_trades} net={m.net_profit:.2f} pf={m.profit_factor:.2f} dd={m.max_drawdown_pct:.2f}%{degrade}"
+        )
+    if args.reports_dir:
+        out_dir = Path(args.reports_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        for name, m in results.items():
+            if name == "base":
+                continue
+            path = out_dir / f"{label}_stress_{name}.xml"
+            write_report_xml(path, m, base)
+            print(f"wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
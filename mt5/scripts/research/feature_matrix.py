@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import dataclasses
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import indicators as ind
+from artifact_cache import DEFAULT_MAX_GB, ArtifactCache, artifact_key, code_version, open_cache
+from bar_store import BarArrays, BarStore, month_start_ts, next_month
+from resample_bars import TIMEFRAME_SECONDS, ResampledStore
+
+
+ARTIFACT_KIND = "gate_feature_matrix"
+CODE_VERSION = code_version(*(Path(__file__).with_name(n) for n in ("feature_matrix.py", "indicators.py", "resample_bars.py")))
+# One row per closed signal-timeframe bar: the values the EA reads at shift 1 when the next bar opens.
+MATRIX_COLUMNS = (
+    "time",
+    "open",
+    "high",
+    "low",
+    "close",
+    "spread",
+    "atr",
+    "atr_percentile",
+    "atr_to_price_pct",
+    "adx",
+    "pdi",
+    "ndi",
+    "ema_fast",
+    "ema_slow",
+    "trend_slope",
+    "donchian_high",
+    "donchian_low",
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class GateParams:
+    # Defaults are the XAUUSD_RobustBreakout inputs.
+    signal_tf: str = "M15"
+    trend_tf: str = "H1"
+    atr_period: int = 14
+    adx_period: int = 14
+    ema_fast: int = 50
+    ema_slow: int = 200
+    volatility_lookback_bars: int = 240
+    donchian_bars: int = 40
+
+
+def compute_gate_features(signal: BarArrays, trend: BarArrays, params: GateParams) -> Dict[str, np.ndarray]:
+    for tf in (params.signal_tf, params.trend_tf):
+        if tf not in TIMEFRAME_SECONDS:
+            raise ValueError(f"Unsupported timeframe: {tf}")
+    high = np.asarray(signal.high, dtype=np.float64)
+    low = np.asarray(signal.low, dtype=np.float64)
+    close = np.asarray(signal.close, dtype=np.float64)
+
+    atr = ind.atr(high, low, close, params.atr_period)
+    adx, pdi, ndi = ind.adx(high, low, close, params.adx_period)
+    donchian_high, donchian_low = ind.donchian(high, low, params.donchian_bars)
+
+    # Trend EMAs come from the last trend bar that closed before the current trend bar, as the
+    # EA's shift-1 read on TrendTF does when the next signal bar opens.
+    trend_seconds = TIMEFRAME_SECONDS[params.trend_tf]
+    decision_ts = np.asarray(signal.time) + TIMEFRAME_SECONDS[params.signal_tf]
+    idx = np.searchsorted(trend.time, decision_ts // trend_seconds * trend_seconds, side="left") - 1
+    has_trend = idx >= 0
+    ema_fast = np.full(len(signal), np.nan)
+    ema_slow = np.full(len(signal), np.nan)
+    if has_trend.any():
+        ema_fast[has_trend] = ind.ema(trend.close, params.ema_fast)[idx[has_trend]]
+        ema_slow[has_trend] = ind.ema(trend.close, params.ema_slow)[idx[has_trend]]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        positive_atr = np.where(atr > 0.0, atr, np.nan)
+        trend_slope = np.abs(ema_fast - ema_slow) / positive_atr
+        atr_to_price_pct = np.where(close > 0.0, atr / close * 100.0, np.nan)
+
+    return {
+        "time": np.asarray(signal.time, dtype=np.int64),
+        "open": np.asarray(signal.open, dtype=np.float64),
+        "high": high,
+        "low": low,
+        "close": close,
+        "spread": np.asarray(signal.spread, dtype=np.float64),
+        "atr": atr,
+        "atr_percentile": ind.atr_percentile(atr, params.volatility_lookback_bars),
+        "atr_to_price_pct": atr_to_price_pct,
+        "adx": adx,
+        "pdi": pdi,
+        "ndi": ndi,
+        "ema_fast": ema_fast,
+        "ema_slow": ema_slow,
+        "trend_slope": trend_slope,
+        "donchian_high": donchian_high,
+        "donchian_low": donchian_low,
+    }
+
+
+def matrix_between(matrix: Dict[str, np.ndarray], start_ts: int, end_ts: int) -> Dict[str, np.ndarray]:
+    # Half-open [start_ts, end_ts) view by bar open time.
+    lo = int(np.searchsorted(matrix["time"], start_ts, side="left"))
+    hi = int(np.searchsorted(matrix["time"], end_ts, side="left"))
+    return {name: col[lo:hi] for name, col in matrix.items()}
+
+
+def matrix_key(symbol: str, params: GateParams, sources: Dict[str, Optional[str]]) -> str:
+    return artifact_key(ARTIFACT_KIND, {"symbol": symbol, **dataclasses.asdict(params)}, sources, CODE_VERSION)
+
+
+def build_matrix(
+    resampled: ResampledStore,
+    symbol: str,
+    params: GateParams,
+    cache: Optional[ArtifactCache] = None,
+) -> Dict[str, np.ndarray]:
+    # Always computed over the whole stored history, so recursive indicators (EMA200 on H1) see as
+    # much warm-up as the store holds; callers slice with matrix_between. Cached entries are keyed
+    # by the parameters, the M1 partition digests and the code version, and load as memmaps.
+    months = resampled.m1.months(symbol)
+    if not months:
+        raise RuntimeError(f"No M1 partitions for {symbol} under {resampled.m1.root}")
+    sources = {m.strftime("%Y-%m"): resampled.m1.partition_version(symbol, m) for m in months}
+
+    def compute() -> Dict[str, np.ndarray]:
+        start_ts = month_start_ts(months[0])
+        end_ts = month_start_ts(next_month(months[-1]))
+        signal = resampled.load_range(symbol, params.signal_tf, start_ts, end_ts)
+        trend = resampled.load_range(symbol, params.trend_tf, start_ts, end_ts)
+        return compute_gate_features(signal, trend, params)
+
+    if cache is None:
+        return compute()
+
+    def write(tmp: Path) -> Dict[str, object]:
+        matrix = compute()
+        for name in MATRIX_COLUMNS:
+            np.save(tmp / f"{name}.npy", np.ascontiguousarray(matrix[name]))
+        return {"symbol": symbol, "params": dataclasses.asdict(params), "rows": int(len(matrix["time"]))}
+
+    entry, _ = cache.get_or_build(matrix_key(symbol, params, sources), ARTIFACT_KIND, write)
+    return {name: np.load(entry / f"{name}.npy", mmap_mode="r") for name in MATRIX_COLUMNS}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build cached per-bar RobustBreakout gate features (M15/H1).")
+    parser.add_argument("--store-dir", required=True, help="Columnar bar store root holding <SYMBOL>/M1 partitions.")
+    parser.add_argument("--cache-dir", default="", help="Optional root for resampled bars; defaults to --store-dir.")
+    parser.add_argument(
+        "--artifact-cache-dir",
+        default="",
+        help="Shared content-addressed artifact cache (see artifact_cache.py). Defaults to <cache-dir>/artifacts.",
+    )
+    parser.add_argument("--cache-max-gb", type=float, default=DEFAULT_MAX_GB)
+    parser.add_argument("--symbol", default="XAUUSD")
+    parser.add_argument("--signal-timeframes", default="M15,H1")
+    parser.add_argument("--trend-timeframe", default="H1")
+    parser.add_argument("--atr-period", type=int, default=14)
+    parser.add_argument("--adx-period", type=int, default=14)
+    parser.add_argument("--ema-fast", type=int, default=50)
+    parser.add_argument("--ema-slow", type=int, default=200)
+    parser.add_argument("--volatility-lookback-bars", type=int, default=240)
+    parser.add_argument("--donchian-bars", type=int, default=40)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    cache_root = Path(args.cache_dir) if args.cache_dir else Path(args.store_dir)
+    resampled = ResampledStore(BarStore(Path(args.store_dir)), cache_root)
+    cache = open_cache(args.artifact_cache_dir or str(cache_root / "artifacts"), args.cache_max_gb)
+    timeframes: List[str] = [tf.strip().upper() for tf in args.signal_timeframes.split(",") if tf.strip()]
+    for tf in timeframes:
+        params = GateParams(
+            signal_tf=tf,
+            trend_tf=args.trend_timeframe.upper(),
+            atr_period=args.atr_period,
+            adx_period=args.adx_period,
+            ema_fast=args.ema_fast,
+            ema_slow=args.ema_slow,
+            volatility_lookback_bars=args.volatility_lookback_bars,
+            donchian_bars=args.donchian_bars,
+        )
+        matrix = build_matrix(resampled, args.symbol, params, cache)
+        print(f"{args.symbol} {tf}: {len(matrix['time'])} bars")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,776 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import bisect
+import collections
+import csv
+import math
+import re
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from numba import njit as _njit
+except ImportError:  # numba is optional; without it the loops run as plain Python (Donchian and
+    # the ATR percentile switch to numpy window code instead), with identical results.
+    _njit = None
+
+
+def _kernel(fn):
+    return _njit(cache=True)(fn) if _njit is not None else fn
+
+
+# Semantics follow the MetaQuotes reference indicators used by the EAs:
+#   iMA MODE_EMA  - seeded with the first price, ema = price * a + prev * (1 - a), a = 2 / (n + 1)
+#   iMA MODE_SMA  - mean of the last n prices
+#   iMA MODE_SMMA - SMA seed at bar n-1, then (prev * (n - 1) + price) / n (Wilder)
+#   iATR          - SMA of true range; first value at bar n = mean(TR[1..n])
+#   iADX          - +DM/-DM normalized by the bar's TR, then EMA-smoothed DI and ADX (a = 2 / (n + 1))
+#   iADXWilder    - Wilder-smoothed TR/+DM/-DM, DI = 100 * DMs / TRs, Wilder-smoothed DX
+#   iRSI          - Wilder-smoothed gains/losses seeded with their n-bar mean
+# Window sums (SMA/ATR) are recomputed per window, oldest to newest, instead of MT5's running
+# add/subtract. Values match MT5 to rounding, and each one depends only on its own window, so a
+# resumed computation reproduces a full one exactly. That costs O(n * period) (period vectorized
+# adds); a running sum would make each value depend on where the run started.
+
+
+def window_sum(values: np.ndarray, n: int) -> np.ndarray:
+    # Trailing n-bar sum, partial over the first n-1 bars.
+    values = np.asarray(values, dtype=np.float64)
+    padded = np.concatenate([np.zeros(n - 1), values])
+    out = np.zeros(len(values))
+    for k in range(n):
+        out += padded[k : k + len(values)]
+    return out
+
+
+def window_mean(values: np.ndarray, n: int, min_periods: Optional[int] = None) -> np.ndarray:
+    counts = np.minimum(np.arange(1, len(values) + 1), n)
+    out = window_sum(values, n) / counts
+    out[counts < (n if min_periods is None else min_periods)] = np.nan
+    return out
+
+
+def sma(price: np.ndarray, period: int, min_periods: Optional[int] = None) -> np.ndarray:
+    return window_mean(price, period, min_periods)
+
+
+@_kernel
+def _ema_kernel(price, alpha, seed, has_seed, out):
+    prev = seed
+    for i in range(price.shape[0]):
+        if i == 0 and not has_seed:
+            prev = price[0]
+        else:
+            prev = price[i] * alpha + prev * (1.0 - alpha)
+        out[i] = prev
+
+
+def ema(price: np.ndarray, period: int, seed: Optional[float] = None) -> np.ndarray:
+    # seed is the EMA of the bar before price[0]; without it the series starts at price[0] like iMA.
+    price = np.ascontiguousarray(price, dtype=np.float64)
+    out = np.empty(len(price))
+    _ema_kernel(price, 2.0 / (period + 1.0), 0.0 if seed is None else float(seed), seed is not None, out)
+    return out
+
+
+@_kernel
+def _smma_kernel(price, n, out):
+    total = 0.0
+    for i in range(price.shape[0]):
+        if i < n - 1:
+            total += price[i]
+            out[i] = math.nan
+        elif i == n - 1:
+            out[i] = (total + price[i]) / n
+        else:
+            out[i] = (out[i - 1] * (n - 1) + price[i]) / n
+
+
+def smma(price: np.ndarray, period: int) -> np.ndarray:
+    price = np.ascontiguousarray(price, dtype=np.float64)
+    out = np.empty(len(price))
+    _smma_kernel(price, period, out)
+    return out
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    # TR[0] has no previous close and falls back to high - low.
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    prev_close = np.r_[np.nan, np.asarray(close, dtype=np.float64)[:-1]]
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def atr(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    period: int,
+    min_periods: Optional[int] = None,
+) -> np.ndarray:
+    # iATR: defined from bar `period` on (mean of TR[1..period] first). min_periods=1 instead
+    # averages whatever bars exist, including TR[0], which the daily features use from day one.
+    tr = true_range(high, low, close)
+    if min_periods is not None:
+        return window_mean(tr, period, min_periods)
+    out = window_mean(tr, period)
+    out[:period] = np.nan
+    return out
+
+
+@_kernel
+def _adx_kernel(high, low, close, alpha, carry, pdi, ndi, adx):
+    # carry = [prev_high, prev_low, prev_close, pdi, ndi, adx, has_prev]; updated in place.
+    prev_high, prev_low, prev_close = carry[0], carry[1], carry[2]
+    p, m, a = carry[3], carry[4], carry[5]
+    has_prev = carry[6] > 0.0
+    for i in range(high.shape[0]):
+        if has_prev:
+            up = high[i] - prev_high
+            down = prev_low - low[i]
+            if up < 0.0:
+                up = 0.0
+            if down < 0.0:
+                down = 0.0
+            if up > down:
+                down = 0.0
+            elif up < down:
+                up = 0.0
+            else:
+                up = 0.0
+                down = 0.0
+            tr = max(max(abs(high[i] - low[i]), abs(high[i] - prev_close)), abs(low[i] - prev_close))
+            pd_ = 100.0 * up / tr if tr != 0.0 else 0.0
+            nd_ = 100.0 * down / tr if tr != 0.0 else 0.0
+            p = pd_ * alpha + p * (1.0 - alpha)
+            m = nd_ * alpha + m * (1.0 - alpha)
+            s = p + m
+            dx = 100.0 * abs((p - m) / s) if s != 0.0 else 0.0
+            a = dx * alpha + a * (1.0 - alpha)
+        pdi[i] = p
+        ndi[i] = m
+        adx[i] = a
+        prev_high, prev_low, prev_close = high[i], low[i], close[i]
+        has_prev = True
+    carry[0], carry[1], carry[2] = prev_high, prev_low, prev_close
+    carry[3], carry[4], carry[5] = p, m, a
+    carry[6] = 1.0
+
+
+def adx(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    period: int,
+    state: Optional["ADXState"] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # iADX main/+DI/-DI lines. Bar 0 is all zeros as in MT5. Passing an ADXState resumes from it
+    # (and advances it), which reproduces an uninterrupted run bit for bit.
+    high = np.ascontiguousarray(high, dtype=np.float64)
+    low = np.ascontiguousarray(low, dtype=np.float64)
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    st = state if state is not None else ADXState(period)
+    carry = st.carry()
+    pdi = np.empty(len(high))
+    ndi = np.empty(len(high))
+    out = np.empty(len(high))
+    _adx_kernel(high, low, close, st.alpha, carry, pdi, ndi, out)
+    st.restore(carry)
+    return out, pdi, ndi
+
+
+@_kernel
+def _adx_wilder_kernel(high, low, close, n, pdi, ndi, adx):
+    tr_s = 0.0
+    p_s = 0.0
+    m_s = 0.0
+    a_s = 0.0
+    tr_sum = 0.0
+    p_sum = 0.0
+    m_sum = 0.0
+    dx_sum = 0.0
+    for i in range(high.shape[0]):
+        if i == 0:
+            pdi[i] = 0.0
+            ndi[i] = 0.0
+            adx[i] = 0.0
+            continue
+        up = high[i] - high[i - 1]
+        down = low[i - 1] - low[i]
+        if up < 0.0:
+            up = 0.0
+        if down < 0.0:
+            down = 0.0
+        if up == down:
+            up = 0.0
+            down = 0.0
+        elif up < down:
+            up = 0.0
+        else:
+            down = 0.0
+        tr = max(max(abs(high[i] - low[i]), abs(high[i] - close[i - 1])), abs(low[i] - close[i - 1]))
+        if i < n:
+            tr_sum += tr
+            p_sum += up
+            m_sum += down
+            pdi[i] = 0.0
+            ndi[i] = 0.0
+            adx[i] = 0.0
+            continue
+        if i == n:
+            tr_s = (tr_sum + tr) / n
+            p_s = (p_sum + up) / n
+            m_s = (m_sum + down) / n
+        else:
+            tr_s = (tr_s * (n - 1) + tr) / n
+            p_s = (p_s * (n - 1) + up) / n
+            m_s = (m_s * (n - 1) + down) / n
+        p = 100.0 * p_s / tr_s if tr_s != 0.0 else 0.0
+        m = 100.0 * m_s / tr_s if tr_s != 0.0 else 0.0
+        s = p + m
+        dx = 100.0 * abs((p - m) / s) if s != 0.0 else 0.0
+        if i < 2 * n - 1:
+            dx_sum += dx
+            a_s = 0.0
+        elif i == 2 * n - 1:
+            a_s = (dx_sum + dx) / n
+        else:
+            a_s = (a_s * (n - 1) + dx) / n
+        pdi[i] = p
+        ndi[i] = m
+        adx[i] = a_s
+
+
+def adx_wilder(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    period: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # iADXWilder main/+DI/-DI lines; zeros until the smoothing windows are filled.
+    high = np.ascontiguousarray(high, dtype=np.float64)
+    low = np.ascontiguousarray(low, dtype=np.float64)
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    pdi = np.empty(len(high))
+    ndi = np.empty(len(high))
+    out = np.empty(len(high))
+    _adx_wilder_kernel(high, low, close, period, pdi, ndi, out)
+    return out, pdi, ndi
+
+
+@_kernel
+def _rsi_kernel(price, n, out):
+    pos = 0.0
+    neg = 0.0
+    for i in range(price.shape[0]):
+        if i == 0:
+            out[i] = math.nan
+            continue
+        diff = price[i] - price[i - 1]
+        gain = diff if diff > 0.0 else 0.0
+        loss = -diff if diff < 0.0 else 0.0
+        if i < n:
+            pos += gain
+            neg += loss
+            out[i] = math.nan
+            continue
+        if i == n:
+            pos = (pos + gain) / n
+            neg = (neg + loss) / n
+        else:
+            pos = (pos * (n - 1) + gain) / n
+            neg = (neg * (n - 1) + loss) / n
+        if neg != 0.0:
+            out[i] = 100.0 - 100.0 / (1.0 + pos / neg)
+        elif pos != 0.0:
+            out[i] = 100.0
+        else:
+            out[i] = 50.0
+
+
+def rsi(price: np.ndarray, period: int) -> np.ndarray:
+    price = np.ascontiguousarray(price, dtype=np.float64)
+    out = np.empty(len(price))
+    _rsi_kernel(price, period, out)
+    return out
+
+
+@_kernel
+def _donchian_kernel(high, low, n, upper, lower, hi_idx, lo_idx):
+    # Monotonic deques of bar indices (ring buffers of size n): hi_idx keeps decreasing highs,
+    # lo_idx increasing lows, so each window's extreme is at the front.
+    hi_head = 0
+    hi_len = 0
+    lo_head = 0
+    lo_len = 0
+    for i in range(high.shape[0]):
+        if hi_len > 0 and hi_idx[hi_head] <= i - n:
+            hi_head = (hi_head + 1) % n
+            hi_len -= 1
+        while hi_len > 0 and high[hi_idx[(hi_head + hi_len - 1) % n]] <= high[i]:
+            hi_len -= 1
+        hi_idx[(hi_head + hi_len) % n] = i
+        hi_len += 1
+        if lo_len > 0 and lo_idx[lo_head] <= i - n:
+            lo_head = (lo_head + 1) % n
+            lo_len -= 1
+        while lo_len > 0 and low[lo_idx[(lo_head + lo_len - 1) % n]] >= low[i]:
+            lo_len -= 1
+        lo_idx[(lo_head + lo_len) % n] = i
+        lo_len += 1
+        if i < n - 1:
+            upper[i] = math.nan
+            lower[i] = math.nan
+        else:
+            upper[i] = high[hi_idx[hi_head]]
+            lower[i] = low[lo_idx[lo_head]]
+
+
+def donchian(high: np.ndarray, low: np.ndarray, period: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Highest high / lowest low of the n bars ending at each bar (inclusive); NaN until n bars exist.
+    # The EAs use the channel of the previous n bars, i.e. these values shifted by one.
+    high = np.ascontiguousarray(high, dtype=np.float64)
+    low = np.ascontiguousarray(low, dtype=np.float64)
+    if _njit is None:
+        # Without numba the deque loop is slower in plain Python than numpy's n x period windows.
+        upper = np.full(len(high), np.nan)
+        lower = np.full(len(low), np.nan)
+        if len(high) >= period:
+            upper[period - 1 :] = np.lib.stride_tricks.sliding_window_view(high, period).max(axis=1)
+            lower[period - 1 :] = np.lib.stride_tricks.sliding_window_view(low, period).min(axis=1)
+        return upper, lower
+    upper = np.empty(len(high))
+    lower = np.empty(len(low))
+    _donchian_kernel(high, low, period, upper, lower, np.empty(period, np.int64), np.empty(period, np.int64))
+    return upper, lower
+
+
+@_kernel
+def _atr_percentile_kernel(values, lookback, min_valid, out, ring, ring_ok, srt):
+    # ring holds the last `lookback` values (ring_ok marks the valid ones), srt the valid ones in
+    # ascending order; each bar inserts one value and drops at most one. Finding a slot is a binary
+    # search, but keeping srt contiguous shifts up to `lookback` values, so this is O(n * lookback)
+    # element moves; it only avoids the n x lookback arrays.
+    count = 0
+    for i in range(values.shape[0]):
+        slot = i % lookback
+        if i >= lookback and ring_ok[slot]:
+            old = ring[slot]
+            lo = 0
+            hi = count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if srt[mid] < old:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            for k in range(lo, count - 1):
+                srt[k] = srt[k + 1]
+            count -= 1
+        v = values[i]
+        ok = v > 0.0 and v < math.inf
+        ring[slot] = v
+        ring_ok[slot] = ok
+        if ok:
+            lo = 0
+            hi = count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if srt[mid] <= v:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            for k in range(count, lo, -1):
+                srt[k] = srt[k - 1]
+            srt[lo] = v
+            count += 1
+            # lo + 1 values (v included) are <= v.
+            out[i] = 100.0 * ((lo + 1) / count) if count >= min_valid else math.nan
+        else:
+            out[i] = math.nan
+
+
+def atr_percentile(atr_values: np.ndarray, lookback: int, min_valid: int = 20) -> np.ndarray:
+    # RobustBreakout GetAtrPercentile: share (in %) of the last `lookback` ATR values, current bar
+    # included, that are <= the current ATR. Non-positive/NaN values are ignored; NaN when fewer
+    # than min_valid remain or the current ATR is not positive.
+    values = np.ascontiguousarray(atr_values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    if len(values) == 0 or lookback < min_valid:
+        return out
+    if _njit is None:
+        # Plain-Python shifting is far slower than numpy's n x lookback comparison; use that instead.
+        padded = np.concatenate([np.full(lookback - 1, np.nan), values])
+        windows = np.lib.stride_tricks.sliding_window_view(padded, lookback)
+        valid = np.isfinite(windows) & (windows > 0.0)
+        with np.errstate(invalid="ignore"):
+            le = valid & (windows <= values[:, None])
+        n_valid = valid.sum(axis=1)
+        ok = (n_valid >= min_valid) & np.isfinite(values) & (values > 0.0)
+        out[ok] = 100.0 * (le.sum(axis=1)[ok] / n_valid[ok])
+        return out
+    ring = np.empty(lookback)
+    _atr_percentile_kernel(values, lookback, min_valid, out, ring, np.zeros(lookback, np.bool_), np.empty(lookback))
+    return out
+
+
+class EMAState:
+    # One-bar-at-a-time iMA EMA; update() matches ema() exactly.
+    def __init__(self, period: int, value: Optional[float] = None) -> None:
+        self.alpha = 2.0 / (period + 1.0)
+        self.value = value
+
+    def update(self, price: float) -> float:
+        if self.value is None:
+            self.value = float(price)
+        else:
+            self.value = float(price) * self.alpha + self.value * (1.0 - self.alpha)
+        return self.value
+
+
+class SMAState:
+    def __init__(self, period: int) -> None:
+        self.period = period
+        self.window: Deque[float] = collections.deque(maxlen=period)
+
+    def update(self, price: float) -> float:
+        self.window.append(float(price))
+        if len(self.window) < self.period:
+            return math.nan
+        total = 0.0
+        for v in self.window:
+            total += v
+        return total / self.period
+
+
+class SMMAState:
+    # iMA MODE_SMMA one bar at a time; update() matches smma() exactly.
+    def __init__(self, period: int) -> None:
+        self.period = period
+        self.total = 0.0
+        self.value = math.nan
+        self.bars = 0
+
+    def update(self, price: float) -> float:
+        n = self.period
+        i = self.bars
+        self.bars += 1
+        if i < n - 1:
+            self.total += float(price)
+            return math.nan
+        if i == n - 1:
+            self.value = (self.total + float(price)) / n
+        else:
+            self.value = (self.value * (n - 1) + float(price)) / n
+        return self.value
+
+
+class ATRState:
+    # iATR one bar at a time; update() matches atr() exactly.
+    def __init__(self, period: int) -> None:
+        self.period = period
+        self.prev_close: Optional[float] = None
+        self.trs = SMAState(period)
+        self.bars = 0
+
+    def update(self, high: float, low: float, close: float) -> float:
+        if self.prev_close is None:
+            tr = high - low
+        else:
+            tr = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        value = self.trs.update(tr)
+        self.bars += 1
+        return value if self.bars > self.period else math.nan
+
+
+class ADXState:
+    # iADX carry: previous bar plus smoothed +DI/-DI/ADX. update() matches adx() exactly.
+    def __init__(self, period: int) -> None:
+        self.period = period
+        self.alpha = 2.0 / (period + 1.0)
+        self.prev: Optional[Tuple[float, float, float]] = None
+        self.pdi = 0.0
+        self.ndi = 0.0
+        self.adx = 0.0
+
+    def carry(self) -> np.ndarray:
+        prev = self.prev if self.prev is not None else (0.0, 0.0, 0.0)
+        return np.array([*prev, self.pdi, self.ndi, self.adx, 1.0 if self.prev is not None else 0.0])
+
+    def restore(self, carry: np.ndarray) -> None:
+        self.prev = (float(carry[0]), float(carry[1]), float(carry[2])) if carry[6] > 0.0 else None
+        self.pdi, self.ndi, self.adx = float(carry[3]), float(carry[4]), float(carry[5])
+
+    def update(self, high: float, low: float, close: float) -> Tuple[float, float, float]:
+        out = adx(np.array([high]), np.array([low]), np.array([close]), self.period, state=self)
+        return float(out[0][0]), float(out[1][0]), float(out[2][0])
+
+
+class ADXWilderState:
+    # iADXWilder one bar at a time; update() matches adx_wilder() exactly.
+    def __init__(self, period: int) -> None:
+        self.period = period
+        self.prev: Optional[Tuple[float, float, float]] = None
+        self.bars = 0
+        self.tr_s = self.p_s = self.m_s = self.adx = 0.0
+        self.tr_sum = self.p_sum = self.m_sum = self.dx_sum = 0.0
+
+    def update(self, high: float, low: float, close: float) -> Tuple[float, float, float]:
+        n = self.period
+        i = self.bars
+        self.bars += 1
+        prev, self.prev = self.prev, (float(high), float(low), float(close))
+        if prev is None:
+            return 0.0, 0.0, 0.0
+        prev_high, prev_low, prev_close = prev
+        up = max(high - prev_high, 0.0)
+        down = max(prev_low - low, 0.0)
+        if up == down:
+            up = down = 0.0
+        elif up < down:
+            up = 0.0
+        else:
+            down = 0.0
+        tr = max(max(abs(high - low), abs(high - prev_close)), abs(low - prev_close))
+        if i < n:
+            self.tr_sum += tr
+            self.p_sum += up
+            self.m_sum += down
+            return 0.0, 0.0, 0.0
+        if i == n:
+            self.tr_s = (self.tr_sum + tr) / n
+            self.p_s = (self.p_sum + up) / n
+            self.m_s = (self.m_sum + down) / n
+        else:
+            self.tr_s = (self.tr_s * (n - 1) + tr) / n
+            self.p_s = (self.p_s * (n - 1) + up) / n
+            self.m_s = (self.m_s * (n - 1) + down) / n
+        p = 100.0 * self.p_s / self.tr_s if self.tr_s != 0.0 else 0.0
+        m = 100.0 * self.m_s / self.tr_s if self.tr_s != 0.0 else 0.0
+        s = p + m
+        dx = 100.0 * abs((p - m) / s) if s != 0.0 else 0.0
+        if i < 2 * n - 1:
+            self.dx_sum += dx
+            self.adx = 0.0
+        elif i == 2 * n - 1:
+            self.adx = (self.dx_sum + dx) / n
+        else:
+            self.adx = (self.adx * (n - 1) + dx) / n
+        return self.adx, p, m
+
+
+class RSIState:
+    def __init__(self, period: int) -> None:
+        self.period = period
+        self.prev: Optional[float] = None
+        self.pos = 0.0
+        self.neg = 0.0
+        self.bars = 0
+
+    def update(self, price: float) -> float:
+        n = self.period
+        if self.prev is None:
+            self.prev = float(price)
+            self.bars = 1
+            return math.nan
+        diff = float(price) - self.prev
+        self.prev = float(price)
+        gain = diff if diff > 0.0 else 0.0
+        loss = -diff if diff < 0.0 else 0.0
+        i = self.bars
+        self.bars += 1
+        if i < n:
+            self.pos += gain
+            self.neg += loss
+            return math.nan
+        if i == n:
+            self.pos = (self.pos + gain) / n
+            self.neg = (self.neg + loss) / n
+        else:
+            self.pos = (self.pos * (n - 1) + gain) / n
+            self.neg = (self.neg * (n - 1) + loss) / n
+        if self.neg != 0.0:
+            return 100.0 - 100.0 / (1.0 + self.pos / self.neg)
+        return 100.0 if self.pos != 0.0 else 50.0
+
+
+class DonchianState:
+    def __init__(self, period: int) -> None:
+        self.highs: Deque[float] = collections.deque(maxlen=period)
+        self.lows: Deque[float] = collections.deque(maxlen=period)
+
+    def update(self, high: float, low: float) -> Tuple[float, float]:
+        self.highs.append(float(high))
+        self.lows.append(float(low))
+        if len(self.highs) < self.highs.maxlen:
+            return math.nan, math.nan
+        return max(self.highs), min(self.lows)
+
+
+class AtrPercentileState:
+    # GetAtrPercentile one bar at a time: the window plus a sorted list of its valid values, so
+    # each update is one bisect insert and at most one removal. Matches atr_percentile() exactly.
+    def __init__(self, lookback: int, min_valid: int = 20) -> None:
+        self.lookback = lookback
+        self.min_valid = min_valid
+        self.window: Deque[float] = collections.deque(maxlen=lookback)
+        self.sorted: List[float] = []
+
+    def update(self, value: float) -> float:
+        value = float(value)
+        if len(self.window) == self.lookback:
+            old = self.window[0]
+            if 0.0 < old < math.inf:
+                del self.sorted[bisect.bisect_left(self.sorted, old)]
+        self.window.append(value)
+        if not 0.0 < value < math.inf:
+            return math.nan
+        bisect.insort_right(self.sorted, value)
+        if self.lookback < self.min_valid or len(self.sorted) < self.min_valid:
+            return math.nan
+        return 100.0 * (bisect.bisect_right(self.sorted, value) / len(self.sorted))
+
+
+# Golden CSV columns are <indicator>_<period>, e.g. ema_50, atr_14, adx_14, pdi_14, rsi_14,
+# dchu_40/dchl_40 (Donchian upper/lower) and atrpct_240 (ATR percentile of the file's atr_<n>
+# column), next to time/open/high/low/close, as written by ExportIndicatorGolden.mq5.
+GOLDEN_COLUMN = re.compile(r"^(ema|sma|smma|atr|adx|pdi|ndi|adxw|pdiw|ndiw|rsi|dchu|dchl|atrpct)_(\d+)$")
+OSCILLATORS = ("adx", "pdi", "ndi", "adxw", "pdiw", "ndiw", "rsi", "atrpct")
+
+
+def compute_golden_column(name: str, period: int, bars: Dict[str, np.ndarray]) -> np.ndarray:
+    h, l, c = bars["high"], bars["low"], bars["close"]
+    if name == "ema":
+        return ema(c, period)
+    if name == "sma":
+        return sma(c, period)
+    if name == "smma":
+        return smma(c, period)
+    if name == "atr":
+        return atr(h, l, c, period)
+    if name == "rsi":
+        return rsi(c, period)
+    if name in ("adx", "pdi", "ndi"):
+        return adx(h, l, c, period)[("adx", "pdi", "ndi").index(name)]
+    if name in ("dchu", "dchl"):
+        return donchian(h, l, period)[("dchu", "dchl").index(name)]
+    if name == "atrpct":
+        # Percentile of the terminal's own ATR buffer, as GetAtrPercentile reads it.
+        column = next(k for k in bars if re.match(r"^atr_\d+$", k))
+        return atr_percentile(bars[column], period)
+    return adx_wilder(h, l, c, period)[("adxw", "pdiw", "ndiw").index(name)]
+
+
+def golden_diffs(bars: Dict[str, np.ndarray], warmup_bars: int, tolerance: float) -> List[Tuple[str, float, float, int]]:
+    # (column, max |python - golden|, allowed, bars compared) per golden column, after warmup_bars.
+    scale = max(1.0, float(np.nanmax(np.abs(bars["close"]))))
+    out: List[Tuple[str, float, float, int]] = []
+    for column, expected in bars.items():
+        m = GOLDEN_COLUMN.match(column)
+        if not m:
+            continue
+        got = compute_golden_column(m.group(1), int(m.group(2)), bars)[warmup_bars:]
+        want = expected[warmup_bars:]
+        mask = np.isfinite(got) & np.isfinite(want)
+        # Oscillators (ADX/DI/RSI/percentile) live on a 0..100 scale, price-like lines on the close scale.
+        tol = tolerance * (100.0 if m.group(1) in OSCILLATORS else scale)
+        diff = float(np.max(np.abs(got[mask] - want[mask]))) if mask.any() else 0.0
+        out.append((column, diff, tol, int(mask.sum())))
+    return out
+
+
+def self_check(bars: Dict[str, np.ndarray]) -> List[str]:
+    # Batch kernels vs one-bar-at-a-time states (must be bit-identical) and resumed vs full runs.
+    h, l, c = bars["high"], bars["low"], bars["close"]
+    failures: List[str] = []
+    e = EMAState(20)
+    if not np.array_equal(ema(c, 20), [e.update(x) for x in c]):
+        failures.append("ema batch != EMAState")
+    a = ATRState(14)
+    if not np.array_equal(atr(h, l, c, 14), [a.update(*x) for x in zip(h, l, c)], equal_nan=True):
+        failures.append("atr batch != ATRState")
+    r = RSIState(14)
+    if not np.array_equal(rsi(c, 14), [r.update(x) for x in c], equal_nan=True):
+        failures.append("rsi batch != RSIState")
+    full = adx(h, l, c, 14)
+    st = ADXState(14)
+    half = len(c) // 2
+    first = adx(h[:half], l[:half], c[:half], 14, state=st)
+    second = adx(h[half:], l[half:], c[half:], 14, state=st)
+    for k, label in enumerate(("adx", "pdi", "ndi")):
+        if not np.array_equal(full[k], np.r_[first[k], second[k]]):
+            failures.append(f"{label} resumed != full")
+    sm = SMMAState(14)
+    if not np.array_equal(smma(c, 14), [sm.update(x) for x in c], equal_nan=True):
+        failures.append("smma batch != SMMAState")
+    w = ADXWilderState(14)
+    stepped = np.array([w.update(*x) for x in zip(h, l, c)]).reshape(-1, 3).T
+    for k, label in enumerate(("adxw", "pdiw", "ndiw")):
+        if not np.array_equal(adx_wilder(h, l, c, 14)[k], stepped[k]):
+            failures.append(f"{label} batch != ADXWilderState")
+    d = DonchianState(20)
+    stepped = np.array([d.update(*x) for x in zip(h, l)]).reshape(-1, 2).T
+    for k, label in enumerate(("donchian upper", "donchian lower")):
+        if not np.array_equal(donchian(h, l, 20)[k], stepped[k], equal_nan=True):
+            failures.append(f"{label} batch != DonchianState")
+    atr_values = atr(h, l, c, 14)
+    pct = AtrPercentileState(240)
+    if not np.array_equal(atr_percentile(atr_values, 240), [pct.update(x) for x in atr_values], equal_nan=True):
+        failures.append("atr_percentile batch != AtrPercentileState")
+    seeded = ema(c[half:], 20, seed=ema(c[:half], 20)[-1]) if half else np.empty(0)
+    if not np.array_equal(ema(c, 20)[half:], seeded):
+        failures.append("ema resumed != full")
+    return failures
+
+
+def read_golden_csv(path: Path) -> Dict[str, np.ndarray]:
+    with path.open("r", encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.DictReader(f))
+    if not rows:
+        raise ValueError(f"Empty golden CSV: {path}")
+    out: Dict[str, np.ndarray] = {}
+    for key in rows[0]:
+        if key == "time":
+            continue
+        out[key] = np.array([float(r[key]) if r[key] not in ("", "nan") else np.nan for r in rows])
+    return out
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Check indicator kernels against MT5 golden CSV exports.")
+    parser.add_argument("--golden-csv", action="append", default=[], help="CSV from ExportIndicatorGolden.mq5 (repeatable).")
+    parser.add_argument("--tolerance", type=float, default=1e-8, help="Max abs difference, relative to price scale.")
+    parser.add_argument(
+        "--warmup-bars",
+        type=int,
+        default=2000,
+        help="Leading bars skipped: MT5 seeds recursive indicators from its full history, not the export start.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if not args.golden_csv:
+        raise SystemExit("Pass at least one --golden-csv.")
+    failed = False
+    for path in (Path(p) for p in args.golden_csv):
+        bars = read_golden_csv(path)
+        for problem in self_check(bars):
+            print(f"{path.name}: SELF-CHECK {problem}")
+            failed = True
+        for column, diff, tol, compared in golden_diffs(bars, args.warmup_bars, args.tolerance):
+            status = "OK" if diff <= tol else "FAIL"
+            failed |= status == "FAIL"
+            print(f"{path.name}: {column:10s} max_abs_diff={diff:.3e} tol={tol:.1e} bars={compared} {status}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
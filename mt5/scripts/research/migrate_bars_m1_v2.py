@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from common import dump_json, utc_now_iso
+from research_db import bars_min_max_count, bars_range_sql, bars_schema_version, migrate_v1_to_v2, ts_expr
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Migrate bars_m1 to schema v2 (INTEGER epoch key, WITHOUT ROWID).")
+    parser.add_argument("--db-path", required=True)
+    parser.add_argument(
+        "--benchmark",
+        action="store_true",
+        help="Compare v1 vs v2 size and range-scan speed on a temporary copy; the source DB is left untouched.",
+    )
+    parser.add_argument("--symbol", default="XAUUSD", help="Symbol used for benchmark range scans.")
+    parser.add_argument("--scans", type=int, default=200, help="Benchmark range scans per layout.")
+    parser.add_argument("--scan-days", type=int, default=7, help="Benchmark range width in days.")
+    parser.add_argument("--output-json", default="", help="Optional benchmark JSON output path.")
+    return parser.parse_args()
+
+
+def db_size_bytes(path: Path) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    return path.stat().st_size
+
+
+def scan_windows(conn: sqlite3.Connection, symbol: str, scans: int, scan_days: int) -> List[Tuple[int, int]]:
+    min_ts, max_ts, _ = bars_min_max_count(conn, symbol)
+    if min_ts is None or max_ts is None:
+        return []
+    width = scan_days * 86400
+    rnd = random.Random(20240101)
+    hi = max(int(min_ts), int(max_ts) - width)
+    return [(start, start + width) for start in (rnd.randint(int(min_ts), hi) for _ in range(scans))]
+
+
+def time_range_scans(path: Path, symbol: str, windows: List[Tuple[int, int]]) -> Dict[str, float]:
+    conn = sqlite3.connect(path)
+    try:
+        rows = 0
+        started = time.perf_counter()
+        for from_ts, to_ts in windows:
+            clause, params = bars_range_sql(conn, symbol, from_ts, to_ts)
+            cur = conn.execute(f"SELECT {ts_expr(conn)}, open, high, low, close {clause} ORDER BY ts_server", params)
+            rows += len(cur.fetchall())
+        elapsed = time.perf_counter() - started
+    finally:
+        conn.close()
+    return {
+        "scans": len(windows),
+        "rows_read": rows,
+        "elapsed_sec": round(elapsed, 4),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+def run_benchmark(db_path: Path, symbol: str, scans: int, scan_days: int) -> Dict[str, object]:
+    with tempfile.TemporaryDirectory() as tmp:
+        v1_path = Path(tmp) / "bars_v1.sqlite"
+        shutil.copy2(db_path, v1_path)
+        conn = sqlite3.connect(v1_path)
+        try:
+            if bars_schema_version(conn) != 1:
+                raise RuntimeError("Benchmark needs a schema v1 database as input.")
+            windows = scan_windows(conn, symbol, scans, scan_days)
+        finally:
+            conn.close()
+
+        v1_size = db_size_bytes(v1_path)
+        v1_stats = time_range_scans(v1_path, symbol, windows)
+
+        v2_path = Path(tmp) / "bars_v2.sqlite"
+        shutil.copy2(v1_path, v2_path)
+        conn = sqlite3.connect(v2_path)
+        try:
+            started = time.perf_counter()
+            migration = migrate_v1_to_v2(conn)
+            migrate_sec = time.perf_counter() - started
+        finally:
+            conn.close()
+        v2_size = db_size_bytes(v2_path)
+        v2_stats = time_range_scans(v2_path, symbol, windows)
+
+    return {
+        "generated_at": utc_now_iso(),
+        "db_path": str(db_path),
+        "symbol": symbol,
+        "scan_days": scan_days,
+        "migration": {**migration, "elapsed_sec": round(migrate_sec, 3)},
+        "v1": {"size_bytes": v1_size, **v1_stats},
+        "v2": {"size_bytes": v2_size, **v2_stats},
+        "size_ratio_v2_over_v1": round(v2_size / v1_size, 4) if v1_size else 0.0,
+        "scan_speedup_v2_over_v1": round(v1_stats["elapsed_sec"] / v2_stats["elapsed_sec"], 3)
+        if v2_stats["elapsed_sec"]
+        else 0.0,
+    }
+
+
+def main() -> None:
+    args = parse_args()
+    db_path = Path(args.db_path)
+    if not db_path.exists():
+        raise FileNotFoundError(f"SQLite database not found: {db_path}")
+
+    if args.benchmark:
+        payload = run_benchmark(db_path, args.symbol, args.scans, args.scan_days)
+        if args.output_json:
+            dump_json(Path(args.output_json), payload)
+        print(f"v1: {payload['v1']}")
+        print(f"v2: {payload['v2']}")
+        print(f"Size ratio v2/v1: {payload['size_ratio_v2_over_v1']}")
+        print(f"Range-scan speedup v2 vs v1: {payload['scan_speedup_v2_over_v1']}x")
+        return
+
+    conn = sqlite3.connect(db_path)
+    try:
+        result = migrate_v1_to_v2(conn)
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    print(f"Migrated {db_path} from schema v{result['from_version']}: {result['migrated_rows']} bars rewritten.")
+
+
+if __name__ == "__main__":
+    main()
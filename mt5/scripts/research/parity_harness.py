@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import csv
+import statistics
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from backtest_ema_research import (
+    EXPERT_OVERRIDES,
+    PARITY_METRICS,
+    candidate_from_inputs,
+    compare_metrics,
+    parity_limits,
+    replay_settings,
+    settings_timeframe,
+)
+from bar_store import BarStore
+from common import ReportSettings, dump_json, ensure_dir, parse_ini_settings, parse_mt5_report, parse_report_settings
+from resample_bars import ResampledStore
+
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+CSV_COLUMNS = (
+    "report",
+    "ini",
+    "expert",
+    "symbol",
+    "strategy_tf",
+    "from_date",
+    "to_date",
+    "status",
+    "failed_metrics",
+    *(f"{name}_{side}" for name, _ in PARITY_METRICS for side in ("mt5", "py", "delta")),
+)
+# PASS/FAIL rows were replayed and compared; the rest say why a report could not be.
+COMPARED = ("PASS", "FAIL")
+FAILING = ("FAIL", "ERROR")
+
+# Per-process store, set by init_worker so each worker memory-maps the bar store once.
+_RESAMPLED: Optional[ResampledStore] = None
+
+
+def init_worker(store_dir: str, cache_dir: str) -> None:
+    global _RESAMPLED
+    _RESAMPLED = ResampledStore(BarStore(Path(store_dir)), Path(cache_dir) if cache_dir else None)
+
+
+def index_inis(config_dirs: Sequence[Path]) -> Dict[str, Tuple[Path, ReportSettings]]:
+    # Keyed by the lower-cased Report= basename: the monthly analysis names its .ini files
+    # differently from the reports they produce, the strategy search uses the same stem for both.
+    out: Dict[str, Tuple[Path, ReportSettings]] = {}
+    for config_dir in config_dirs:
+        for path in sorted(config_dir.glob("*.ini")):
+            parsed = parse_ini_settings(path)
+            if parsed is None:
+                continue
+            report, settings = parsed
+            out[(report or path.stem).lower()] = (path, settings)
+    return out
+
+
+def thresholds(args: argparse.Namespace, deposit: float) -> Dict[str, float]:
+    return parity_limits(deposit, args.trade_tolerance, args.money_tolerance_pct, args.pf_tolerance, args.dd_pct_tolerance)
+
+
+def check_report(job: Tuple[str, str, Optional[ReportSettings], Dict[str, float]]) -> Dict[str, object]:
+    if _RESAMPLED is None:
+        raise RuntimeError("check_report needs init_worker to open the bar store first.")
+    report_path, ini_path, ini_settings, limits = job
+    report = Path(report_path)
+    row: Dict[str, object] = {"report": report.name, "ini": Path(ini_path).name if ini_path else ""}
+    # Any failure on one report (bad inputs, unreadable file, engine error) becomes that report's
+    # ERROR row instead of aborting the whole pool.map.
+    try:
+        settings = ini_settings or parse_report_settings(report)
+        if settings is None:
+            row["status"] = "NO_SETTINGS"
+            return row
+        row.update(
+            expert=settings.expert,
+            symbol=settings.symbol,
+            from_date=settings.from_date.isoformat(),
+            to_date=settings.to_date.isoformat(),
+        )
+        row["strategy_tf"] = settings_timeframe(settings)
+        if settings.expert not in EXPERT_OVERRIDES:
+            row["status"] = "UNSUPPORTED_EXPERT"
+            return row
+        if candidate_from_inputs(settings.inputs, settings.expert).evaluate_on_every_tick:
+            row["status"] = "UNSUPPORTED_MODE"
+            row["failed_metrics"] = "InpEvaluateOnEveryTick"
+            return row
+        mt5 = parse_mt5_report(report)
+        if mt5.status != "OK":
+            row["status"] = f"REPORT_{mt5.status}"
+            return row
+        months = _RESAMPLED.m1.months(settings.symbol)
+        if not months or settings.from_date < months[0] or settings.to_date.replace(day=1) > months[-1]:
+            row["status"] = "NO_DATA"
+            return row
+        values, failed = compare_metrics(mt5, replay_settings(_RESAMPLED, settings), limits)
+    except Exception as exc:
+        row["status"] = "ERROR"
+        row["failed_metrics"] = f"{type(exc).__name__}: {exc}"
+        return row
+    row.update(values)
+    row["status"] = "FAIL" if failed else "PASS"
+    row["failed_metrics"] = " ".join(failed)
+    return row
+
+
+def summarize(rows: List[Dict[str, object]]) -> Dict[str, object]:
+    statuses: Dict[str, int] = {}
+    for row in rows:
+        statuses[str(row["status"])] = statuses.get(str(row["status"]), 0) + 1
+    compared = [r for r in rows if r["status"] in COMPARED]
+    deltas: Dict[str, Dict[str, float]] = {}
+    for name, _ in PARITY_METRICS:
+        values = [abs(float(r[f"{name}_delta"])) for r in compared]
+        if values:
+            deltas[name] = {
+                "median_abs": round(statistics.median(values), 2),
+                "max_abs": round(max(values), 2),
+                "failing": sum(name in str(r["failed_metrics"]).split() for r in compared),
+            }
+    return {
+        "reports": len(rows),
+        "compared": len(compared),
+        "passed": statuses.get("PASS", 0),
+        "statuses": dict(sorted(statuses.items())),
+        "deltas": deltas,
+        "overall_pass": bool(compared) and not any(r["status"] in FAILING for r in rows),
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Replay saved MT5 tester reports with the Python backtester and compare metrics per report."
+    )
+    parser.add_argument("--store-dir", required=True, help="Columnar bar store root holding <SYMBOL>/M1 partitions.")
+    parser.add_argument("--cache-dir", default="", help="Optional root for resampled bars; defaults to --store-dir.")
+    parser.add_argument(
+        "--reports-dir",
+        action="append",
+        default=[],
+        help="Directory of MT5 .htm reports (repeatable); defaults to mt5/reports.",
+    )
+    parser.add_argument(
+        "--config-dir",
+        action="append",
+        default=[],
+        help="Directory of tester .ini files matched to reports by Report= (repeatable); defaults to mt5/config. "
+        "Pass a strategy-search run's config dir next to its reports dir.",
+    )
+    parser.add_argument("--glob", default="*.htm", help="Report file glob (default: *.htm).")
+    parser.add_argument("--out-csv", required=True, help="Per-report deltas; the summary goes next to it as .json.")
+    parser.add_argument("--workers", type=int, default=1, help="Processes replaying reports in parallel.")
+    parser.add_argument("--trade-tolerance", type=int, default=0)
+    parser.add_argument("--money-tolerance-pct", type=float, default=1.0, help="Allowed net/DD gap as %% of the deposit.")
+    parser.add_argument("--pf-tolerance", type=float, default=0.05, help="Allowed absolute profit factor gap.")
+    parser.add_argument("--dd-pct-tolerance", type=float, default=1.0, help="Allowed drawdown gap in percentage points.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    reports_dirs = [Path(p) for p in args.reports_dir] or [REPO_ROOT / "mt5" / "reports"]
+    config_dirs = [Path(p) for p in args.config_dir] or [REPO_ROOT / "mt5" / "config"]
+    inis = index_inis(config_dirs)
+    reports = sorted({p for d in reports_dirs for p in d.glob(args.glob)})
+    if not reports:
+        raise SystemExit("No reports found.")
+
+    jobs = []
+    for report in reports:
+        ini_path, settings = inis.get(report.stem.lower(), (None, None))
+        deposit = settings.deposit if settings is not None else 25000.0
+        jobs.append((str(report), str(ini_path) if ini_path else "", settings, thresholds(args, deposit)))
+    print(f"{len(reports)} reports, {sum(1 for j in jobs if j[1])} matched to an .ini")
+
+    # Resampled partitions are built here once, for every report, .ini-matched or not, so the
+    # workers' own refresh finds them current and only reads. A configuration that fails here is
+    # skipped; check_report then reports it as ERROR. Partition and sources.json writes are atomic
+    # and per-process, so a worker that does rebuild cannot corrupt another's files.
+    resampled = ResampledStore(BarStore(Path(args.store_dir)), Path(args.cache_dir) if args.cache_dir else None)
+    needed: Set[Tuple[str, str]] = set()
+    for report, _, settings, _ in jobs:
+        try:
+            settings = settings or parse_report_settings(Path(report))
+            if settings is not None:
+                needed.add((settings.symbol, settings_timeframe(settings)))
+        except (OSError, ValueError):
+            continue
+    for symbol, tf in sorted(needed):
+        if tf != "M1" and resampled.m1.months(symbol):
+            try:
+                resampled.refresh(symbol, tf)
+            except ValueError:
+                continue
+
+    if args.workers > 1:
+        with ProcessPoolExecutor(
+            max_workers=min(args.workers, len(jobs)),
+            initializer=init_worker,
+            initargs=(args.store_dir, args.cache_dir),
+        ) as pool:
+            rows = list(pool.map(check_report, jobs, chunksize=max(1, len(jobs) // (args.workers * 8))))
+    else:
+        init_worker(args.store_dir, args.cache_dir)
+        rows = [check_report(job) for job in jobs]
+
+    out_csv = Path(args.out_csv)
+    ensure_dir(out_csv.parent)
+    with out_csv.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    summary = summarize(rows)
+    dump_json(out_csv.with_suffix(".json"), summary)
+
+    print(f"wrote {out_csv}")
+    print("  ".join(f"{k}={v}" for k, v in summary["statuses"].items()))
+    for name, stats in summary["deltas"].items():
+        print(f"{name:>7}: median |delta|={stats['median_abs']} max |delta|={stats['max_abs']} failing={stats['failing']}")
+    print(f"{summary['passed']}/{summary['compared']} compared reports within tolerance")
+    sys.exit(0 if summary["overall_pass"] else 1)
+
+
+if __name__ == "__main__":
+    main()
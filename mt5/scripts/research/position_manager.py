@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import dataclasses
+import math
+from typing import Dict
+
+import numpy as np
+
+from bar_store import BarArrays
+
+try:
+    from numba import njit as _njit
+except ImportError:  # numba is optional; the plain loops below give identical results, only slower.
+    _njit = None
+
+
+def _kernel(fn):
+    return _njit(cache=True)(fn) if _njit is not None else fn
+
+
+# Exit reasons, in kernel code order. "be" and "trail" are stop hits after the stop was moved to
+# break-even or beyond it; "open" means the position was still open at the scan limit.
+EXIT_REASONS = ("open", "sl", "tp", "be", "trail", "time", "friday", "end")
+EXIT_OPEN, EXIT_SL, EXIT_TP, EXIT_BE, EXIT_TRAIL, EXIT_TIME, EXIT_FRIDAY, EXIT_END = range(len(EXIT_REASONS))
+# PARTIAL_MIN_REMAIN_STEP in XAUUSD_V1_VolatilityTrend: a partial must leave more than this many lot steps open.
+PARTIAL_MIN_REMAIN_STEPS = 2
+# XAUUSD_V1_VolatilityTrend: H1 signal bar (bar count, ATR and SL updates) and the smallest SL change it sends.
+V1_BAR_SECONDS = 3600
+V1_MIN_SL_STEP_POINTS = 2.0
+
+
+@dataclasses.dataclass(frozen=True)
+class ExitParams:
+    # ManageOpenPosition of the XAUUSD EAs. R is the initial stop distance; inf/0 disable a rule,
+    # so the defaults leave a position to its SL/TP only. friday_flat_minute is the server minute
+    # of day from which Friday positions are flattened (-1 = off); max_bars_in_trade counts
+    # bar_seconds periods since the fill. sl_on_new_bar holds SL moves back to the first tick of
+    # each bar_seconds bar, and SL moves smaller than min_sl_step_points are not sent.
+    be_trigger_r: float = math.inf
+    trail_start_r: float = math.inf
+    trail_atr: float = 0.0
+    partial_at_r: float = math.inf
+    partial_pct: float = 0.0
+    max_bars_in_trade: int = 0
+    bar_seconds: int = 900
+    friday_flat_minute: int = -1
+    volume_step: float = 0.01
+    min_volume: float = 0.01
+    sl_on_new_bar: bool = False
+    min_sl_step_points: float = 0.0
+
+    @property
+    def active(self) -> bool:
+        return (
+            math.isfinite(self.be_trigger_r)
+            or (math.isfinite(self.trail_start_r) and self.trail_atr > 0.0)
+            or (math.isfinite(self.partial_at_r) and self.partial_pct > 0.0)
+            or self.max_bars_in_trade > 0
+            or self.friday_flat_minute >= 0
+        )
+
+
+# XAUUSD_RobustBreakout input defaults (SignalTF M15, FridayFlat 21:45).
+ROBUST_BREAKOUT_EXITS = ExitParams(
+    be_trigger_r=1.0,
+    trail_start_r=1.2,
+    trail_atr=1.1,
+    max_bars_in_trade=32,
+    bar_seconds=900,
+    friday_flat_minute=21 * 60 + 45,
+)
+# EA input name -> ExitParams field (RobustBreakout, then V1_VolatilityTrend).
+INPUT_FIELDS: Dict[str, str] = {
+    "BE_Trigger_R": "be_trigger_r",
+    "TrailStart_R": "trail_start_r",
+    "TrailATR": "trail_atr",
+    "MaxBarsInTrade": "max_bars_in_trade",
+    "InpBreakEvenAtR": "be_trigger_r",
+    "InpATR_Trail_Mult": "trail_atr",
+    "InpPartialAtR": "partial_at_r",
+    "InpPartialPct": "partial_pct",
+    "InpMaxBarsInTrade": "max_bars_in_trade",
+}
+
+
+def exit_params_from_inputs(inputs: Dict[str, str], base: ExitParams = ExitParams()) -> ExitParams:
+    values: Dict[str, object] = {}
+    for name, raw in inputs.items():
+        field = INPUT_FIELDS.get(name)
+        if field is not None:
+            values[field] = int(float(raw)) if field == "max_bars_in_trade" else float(raw)
+    if "InpBreakEvenAtR" in inputs:
+        # V1 trails from its break-even trigger and counts, trails and updates the SL on H1 bars:
+        # with InpUseTrailingAfterBE it only sends an SL change on a new H1 bar, and never one under
+        # 2 points. Pass manage() the H1 ATR(InpATRPeriod) for it.
+        values["trail_start_r"] = values["be_trigger_r"]
+        values["bar_seconds"] = V1_BAR_SECONDS
+        values["min_sl_step_points"] = V1_MIN_SL_STEP_POINTS
+        values["sl_on_new_bar"] = inputs.get("InpUseTrailingAfterBE", "true").strip().lower() not in ("false", "0")
+    switches = {
+        "InpUseTrailingAfterBE": ("trail_atr", 0.0),
+        "InpUsePartialClose": ("partial_pct", 0.0),
+        "InpUseMaxBarsInTrade": ("max_bars_in_trade", 0),
+    }
+    for name, (field, off) in switches.items():
+        if inputs.get(name, "true").strip().lower() in ("false", "0"):
+            values[field] = off
+    return dataclasses.replace(base, **values)
+
+
+def atr_by_minute(bar_time: np.ndarray, atr: np.ndarray, m1_time: np.ndarray) -> np.ndarray:
+    # The ATR the EA reads at shift 1 during each M1 bar: the value of the last closed signal bar.
+    idx = np.searchsorted(np.asarray(bar_time, dtype=np.int64), np.asarray(m1_time, dtype=np.int64), side="right") - 2
+    out = np.full(len(idx), np.nan)
+    valid = idx >= 0
+    out[valid] = np.asarray(atr, dtype=np.float64)[idx[valid]]
+    return out
+
+
+@_kernel
+def _manage_kernel(
+    m_open,
+    m_high,
+    m_low,
+    m_close,
+    m_spread,
+    m_time,
+    atr_m1,
+    start,
+    limit,
+    open_time,
+    direction,
+    entry,
+    risk,
+    sl_in,
+    tp_in,
+    volume_in,
+    partial_done_in,
+    be_trigger_r,
+    trail_start_r,
+    trail_atr,
+    partial_at_r,
+    partial_pct,
+    max_bars,
+    bar_seconds,
+    friday_minute,
+    volume_step,
+    min_volume,
+    sl_on_new_bar,
+    min_sl_step,
+    point,
+    digits,
+    out_index,
+    out_price,
+    out_reason,
+    out_sl,
+    out_volume,
+    out_partial_done,
+    part_index,
+    part_price,
+    part_volume,
+):
+    path = np.empty(4)
+    for t in range(start.shape[0]):
+        d = direction[t]
+        sl = sl_in[t]
+        tp = tp_in[t]
+        vol = volume_in[t]
+        done = partial_done_in[t] or partial_pct <= 0.0
+        be_sl = round(entry[t], digits)
+        time_stop = open_time[t] + max_bars * bar_seconds if max_bars > 0 else -1
+        out_index[t] = -1
+        out_price[t] = 0.0
+        out_reason[t] = 0
+        k = start[t]
+        while k < limit[t]:
+            offset = 0.0 if d > 0 else m_spread[k] * point
+            hi = m_high[k] + offset
+            lo = m_low[k] + offset
+            fav = hi if d > 0 else lo
+            adv = lo if d > 0 else hi
+            now = m_time[k]
+            a = atr_m1[k]
+            # Skip the four-point walk when no level, R threshold or clock rule can fire in this bar.
+            quiet = not (sl > 0.0 and d * (adv - sl) <= 0.0)
+            quiet = quiet and not (tp > 0.0 and d * (fav - tp) >= 0.0)
+            quiet = quiet and not (time_stop >= 0 and now >= time_stop)
+            quiet = quiet and not (friday_minute >= 0 and (now // 86400 + 4) % 7 == 5 and (now // 60) % 1440 >= friday_minute)
+            if quiet and a > 0.0:
+                r_fav = d * (fav - entry[t]) / risk[t]
+                if not done and r_fav >= partial_at_r:
+                    quiet = False
+                elif r_fav >= be_trigger_r and (sl == 0.0 or d * (be_sl - sl) > 0.0):
+                    quiet = False
+                elif trail_atr > 0.0 and r_fav >= trail_start_r:
+                    trail_sl = round(fav - d * trail_atr * a, digits)
+                    if sl == 0.0 or d * (trail_sl - sl) > 0.0:
+                        quiet = False
+            if quiet:
+                k += 1
+                continue
+
+            # MT5 OHLC path: open-low-high-close on up bars, open-high-low-close otherwise.
+            path[0] = m_open[k] + offset
+            path[3] = m_close[k] + offset
+            if m_close[k] > m_open[k]:
+                path[1] = lo
+                path[2] = hi
+            else:
+                path[1] = hi
+                path[2] = lo
+            first = 1 if k == start[t] and now == open_time[t] else 0
+            for q in range(first, 4):
+                p = path[q]
+                # Server-side stops first; a level crossed between path points fills at the level,
+                # one the price opens beyond fills at the open.
+                if sl > 0.0 and d * (p - sl) <= 0.0:
+                    out_price[t] = p if q == 0 else sl
+                    if sl == be_sl:
+                        out_reason[t] = 3
+                    elif d * (sl - be_sl) > 0.0:
+                        out_reason[t] = 4
+                    else:
+                        out_reason[t] = 1
+                    break
+                if tp > 0.0 and d * (p - tp) >= 0.0:
+                    out_price[t] = p if q == 0 else tp
+                    out_reason[t] = 2
+                    break
+                if friday_minute >= 0 and (now // 86400 + 4) % 7 == 5 and (now // 60) % 1440 >= friday_minute:
+                    out_price[t] = p
+                    out_reason[t] = 6
+                    break
+                if time_stop >= 0 and now >= time_stop:
+                    out_price[t] = p
+                    out_reason[t] = 5
+                    break
+                if not (a > 0.0):
+                    continue
+                r = d * (p - entry[t]) / risk[t]
+                if not done and r >= partial_at_r:
+                    close_volume = math.floor(max(min_volume, vol * partial_pct / 100.0) / volume_step + 1e-9) * volume_step
+                    close_volume = round(close_volume, 8)
+                    if close_volume >= min_volume and close_volume < vol - PARTIAL_MIN_REMAIN_STEPS * volume_step:
+                        part_index[t] = k
+                        part_price[t] = p
+                        part_volume[t] = close_volume
+                        vol = round(vol - close_volume, 8)
+                        done = True
+                new_sl = sl
+                if r >= be_trigger_r and (sl == 0.0 or d * (be_sl - sl) > 0.0):
+                    new_sl = be_sl
+                if trail_atr > 0.0 and r >= trail_start_r:
+                    trail_sl = round(p - d * trail_atr * a, digits)
+                    if (new_sl == 0.0 or d * (trail_sl - new_sl) > 0.0) and d * (p - trail_sl) > 0.0:
+                        new_sl = trail_sl
+                if new_sl == sl or (sl > 0.0 and abs(new_sl - sl) < min_sl_step):
+                    continue
+                # The first tick of a bar is the open of the first M1 bar in a new bar_seconds bucket.
+                if sl_on_new_bar and not (q == 0 and (k == 0 or m_time[k] // bar_seconds != m_time[k - 1] // bar_seconds)):
+                    continue
+                sl = new_sl
+            if out_reason[t] != 0:
+                out_index[t] = k
+                break
+            k += 1
+        out_sl[t] = sl
+        out_volume[t] = vol
+        out_partial_done[t] = done
+
+
+@dataclasses.dataclass
+class PositionBook:
+    # Open positions as parallel arrays, one slot per position; manage() walks them forward in
+    # place, so a caller can stop at its own next decision bar and resume later.
+    start: np.ndarray
+    open_time: np.ndarray
+    direction: np.ndarray
+    entry: np.ndarray
+    risk: np.ndarray
+    sl: np.ndarray
+    tp: np.ndarray
+    volume: np.ndarray
+    partial_done: np.ndarray
+    exit_index: np.ndarray
+    exit_price: np.ndarray
+    exit_reason: np.ndarray
+    partial_index: np.ndarray
+    partial_price: np.ndarray
+    partial_volume: np.ndarray
+
+    @classmethod
+    def open(
+        cls,
+        m1: BarArrays,
+        start,
+        direction,
+        entry,
+        sl,
+        tp,
+        volume,
+        risk=None,
+    ) -> "PositionBook":
+        start = np.atleast_1d(np.asarray(start, dtype=np.int64))
+        n = len(start)
+        entry = np.broadcast_to(np.asarray(entry, dtype=np.float64), (n,)).copy()
+        sl = np.broadcast_to(np.asarray(sl, dtype=np.float64), (n,)).copy()
+        if risk is None:
+            risk = np.where(sl > 0.0, np.abs(entry - sl), np.nan)
+        return cls(
+            start=start.copy(),
+            open_time=np.asarray(m1.time, dtype=np.int64)[start],
+            direction=np.broadcast_to(np.asarray(direction, dtype=np.int64), (n,)).copy(),
+            entry=entry,
+            risk=np.broadcast_to(np.asarray(risk, dtype=np.float64), (n,)).copy(),
+            sl=sl,
+            tp=np.broadcast_to(np.asarray(tp, dtype=np.float64), (n,)).copy(),
+            volume=np.broadcast_to(np.asarray(volume, dtype=np.float64), (n,)).copy(),
+            partial_done=np.zeros(n, dtype=np.bool_),
+            exit_index=np.full(n, -1, dtype=np.int64),
+            exit_price=np.zeros(n),
+            exit_reason=np.zeros(n, dtype=np.int64),
+            partial_index=np.full(n, -1, dtype=np.int64),
+            partial_price=np.zeros(n),
+            partial_volume=np.zeros(n),
+        )
+
+    def __len__(self) -> int:
+        return int(self.start.shape[0])
+
+    def profit(self, contract_size: float) -> np.ndarray:
+        # Money result per position: the partial plus the remainder, for closed slots.
+        closed = self.exit_reason != EXIT_OPEN
+        partial = (self.partial_price - self.entry) * self.direction * self.partial_volume
+        rest = (self.exit_price - self.entry) * self.direction * self.volume
+        return np.where(closed, (partial + rest) * contract_size, np.nan)
+
+
+def manage(
+    book: PositionBook,
+    m1: BarArrays,
+    atr_m1: np.ndarray,
+    params: ExitParams,
+    point: float,
+    digits: int,
+    limit=None,
+    close_at_end: bool = False,
+) -> None:
+    # Walks every still-open position over M1 bars [start, limit) and records the first exit. Open
+    # positions resume from limit on the next call. close_at_end closes what is left at the last
+    # M1 close, as the tester does at the end of a test.
+    n_m1 = len(m1)
+    todo = np.flatnonzero(book.exit_reason == EXIT_OPEN)
+    if todo.size == 0:
+        return
+    stop = np.full(len(book), n_m1, dtype=np.int64) if limit is None else np.broadcast_to(np.asarray(limit, dtype=np.int64), (len(book),))
+    out_index = np.empty(todo.size, dtype=np.int64)
+    out_price = np.empty(todo.size)
+    out_reason = np.empty(todo.size, dtype=np.int64)
+    out_sl = np.empty(todo.size)
+    out_volume = np.empty(todo.size)
+    out_done = np.empty(todo.size, dtype=np.bool_)
+    part_index = book.partial_index[todo].copy()
+    part_price = book.partial_price[todo].copy()
+    part_volume = book.partial_volume[todo].copy()
+    _manage_kernel(
+        np.asarray(m1.open, dtype=np.float64),
+        np.asarray(m1.high, dtype=np.float64),
+        np.asarray(m1.low, dtype=np.float64),
+        np.asarray(m1.close, dtype=np.float64),
+        np.asarray(m1.spread, dtype=np.float64),
+        np.asarray(m1.time, dtype=np.int64),
+        np.asarray(atr_m1, dtype=np.float64),
+        book.start[todo],
+        np.minimum(stop[todo], n_m1),
+        book.open_time[todo],
+        book.direction[todo],
+        book.entry[todo],
+        book.risk[todo],
+        book.sl[todo],
+        book.tp[todo],
+        book.volume[todo],
+        book.partial_done[todo],
+        float(params.be_trigger_r),
+        float(params.trail_start_r),
+        float(params.trail_atr),
+        float(params.partial_at_r),
+        float(params.partial_pct),
+        int(params.max_bars_in_trade),
+        int(params.bar_seconds),
+        int(params.friday_flat_minute),
+        float(params.volume_step),
+        float(params.min_volume),
+        bool(params.sl_on_new_bar),
+        float(params.min_sl_step_points) * float(point),
+        float(point),
+        int(digits),
+        out_index,
+        out_price,
+        out_reason,
+        out_sl,
+        out_volume,
+        out_done,
+        part_index,
+        part_price,
+        part_volume,
+    )
+    book.sl[todo] = out_sl
+    book.volume[todo] = out_volume
+    book.partial_done[todo] = out_done
+    book.partial_index[todo] = part_index
+    book.partial_price[todo] = part_price
+    book.partial_volume[todo] = part_volume
+    book.exit_index[todo] = out_index
+    book.exit_price[todo] = out_price
+    book.exit_reason[todo] = out_reason
+    still_open = todo[out_reason == EXIT_OPEN]
+    book.start[still_open] = np.maximum(book.start[still_open], np.minimum(stop[still_open], n_m1))
+    if close_at_end and n_m1:
+        last = n_m1 - 1
+        price = float(m1.close[last])
+        book.exit_index[still_open] = last
+        book.exit_price[still_open] = np.where(book.direction[still_open] > 0, price, price + float(m1.spread[last]) * point)
+        book.exit_reason[still_open] = EXIT_END
+
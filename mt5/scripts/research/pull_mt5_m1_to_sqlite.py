@@ -3,120 +3,201 @@ from __future__ import annotations
 
 import argparse
 import csv
+import dataclasses
 import datetime as dt
+import itertools
 import sqlite3
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
 
+import numpy as np
+
+from bar_store import BarStore, export_sqlite_to_store
 from common import DEFAULT_TERMINAL_PATH, dump_json, ensure_dir, utc_now_iso
+from research_db import (
+    SCHEMA_VERSION,
+    bars_min_max_count,
+    checked_gaps,
+    create_schema,
+    record_gap_checks,
+    record_ingest,
+    require_v2,
+    symbol_id,
+    ts_to_text,
+)
+from trading_calendar import DST_MODES, TradingCalendar, calendar_for
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Pull MT5 M1 bars into SQLite.")
     parser.add_argument("--symbol", default="XAUUSD")
+    parser.add_argument(
+        "--symbols",
+        default="",
+        help="Comma-separated symbol list pulled in one terminal session, e.g. XAUUSD,EURUSD,US30. Overrides --symbol.",
+    )
     parser.add_argument("--from-date", default="2021-01-01")
     parser.add_argument("--to-date", default="2025-12-31")
     parser.add_argument("--terminal-path", default=str(DEFAULT_TERMINAL_PATH))
     parser.add_argument("--run-dir", required=True, help="Run folder under mt5/research_runs/<RUN_ID>.")
-    parser.add_argument("--db-path", default="", help="Optional custom sqlite path.")
+    parser.add_argument(
+        "--db-path",
+        default="",
+        help="Optional custom sqlite path, e.g. a persistent bar store shared across runs.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only fetch bars after MAX(ts_server) per symbol plus unchecked gap segments inside the range.",
+    )
     parser.add_argument("--source-terminal", default="MT5-terminal64")
-    return parser.parse_args()
-
-
-def create_schema(conn: sqlite3.Connection) -> None:
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS bars_m1 (
-            symbol TEXT NOT NULL,
-            ts_server TEXT NOT NULL,
-            open REAL NOT NULL,
-            high REAL NOT NULL,
-            low REAL NOT NULL,
-            close REAL NOT NULL,
-            tick_volume INTEGER NOT NULL,
-            spread INTEGER NOT NULL,
-            real_volume INTEGER NOT NULL,
-            source_terminal TEXT NOT NULL,
-            ingested_at TEXT NOT NULL,
-            PRIMARY KEY (symbol, ts_server)
-        )
-        """
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=2,
+        help="Concurrent copy_rates_range fetches; a single writer thread owns the SQLite connection.",
     )
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS feature_regime_daily (
-            symbol TEXT NOT NULL,
-            day TEXT NOT NULL,
-            atr14 REAL NOT NULL,
-            adx14 REAL NOT NULL,
-            range_pct REAL NOT NULL,
-            session_bucket TEXT NOT NULL,
-            trend_state TEXT NOT NULL,
-            whipsaw_score REAL NOT NULL,
-            PRIMARY KEY (symbol, day)
-        )
-        """
+    parser.add_argument(
+        "--max-bars-per-chunk",
+        type=int,
+        default=30000,
+        help="Upper bound of expected M1 bars per fetch window; windows returning this many bars are split.",
     )
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS backtest_runs (
-            run_id TEXT NOT NULL,
-            candidate_id TEXT NOT NULL,
-            period_type TEXT NOT NULL,
-            period_label TEXT NOT NULL,
-            from_date TEXT NOT NULL,
-            to_date TEXT NOT NULL,
-            net_profit REAL NOT NULL,
-            gross_profit REAL NOT NULL,
-            gross_loss REAL NOT NULL,
-            profit_factor REAL NOT NULL,
-            max_dd_pct REAL NOT NULL,
-            trades INTEGER NOT NULL,
-            report_file TEXT NOT NULL,
-            status TEXT NOT NULL
-        )
-        """
+    parser.add_argument(
+        "--bar-store-dir",
+        default="",
+        help="Optional columnar memmap bar store root; ingested range is mirrored there after the SQLite write.",
     )
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS candidates (
-            candidate_id TEXT PRIMARY KEY,
-            ea_file TEXT NOT NULL,
-            trade_mode TEXT NOT NULL,
-            tf TEXT NOT NULL,
-            fast INTEGER NOT NULL,
-            slow INTEGER NOT NULL,
-            filter INTEGER NOT NULL,
-            use_adx INTEGER NOT NULL,
-            adx_period INTEGER NOT NULL,
-            min_adx REAL NOT NULL,
-            use_atr INTEGER NOT NULL,
-            atr_period INTEGER NOT NULL,
-            min_atr REAL NOT NULL,
-            session_filter TEXT NOT NULL,
-            cooldown_bars INTEGER NOT NULL,
-            sl_atr REAL NOT NULL,
-            tp_atr REAL NOT NULL,
-            score_stage1 REAL NOT NULL DEFAULT 0,
-            score_stage2 REAL NOT NULL DEFAULT 0,
-            accepted INTEGER NOT NULL DEFAULT 0
-        )
-        """
+    parser.add_argument(
+        "--dst-mode",
+        choices=DST_MODES,
+        default="ny",
+        help="Broker server clock: 'ny' follows US DST (constant schedule), 'fixed' shifts the schedule in US summer.",
     )
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_bars_m1_symbol_ts ON bars_m1(symbol, ts_server)")
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_bars_m1_ts ON bars_m1(ts_server)")
-    conn.commit()
+    return parser.parse_args()
+
+
+def day_start_utc(d: dt.date) -> dt.datetime:
+    return dt.datetime(d.year, d.month, d.day, 0, 0, 0, tzinfo=dt.UTC)
+
+
+def plan_chunks(
+    start: dt.date,
+    end: dt.date,
+    max_bars: int,
+    calendar: TradingCalendar,
+) -> List[Tuple[dt.datetime, dt.datetime]]:
+    # Trading weeks (Mon 00:00 -> Sat 00:00) clipped to the range; windows with no expected minutes
+    # (weekends, holiday-only spans) are never requested. Consecutive weeks are merged while the
+    # calendar's expected M1 bar count stays under max_bars.
+    range_start = day_start_utc(start)
+    range_end = day_start_utc(end + dt.timedelta(days=1))
+    weeks: List[Tuple[dt.datetime, dt.datetime, int]] = []
+    monday = start - dt.timedelta(days=start.weekday())
+    while day_start_utc(monday) < range_end:
+        w_start = max(range_start, day_start_utc(monday))
+        w_end = min(range_end, day_start_utc(monday + dt.timedelta(days=5)))
+        if w_start < w_end:
+            expected = calendar.expected_minutes(int(w_start.timestamp()), int(w_end.timestamp()))
+            if expected > 0:
+                weeks.append((w_start, w_end, expected))
+        monday += dt.timedelta(days=7)
+
+    chunks: List[Tuple[dt.datetime, dt.datetime]] = []
+    cur_start: Optional[dt.datetime] = None
+    cur_end: Optional[dt.datetime] = None
+    cur_bars = 0
+    for w_start, w_end, expected in weeks:
+        if cur_start is not None and cur_bars + expected > max_bars:
+            chunks.append((cur_start, cur_end))
+            cur_start = None
+        if cur_start is None:
+            cur_start, cur_bars = w_start, 0
+        cur_end = w_end
+        cur_bars += expected
+    if cur_start is not None:
+        chunks.append((cur_start, cur_end))
+    return chunks
+
+
+def fetch_chunk(
+    mt5,
+    symbol: str,
+    chunk_start: dt.datetime,
+    chunk_end: dt.datetime,
+    max_bars: int,
+) -> List[Tuple[dt.datetime, dt.datetime, object]]:
+    # Splits the window in half when the terminal refuses it or the reply looks truncated at max_bars.
+    rates = mt5.copy_rates_range(symbol, mt5.TIMEFRAME_M1, chunk_start, chunk_end)
+    too_big = rates is not None and len(rates) >= max_bars
+    span = chunk_end - chunk_start
+    if (rates is None or too_big) and span > dt.timedelta(days=1):
+        mid = chunk_start + dt.timedelta(days=max(1, span.days // 2))
+        return fetch_chunk(mt5, symbol, chunk_start, mid, max_bars) + fetch_chunk(
+            mt5, symbol, mid, chunk_end, max_bars
+        )
+    return [(chunk_start, chunk_end, rates)]
+
+
+def interleave_tasks(
+    plans: Sequence[Tuple[str, Sequence[Tuple[dt.datetime, dt.datetime]]]],
+) -> List[Tuple[str, dt.datetime, dt.datetime]]:
+    # Round-robin across symbols so every instrument makes progress and no single
+    # symbol's history monopolizes the terminal.
+    tasks: List[Tuple[str, dt.datetime, dt.datetime]] = []
+    for row in itertools.zip_longest(*[[(sym, a, b) for a, b in chunks] for sym, chunks in plans]):
+        tasks.extend(t for t in row if t is not None)
+    return tasks
+
+
+def iter_fetched_chunks(
+    mt5,
+    tasks: Sequence[Tuple[str, dt.datetime, dt.datetime]],
+    workers: int,
+    max_bars: int,
+) -> Iterator[Tuple[str, List[Tuple[dt.datetime, dt.datetime, object]]]]:
+    # Bounded fan-out: at most 2 * workers planned windows are queued, and each window's
+    # (possibly split) results are handed back to the single calling (writer) thread in completion order.
+    pending: Dict[Future, str] = {}
+    todo = iter(tasks)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for symbol, chunk_start, chunk_end in itertools.islice(todo, max(1, workers) * 2):
+            pending[pool.submit(fetch_chunk, mt5, symbol, chunk_start, chunk_end, max_bars)] = symbol
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                yield pending.pop(fut), fut.result()
+                nxt = next(todo, None)
+                if nxt is not None:
+                    pending[pool.submit(fetch_chunk, mt5, nxt[0], nxt[1], nxt[2], max_bars)] = nxt[0]
+
+
+def load_mt5_module():
+    try:
+        import MetaTrader5 as mt5  # type: ignore
+    except ImportError as exc:
+        raise RuntimeError("MetaTrader5 package is not installed. Install with: pip install MetaTrader5") from exc
+    return mt5
+
 
+INSERT_BARS_SQL = """
+    INSERT INTO bars_m1 (
+        symbol_id, ts_server, open, high, low, close,
+        tick_volume, spread, real_volume
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
 
-def generate_day_ranges(start: dt.date, end: dt.date) -> List[Tuple[dt.datetime, dt.datetime]]:
-    ranges: List[Tuple[dt.datetime, dt.datetime]] = []
-    cur = start
-    while cur <= end:
-        day_start = dt.datetime(cur.year, cur.month, cur.day, 0, 0, 0, tzinfo=dt.UTC)
-        day_end = day_start + dt.timedelta(days=1)
-        ranges.append((day_start, day_end))
-        cur += dt.timedelta(days=1)
-    return ranges
+UPSERT_BARS_SQL = INSERT_BARS_SQL + """
+    ON CONFLICT(symbol_id, ts_server) DO UPDATE SET
+        open=excluded.open,
+        high=excluded.high,
+        low=excluded.low,
+        close=excluded.close,
+        tick_volume=excluded.tick_volume,
+        spread=excluded.spread,
+        real_volume=excluded.real_volume
+"""
 
 
 def insert_rates(
@@ -125,93 +206,225 @@ def insert_rates(
     rates,
     range_start: dt.datetime,
     range_end: dt.datetime,
-    source_terminal: str,
+    append_only: bool = False,
 ) -> int:
+    # Vectorized: range filter by mask, bulk column conversion via tolist(), one executemany
+    # in a single transaction. append_only skips the UPSERT when the window is known to be new.
     if rates is None or len(rates) == 0:
         return 0
 
-    ingested_at = utc_now_iso()
-    rows = []
-    for r in rates:
-        ts_dt = dt.datetime.fromtimestamp(int(r["time"]), dt.UTC)
-        if ts_dt < range_start or ts_dt >= range_end:
-            continue
-        ts = ts_dt.strftime("%Y-%m-%d %H:%M:%S")
-        rows.append(
-            (
-                symbol,
-                ts,
-                float(r["open"]),
-                float(r["high"]),
-                float(r["low"]),
-                float(r["close"]),
-                int(r["tick_volume"]),
-                int(r["spread"]),
-                int(r["real_volume"]),
-                source_terminal,
-                ingested_at,
-            )
-        )
-
-    if not rows:
+    times = np.asarray(rates["time"], dtype=np.int64)
+    mask = (times >= int(range_start.timestamp())) & (times < int(range_end.timestamp()))
+    count = int(np.count_nonzero(mask))
+    if count == 0:
         return 0
+    selected = rates if count == len(rates) else rates[mask]
+
+    sid = symbol_id(conn, symbol, create=True)
+    rows = zip(
+        itertools.repeat(sid, count),
+        times[mask].tolist(),
+        np.asarray(selected["open"], dtype=np.float64).tolist(),
+        np.asarray(selected["high"], dtype=np.float64).tolist(),
+        np.asarray(selected["low"], dtype=np.float64).tolist(),
+        np.asarray(selected["close"], dtype=np.float64).tolist(),
+        np.asarray(selected["tick_volume"], dtype=np.int64).tolist(),
+        np.asarray(selected["spread"], dtype=np.int64).tolist(),
+        np.asarray(selected["real_volume"], dtype=np.int64).tolist(),
+    )
+    with conn:
+        conn.executemany(INSERT_BARS_SQL if append_only else UPSERT_BARS_SQL, rows)
+    return count
+
 
-    conn.executemany(
+def iter_gap_ts(
+    conn: sqlite3.Connection,
+    symbol: str,
+    from_ts: Optional[int] = None,
+    to_ts: Optional[int] = None,
+) -> Iterator[Tuple[int, int, int]]:
+    # LAG over the (symbol_id, ts_server) primary key runs inside SQLite; only gap rows reach Python.
+    sid = symbol_id(conn, symbol)
+    cur = conn.execute(
         """
-        INSERT INTO bars_m1 (
-            symbol, ts_server, open, high, low, close,
-            tick_volume, spread, real_volume, source_terminal, ingested_at
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ON CONFLICT(symbol, ts_server) DO UPDATE SET
-            open=excluded.open,
-            high=excluded.high,
-            low=excluded.low,
-            close=excluded.close,
-            tick_volume=excluded.tick_volume,
-            spread=excluded.spread,
-            real_volume=excluded.real_volume,
-            source_terminal=excluded.source_terminal,
-            ingested_at=excluded.ingested_at
+        SELECT prev_ts, ts_server, (ts_server - prev_ts) / 60 - 1
+        FROM (
+            SELECT ts_server, LAG(ts_server) OVER (ORDER BY ts_server) AS prev_ts
+            FROM bars_m1
+            WHERE symbol_id = ? AND ts_server >= ? AND ts_server < ?
+        )
+        WHERE ts_server - prev_ts > 60
         """,
-        rows,
+        (
+            sid if sid is not None else -1,
+            from_ts if from_ts is not None else -(2**62),
+            to_ts if to_ts is not None else 2**62,
+        ),
     )
-    conn.commit()
-    return len(rows)
+    for prev_ts, cur_ts, missing in cur:
+        yield int(prev_ts), int(cur_ts), int(missing)
 
 
 def detect_gaps(conn: sqlite3.Connection, symbol: str) -> List[Tuple[str, str, int]]:
-    cur = conn.execute(
+    return [(ts_to_text(a), ts_to_text(b), n) for a, b, n in iter_gap_ts(conn, symbol)]
+
+
+def plan_incremental_windows(
+    conn: sqlite3.Connection,
+    symbol: str,
+    start: dt.date,
+    end: dt.date,
+    max_bars: int,
+    calendar: TradingCalendar,
+) -> Tuple[List[Tuple[dt.datetime, dt.datetime]], List[Tuple[int, int]]]:
+    # Missing tail after MAX(ts_server) plus unchecked gap segments that cover expected trading minutes.
+    _, max_ts, _ = bars_min_max_count(conn, symbol)
+    if max_ts is None:
+        return plan_chunks(start, end, max_bars, calendar), []
+
+    range_start_ts = int(day_start_utc(start).timestamp())
+    range_end_ts = int(day_start_utc(end + dt.timedelta(days=1)).timestamp())
+    windows: List[Tuple[dt.datetime, dt.datetime]] = []
+    tail_from = dt.datetime.fromtimestamp(max(range_start_ts, int(max_ts) + 60), dt.UTC)
+    for chunk_start, chunk_end in plan_chunks(tail_from.date(), end, max_bars, calendar):
+        if chunk_end <= tail_from:
+            continue
+        windows.append((max(chunk_start, tail_from), chunk_end))
+
+    already_checked = checked_gaps(conn, symbol)
+    gap_windows: List[Tuple[int, int]] = []
+    for gap_start, gap_end, _missing in iter_gap_ts(conn, symbol):
+        if gap_end <= range_start_ts or gap_start >= range_end_ts:
+            continue
+        if (gap_start, gap_end) in already_checked or calendar.classify_gap(gap_start, gap_end)[0] != "missing":
+            continue
+        gap_windows.append((gap_start, gap_end))
+        windows.append(
+            (
+                dt.datetime.fromtimestamp(gap_start + 60, dt.UTC),
+                dt.datetime.fromtimestamp(gap_end, dt.UTC),
+            )
+        )
+    return windows, gap_windows
+
+
+def days_with_bars(conn: sqlite3.Connection, symbol: str, from_ts: int, to_ts: int) -> Set[int]:
+    sid = symbol_id(conn, symbol)
+    rows = conn.execute(
         """
-        SELECT ts_server
+        SELECT DISTINCT ts_server / 86400
         FROM bars_m1
-        WHERE symbol = ?
-        ORDER BY ts_server
+        WHERE symbol_id = ? AND ts_server >= ? AND ts_server < ?
         """,
-        (symbol,),
+        (sid, from_ts, to_ts),
+    ).fetchall()
+    return {int(r[0]) for r in rows}
+
+
+QUALITY_GATE_MAX_MISSING_DAY_RATIO = 0.005
+
+
+@dataclasses.dataclass
+class SymbolPull:
+    symbol: str
+    chunks: List[Tuple[dt.datetime, dt.datetime]]
+    gap_windows: List[Tuple[int, int]]
+    known_max_ts: Optional[int]
+    windows_done: int = 0
+    fetch_calls: int = 0
+    rows_inserted: int = 0
+
+
+def parse_symbols(args: argparse.Namespace) -> List[str]:
+    raw = args.symbols if args.symbols else args.symbol
+    symbols: List[str] = []
+    for sym in (s.strip() for s in raw.split(",")):
+        if sym and sym not in symbols:
+            symbols.append(sym)
+    if not symbols:
+        raise ValueError("No symbols given.")
+    return symbols
+
+
+def summarize_symbol(
+    conn: sqlite3.Connection,
+    pull: SymbolPull,
+    args: argparse.Namespace,
+    start: dt.date,
+    end: dt.date,
+    ingested_at: str,
+) -> Tuple[Dict[str, object], List[Tuple[str, str, str, int]]]:
+    calendar = calendar_for(pull.symbol, args.dst_mode)
+    range_start_ts = int(day_start_utc(start).timestamp())
+    range_end_ts = int(day_start_utc(end + dt.timedelta(days=1)).timestamp())
+    if pull.gap_windows:
+        record_gap_checks(conn, pull.symbol, pull.gap_windows, ingested_at)
+
+    trading_days_list = calendar.trading_days(start, end)
+    stored_days = days_with_bars(conn, pull.symbol, range_start_ts, range_end_ts)
+    empty_days = [
+        d.strftime("%Y-%m-%d")
+        for d in trading_days_list
+        if int(day_start_utc(d).timestamp()) // 86400 not in stored_days
+    ]
+
+    record_ingest(
+        conn,
+        pull.symbol,
+        args.source_terminal,
+        ingested_at,
+        range_start_ts,
+        range_end_ts,
+        pull.rows_inserted,
     )
-    rows = [r[0] for r in cur.fetchall()]
-    gaps: List[Tuple[str, str, int]] = []
-    if len(rows) < 2:
-        return gaps
-
-    prev = dt.datetime.strptime(rows[0], "%Y-%m-%d %H:%M:%S")
-    for ts_text in rows[1:]:
-        cur_ts = dt.datetime.strptime(ts_text, "%Y-%m-%d %H:%M:%S")
-        diff_min = int((cur_ts - prev).total_seconds() // 60)
-        if diff_min > 1:
-            gaps.append(
-                (
-                    prev.strftime("%Y-%m-%d %H:%M:%S"),
-                    cur_ts.strftime("%Y-%m-%d %H:%M:%S"),
-                    diff_min - 1,
-                )
-            )
-        prev = cur_ts
-    return gaps
+    min_ts, max_ts, row_count = bars_min_max_count(conn, pull.symbol)
+
+    gaps: List[Tuple[str, str, str, int]] = []
+    expected_gaps: Dict[str, int] = {}
+    for gap_start, gap_end, _raw_missing in iter_gap_ts(conn, pull.symbol, range_start_ts, range_end_ts):
+        kind, missing = calendar.classify_gap(gap_start, gap_end)
+        if kind == "missing":
+            gaps.append((pull.symbol, ts_to_text(gap_start), ts_to_text(gap_end), missing))
+        else:
+            expected_gaps[kind] = expected_gaps.get(kind, 0) + 1
+
+    bar_store_rows = 0
+    if args.bar_store_dir and pull.chunks:
+        bar_store_rows = export_sqlite_to_store(
+            conn,
+            BarStore(Path(args.bar_store_dir)),
+            pull.symbol,
+            min(int(c[0].timestamp()) for c in pull.chunks),
+            max(int(c[1].timestamp()) for c in pull.chunks),
+        )
+
+    trading_days = len(trading_days_list)
+    missing_ratio = (len(empty_days) / trading_days) if trading_days > 0 else 0.0
+    section: Dict[str, object] = {
+        "rows_inserted_this_run": pull.rows_inserted,
+        "gap_windows_refetched": len(pull.gap_windows),
+        "fetch_chunks_planned": len(pull.chunks),
+        "fetch_calls_written": pull.fetch_calls,
+        "rows_total_symbol": int(row_count or 0),
+        "min_ts_server": ts_to_text(min_ts),
+        "max_ts_server": ts_to_text(max_ts),
+        "expected_minutes_in_range": calendar.expected_minutes(range_start_ts, range_end_ts),
+        "empty_days_count": len(empty_days),
+        "empty_days_sample": empty_days[:50],
+        "trading_days_estimate": trading_days,
+        "missing_day_ratio": round(float(missing_ratio), 6),
+        "gap_segments": len(gaps),
+        "expected_gap_segments": expected_gaps,
+        "missing_minutes_in_gaps": int(sum(g[3] for g in gaps)),
+        "quality_gate_pass": bool(missing_ratio <= QUALITY_GATE_MAX_MISSING_DAY_RATIO),
+        "bar_store_rows_written": bar_store_rows,
+    }
+    return section, gaps
 
 
 def main() -> None:
     args = parse_args()
+    symbols = parse_symbols(args)
 
     run_dir = Path(args.run_dir)
     data_dir = ensure_dir(run_dir / "data")
@@ -226,81 +439,87 @@ def main() -> None:
     if start > end:
         raise ValueError("--from-date must be <= --to-date")
 
-    try:
-        import MetaTrader5 as mt5  # type: ignore
-    except ImportError as exc:
-        raise RuntimeError("MetaTrader5 package is not installed. Install with: pip install MetaTrader5") from exc
-
+    mt5 = load_mt5_module()
     if not mt5.initialize(path=args.terminal_path):
         error = mt5.last_error()
         raise RuntimeError(f"MT5 initialize failed: {error}")
 
     try:
-        if not mt5.symbol_select(args.symbol, True):
-            raise RuntimeError(f"symbol_select failed for {args.symbol}. Ensure symbol exists in Market Watch.")
+        for symbol in symbols:
+            if not mt5.symbol_select(symbol, True):
+                raise RuntimeError(f"symbol_select failed for {symbol}. Ensure symbol exists in Market Watch.")
 
         conn = sqlite3.connect(db_path)
         try:
             create_schema(conn)
-            day_ranges = generate_day_ranges(start, end)
-
-            total_inserted = 0
-            empty_days: List[str] = []
-
-            for day_start, day_end in day_ranges:
-                rates = mt5.copy_rates_range(args.symbol, mt5.TIMEFRAME_M1, day_start, day_end)
-                inserted = insert_rates(
-                    conn,
-                    args.symbol,
-                    rates,
-                    day_start,
-                    day_end,
-                    args.source_terminal,
+            require_v2(conn)
+            ingested_at = utc_now_iso()
+            pulls: Dict[str, SymbolPull] = {}
+            for symbol in symbols:
+                calendar = calendar_for(symbol, args.dst_mode)
+                gap_windows: List[Tuple[int, int]] = []
+                if args.incremental:
+                    chunks, gap_windows = plan_incremental_windows(
+                        conn, symbol, start, end, args.max_bars_per_chunk, calendar
+                    )
+                else:
+                    chunks = plan_chunks(start, end, args.max_bars_per_chunk, calendar)
+                _, known_max_ts, _ = bars_min_max_count(conn, symbol)
+                pulls[symbol] = SymbolPull(symbol, chunks, gap_windows, known_max_ts)
+
+            tasks = interleave_tasks([(sym, pull.chunks) for sym, pull in pulls.items()])
+            for symbol, parts in iter_fetched_chunks(mt5, tasks, args.workers, args.max_bars_per_chunk):
+                pull = pulls[symbol]
+                for chunk_start, chunk_end, rates in parts:
+                    pull.fetch_calls += 1
+                    pull.rows_inserted += insert_rates(
+                        conn,
+                        symbol,
+                        rates,
+                        chunk_start,
+                        chunk_end,
+                        append_only=pull.known_max_ts is None
+                        or int(chunk_start.timestamp()) > int(pull.known_max_ts),
+                    )
+                pull.windows_done += 1
+                print(
+                    f"[{symbol}] {pull.windows_done}/{len(pull.chunks)} windows, "
+                    f"{pull.rows_inserted} rows (through {parts[-1][1]:%Y-%m-%d})",
+                    flush=True,
                 )
-                total_inserted += inserted
-                if inserted == 0 and day_start.weekday() < 5:
-                    empty_days.append(day_start.strftime("%Y-%m-%d"))
-
-            min_max = conn.execute(
-                """
-                SELECT MIN(ts_server), MAX(ts_server), COUNT(*)
-                FROM bars_m1
-                WHERE symbol = ?
-                """,
-                (args.symbol,),
-            ).fetchone()
-            min_ts, max_ts, row_count = min_max if min_max else (None, None, 0)
-
-            gaps = detect_gaps(conn, args.symbol)
+
+            per_symbol: Dict[str, Dict[str, object]] = {}
+            gaps: List[Tuple[str, str, str, int]] = []
+            for symbol, pull in pulls.items():
+                per_symbol[symbol], symbol_gaps = summarize_symbol(conn, pull, args, start, end, ingested_at)
+                gaps.extend(symbol_gaps)
+
             gaps_csv = summaries_dir / "data_gaps.csv"
             with gaps_csv.open("w", newline="", encoding="utf-8") as f:
                 writer = csv.writer(f)
-                writer.writerow(["GapStart", "GapEnd", "MissingMinutes"])
+                writer.writerow(["Symbol", "GapStart", "GapEnd", "MissingMinutes"])
                 writer.writerows(gaps)
 
-            trading_days = sum(1 for d in day_ranges if d[0].weekday() < 5)
-            missing_ratio = (len(empty_days) / trading_days) if trading_days > 0 else 0.0
-
             payload: Dict[str, object] = {
                 "stage": "pull_mt5_m1_to_sqlite",
                 "generated_at": utc_now_iso(),
-                "symbol": args.symbol,
+                "symbols": symbols,
                 "from_date": args.from_date,
                 "to_date": args.to_date,
                 "terminal_path": args.terminal_path,
                 "db_path": str(db_path),
-                "rows_inserted_this_run": total_inserted,
-                "rows_total_symbol": int(row_count or 0),
-                "min_ts_server": min_ts,
-                "max_ts_server": max_ts,
-                "empty_days_count": len(empty_days),
-                "empty_days_sample": empty_days[:50],
-                "trading_days_estimate": trading_days,
-                "missing_day_ratio": round(float(missing_ratio), 6),
-                "gap_segments": len(gaps),
+                "mode": "incremental" if args.incremental else "full",
+                "rows_inserted_this_run": sum(p.rows_inserted for p in pulls.values()),
+                "fetch_chunks_planned": len(tasks),
+                "fetch_calls_written": sum(p.fetch_calls for p in pulls.values()),
+                "fetch_workers": args.workers,
+                "schema_version": SCHEMA_VERSION,
+                "dst_mode": args.dst_mode,
                 "gaps_csv": str(gaps_csv),
-                "quality_gate_pass": bool(missing_ratio <= 0.005),
-                "quality_gate_threshold": 0.005,
+                "quality_gate_pass": all(bool(sec["quality_gate_pass"]) for sec in per_symbol.values()),
+                "quality_gate_threshold": QUALITY_GATE_MAX_MISSING_DAY_RATIO,
+                "bar_store_dir": args.bar_store_dir,
+                "per_symbol": per_symbol,
             }
 
             dump_json(summaries_dir / "ingestion_summary.json", payload)
@@ -309,7 +528,12 @@ def main() -> None:
                 encoding="utf-8",
             )
             print(f"Ingestion complete. SQLite: {db_path}")
-            print(f"Rows total for {args.symbol}: {int(row_count or 0)}")
+            for symbol, sec in per_symbol.items():
+                print(
+                    f"Rows total for {symbol}: {sec['rows_total_symbol']} "
+                    f"(+{sec['rows_inserted_this_run']}, gaps={sec['gap_segments']}, "
+                    f"gate={'pass' if sec['quality_gate_pass'] else 'FAIL'})"
+                )
             print(f"Summary: {summaries_dir / 'ingestion_summary.json'}")
         finally:
             conn.close()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import itertools
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from common import DEFAULT_TERMINAL_PATH, dump_json, ensure_dir, utc_now_iso
+from pull_mt5_m1_to_sqlite import day_start_utc, load_mt5_module
+from tick_store import TickArrays, TickStore
+from trading_calendar import DST_MODES, calendar_for
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Pull MT5 tick history into the compressed per-day tick store.")
+    parser.add_argument("--symbol", default="XAUUSD")
+    parser.add_argument("--from-date", default="2021-01-01")
+    parser.add_argument("--to-date", default="2025-12-31")
+    parser.add_argument("--terminal-path", default=str(DEFAULT_TERMINAL_PATH))
+    parser.add_argument("--run-dir", required=True, help="Run folder under mt5/research_runs/<RUN_ID>.")
+    parser.add_argument(
+        "--tick-store-dir",
+        default="",
+        help="Tick store root, e.g. a persistent store shared across runs. Defaults to <run-dir>/data/ticks.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Skip days already in the store; the newest stored day is always re-fetched.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=2,
+        help="Concurrent copy_ticks_range fetches; the calling thread encodes and writes day files.",
+    )
+    parser.add_argument("--dst-mode", choices=DST_MODES, default="ny")
+    return parser.parse_args()
+
+
+def fetch_ticks(mt5, symbol: str, start: dt.datetime, end: dt.datetime) -> TickArrays:
+    # Halves the window when the terminal refuses it (None); an empty day is a valid answer.
+    ticks = mt5.copy_ticks_range(symbol, start, end, mt5.COPY_TICKS_ALL)
+    if ticks is None and end - start > dt.timedelta(hours=1):
+        mid = start + (end - start) / 2
+        return TickArrays.concat([fetch_ticks(mt5, symbol, start, mid), fetch_ticks(mt5, symbol, mid, end)])
+    if ticks is None:
+        raise RuntimeError(f"copy_ticks_range failed for {symbol} {start} -> {end}: {mt5.last_error()}")
+    return TickArrays.from_ticks(ticks)
+
+
+def iter_fetched_days(
+    mt5,
+    symbol: str,
+    days: Sequence[dt.date],
+    workers: int,
+) -> Iterator[Tuple[dt.date, TickArrays]]:
+    # Same bounded fan-out as the M1 pull: at most 2 * workers days are held in memory.
+    pending: Dict[Future, dt.date] = {}
+    todo = iter(days)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+
+        def submit(day: dt.date) -> None:
+            start = day_start_utc(day)
+            pending[pool.submit(fetch_ticks, mt5, symbol, start, start + dt.timedelta(days=1))] = day
+
+        for day in itertools.islice(todo, max(1, workers) * 2):
+            submit(day)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                yield pending.pop(fut), fut.result()
+                nxt = next(todo, None)
+                if nxt is not None:
+                    submit(nxt)
+
+
+def main() -> None:
+    args = parse_args()
+
+    run_dir = Path(args.run_dir)
+    summaries_dir = ensure_dir(run_dir / "summaries")
+    store_dir = Path(args.tick_store_dir) if args.tick_store_dir else (run_dir / "data" / "ticks")
+    store = TickStore(store_dir)
+
+    start = dt.datetime.strptime(args.from_date, "%Y-%m-%d").date()
+    end = dt.datetime.strptime(args.to_date, "%Y-%m-%d").date()
+    if start > end:
+        raise ValueError("--from-date must be <= --to-date")
+
+    days: List[dt.date] = calendar_for(args.symbol, args.dst_mode).trading_days(start, end)
+    skipped = 0
+    if args.incremental:
+        stored = store.days(args.symbol)
+        done = set(stored[:-1])
+        skipped = sum(1 for d in days if d in done)
+        days = [d for d in days if d not in done]
+
+    mt5 = load_mt5_module()
+    if not mt5.initialize(path=args.terminal_path):
+        error = mt5.last_error()
+        raise RuntimeError(f"MT5 initialize failed: {error}")
+
+    try:
+        if not mt5.symbol_select(args.symbol, True):
+            raise RuntimeError(f"symbol_select failed for {args.symbol}. Ensure symbol exists in Market Watch.")
+        info = mt5.symbol_info(args.symbol)
+        if info is None:
+            raise RuntimeError(f"symbol_info failed for {args.symbol}: {mt5.last_error()}")
+        digits = int(info.digits)
+
+        ticks_written = 0
+        bytes_written = 0
+        empty_days: List[str] = []
+        for n, (day, ticks) in enumerate(iter_fetched_days(mt5, args.symbol, days, args.workers), start=1):
+            rows = store.write_day(args.symbol, day, ticks, digits)
+            ticks_written += rows
+            bytes_written += store.day_path(args.symbol, day).stat().st_size
+            if rows == 0:
+                empty_days.append(day.isoformat())
+            print(f"[{args.symbol}] {n}/{len(days)} {day}: {rows} ticks", flush=True)
+    finally:
+        mt5.shutdown()
+
+    # time_msc + bid + ask + flags as plain int64/float64/float64/uint32.
+    raw_bytes = ticks_written * (8 + 8 + 8 + 4)
+    payload: Dict[str, object] = {
+        "stage": "pull_mt5_ticks",
+        "generated_at": utc_now_iso(),
+        "symbol": args.symbol,
+        "from_date": args.from_date,
+        "to_date": args.to_date,
+        "terminal_path": args.terminal_path,
+        "tick_store_dir": str(store_dir),
+        "mode": "incremental" if args.incremental else "full",
+        "digits": digits,
+        "days_fetched": len(days),
+        "days_skipped_existing": skipped,
+        "empty_days_count": len(empty_days),
+        "empty_days_sample": empty_days[:50],
+        "ticks_written": ticks_written,
+        "bytes_written": bytes_written,
+        "compression_ratio": round(raw_bytes / bytes_written, 3) if bytes_written else 0.0,
+        "fetch_workers": args.workers,
+    }
+    dump_json(summaries_dir / "tick_ingestion_summary.json", payload)
+    print(f"Tick ingestion complete. Store: {store_dir}")
+    print(f"Ticks written: {ticks_written} ({bytes_written} bytes on disk)")
+    print(f"Summary: {summaries_dir / 'tick_ingestion_summary.json'}")
+
+
+if __name__ == "__main__":
+    main()
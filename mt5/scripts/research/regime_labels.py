@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import dataclasses
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from artifact_cache import DEFAULT_MAX_GB, ArtifactCache, open_cache
+from bar_store import BarStore
+from feature_matrix import GateParams, build_matrix
+from resample_bars import TIMEFRAME_SECONDS, ResampledStore
+from trading_calendar import DST_MODES, SESSION_NAMES, TradingCalendar, calendar_for
+
+
+# Code 0 is always UNKNOWN (not enough history); sessions are only meaningful below D1.
+LABEL_CATEGORIES: Dict[str, tuple] = {
+    "trend": ("UNKNOWN", "DOWN", "RANGE", "UP"),
+    "volatility": ("UNKNOWN", "LOW", "NORMAL", "HIGH"),
+    "chop": ("UNKNOWN", "CLEAN", "CHOP"),
+    "session": ("UNKNOWN",) + SESSION_NAMES + ("DAY",),
+}
+
+
+@dataclasses.dataclass(frozen=True)
+class RegimeParams:
+    # Trend/volatility thresholds default to the RobustBreakout gates (MinTrendSlopeAtr,
+    # Min/MaxAtrPercentile); chop is Kaufman's efficiency ratio over chop_bars closes.
+    timeframe: str = "M15"
+    trend_tf: str = "H1"
+    atr_period: int = 14
+    ema_fast: int = 50
+    ema_slow: int = 200
+    volatility_lookback_bars: int = 240
+    low_percentile: float = 20.0
+    high_percentile: float = 85.0
+    min_trend_slope: float = 0.20
+    chop_bars: int = 20
+    chop_efficiency: float = 0.30
+
+    def gate_params(self) -> GateParams:
+        return GateParams(
+            signal_tf=self.timeframe,
+            trend_tf=self.trend_tf,
+            atr_period=self.atr_period,
+            ema_fast=self.ema_fast,
+            ema_slow=self.ema_slow,
+            volatility_lookback_bars=self.volatility_lookback_bars,
+        )
+
+
+@dataclasses.dataclass
+class RegimeLabels:
+    # One row per bar: [start, end) in server epoch seconds plus a uint8 code per label dimension.
+    # Labels describe the bar as of its close, so joins are as-of: a timestamp gets the labels of
+    # the last bar that had closed by then, never of the bar still forming.
+    timeframe: str
+    start: np.ndarray
+    end: np.ndarray
+    codes: Dict[str, np.ndarray]
+    _cum: Dict[str, np.ndarray] = dataclasses.field(default_factory=dict, init=False, repr=False)
+
+    def __len__(self) -> int:
+        return int(self.start.shape[0])
+
+    def save(self, path: Path) -> None:
+        np.savez_compressed(
+            path,
+            timeframe=np.array(self.timeframe),
+            start=self.start,
+            end=self.end,
+            **{f"code_{dim}": codes for dim, codes in self.codes.items()},
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "RegimeLabels":
+        with np.load(path) as data:
+            codes = {dim: data[f"code_{dim}"] for dim in LABEL_CATEGORIES if f"code_{dim}" in data}
+            return cls(timeframe=str(data["timeframe"]), start=data["start"], end=data["end"], codes=codes)
+
+    def asof_index(self, ts) -> np.ndarray:
+        # Binary search on bar end times; -1 before the first bar has closed.
+        return np.searchsorted(self.end, np.asarray(ts, dtype=np.int64), side="right") - 1
+
+    def labels_at(self, ts) -> Dict[str, np.ndarray]:
+        idx = np.atleast_1d(self.asof_index(ts))
+        valid = idx >= 0
+        out: Dict[str, np.ndarray] = {}
+        for dim, codes in self.codes.items():
+            code = np.zeros(len(idx), dtype=np.uint8)
+            code[valid] = codes[idx[valid]]
+            out[dim] = np.asarray(LABEL_CATEGORIES[dim], dtype=object)[code]
+        return out
+
+    def composition(self, from_ts: int, to_ts: int) -> Dict[str, Dict[str, int]]:
+        # Bar counts per label for bars closing in (from_ts, to_ts], from prefix sums: two binary
+        # searches per call regardless of the period length.
+        lo = int(np.searchsorted(self.end, from_ts, side="right"))
+        hi = int(np.searchsorted(self.end, to_ts, side="right"))
+        out: Dict[str, Dict[str, int]] = {}
+        for dim, codes in self.codes.items():
+            cum = self._cum.get(dim)
+            if cum is None:
+                onehot = np.zeros((len(self) + 1, len(LABEL_CATEGORIES[dim])), dtype=np.int64)
+                onehot[np.arange(1, len(self) + 1), codes] = 1
+                cum = self._cum[dim] = np.cumsum(onehot, axis=0)
+            counts = cum[hi] - cum[lo]
+            out[dim] = {name: int(n) for name, n in zip(LABEL_CATEGORIES[dim], counts) if n}
+        return out
+
+
+def efficiency_ratio(close: np.ndarray, n: int) -> np.ndarray:
+    # |close[i] - close[i-n]| / sum(|diff|) over the same n steps; 1 = straight line, ~0 = chop.
+    out = np.full(len(close), np.nan)
+    if len(close) <= n:
+        return out
+    path = np.abs(np.diff(close))
+    steps = np.lib.stride_tricks.sliding_window_view(path, n).sum(axis=1)
+    net = np.abs(close[n:] - close[:-n])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[n:] = np.where(steps > 0.0, net / steps, 0.0)
+    return out
+
+
+def label_matrix(matrix: Dict[str, np.ndarray], params: RegimeParams, calendar: TradingCalendar) -> RegimeLabels:
+    start = np.asarray(matrix["time"], dtype=np.int64)
+    seconds = TIMEFRAME_SECONDS[params.timeframe]
+
+    fast, slow, slope = matrix["ema_fast"], matrix["ema_slow"], matrix["trend_slope"]
+    trend = np.zeros(len(start), dtype=np.uint8)
+    known = np.isfinite(fast) & np.isfinite(slow) & np.isfinite(slope)
+    trend[known] = 2
+    strong = known & (slope >= params.min_trend_slope)
+    trend[strong & (fast > slow)] = 3
+    trend[strong & (fast < slow)] = 1
+
+    pct = matrix["atr_percentile"]
+    volatility = np.zeros(len(start), dtype=np.uint8)
+    finite = np.isfinite(pct)
+    volatility[finite] = 2
+    volatility[finite & (pct < params.low_percentile)] = 1
+    volatility[finite & (pct > params.high_percentile)] = 3
+
+    er = efficiency_ratio(np.asarray(matrix["close"], dtype=np.float64), params.chop_bars)
+    chop = np.zeros(len(start), dtype=np.uint8)
+    chop[np.isfinite(er)] = 1
+    chop[np.isfinite(er) & (er < params.chop_efficiency)] = 2
+
+    if seconds >= 86400:
+        session = np.full(len(start), len(LABEL_CATEGORIES["session"]) - 1, dtype=np.uint8)
+    else:
+        session = calendar.session_codes(start).astype(np.uint8) + 1
+
+    return RegimeLabels(
+        timeframe=params.timeframe,
+        start=start,
+        end=start + seconds,
+        codes={"trend": trend, "volatility": volatility, "chop": chop, "session": session},
+    )
+
+
+def build_labels(
+    resampled: ResampledStore,
+    symbol: str,
+    params: RegimeParams,
+    dst_mode: str = "ny",
+    cache: Optional[ArtifactCache] = None,
+) -> RegimeLabels:
+    matrix = build_matrix(resampled, symbol, params.gate_params(), cache)
+    return label_matrix(matrix, params, calendar_for(symbol, dst_mode))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build per-bar regime labels (trend, volatility, chop, session).")
+    parser.add_argument("--store-dir", required=True, help="Columnar bar store root holding <SYMBOL>/M1 partitions.")
+    parser.add_argument("--cache-dir", default="", help="Optional root for resampled bars; defaults to --store-dir.")
+    parser.add_argument("--artifact-cache-dir", default="", help="Defaults to <cache-dir>/artifacts.")
+    parser.add_argument("--cache-max-gb", type=float, default=DEFAULT_MAX_GB)
+    parser.add_argument("--symbol", default="XAUUSD")
+    parser.add_argument("--timeframes", default="M15,H1,D1")
+    parser.add_argument("--trend-timeframe", default="", help="EMA timeframe; defaults to H1, or the label timeframe above H1.")
+    parser.add_argument("--dst-mode", choices=DST_MODES, default="ny")
+    parser.add_argument("--out-dir", required=True, help="Writes regime_labels_<SYMBOL>_<TF>.npz here.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    cache_root = Path(args.cache_dir) if args.cache_dir else Path(args.store_dir)
+    resampled = ResampledStore(BarStore(Path(args.store_dir)), cache_root)
+    cache = open_cache(args.artifact_cache_dir or str(cache_root / "artifacts"), args.cache_max_gb)
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    timeframes: List[str] = [tf.strip().upper() for tf in args.timeframes.split(",") if tf.strip()]
+    for tf in timeframes:
+        trend_tf = args.trend_timeframe.upper() or (tf if TIMEFRAME_SECONDS[tf] > 3600 else "H1")
+        labels = build_labels(resampled, args.symbol, RegimeParams(timeframe=tf, trend_tf=trend_tf), args.dst_mode, cache)
+        path = out_dir / f"regime_labels_{args.symbol}_{tf}.npz"
+        labels.save(path)
+        mix = labels.composition(int(labels.start[0]), int(labels.end[-1])) if len(labels) else {}
+        print(f"{args.symbol} {tf}: {len(labels)} bars -> {path}")
+        for dim, counts in mix.items():
+            print(f"  {dim}: " + ", ".join(f"{k}={v}" for k, v in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
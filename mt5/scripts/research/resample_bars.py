@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from bar_store import BarArrays, BarStore, date_to_ts, month_start_ts, next_month, write_partition
+from common import dump_json, ensure_dir
+
+
+# Every timeframe divides a day, so buckets are plain floor(ts / seconds) in broker server time
+# and each M1 month partition maps onto exactly one partition of the higher timeframe.
+TIMEFRAME_SECONDS: Dict[str, int] = {
+    "M2": 120,
+    "M3": 180,
+    "M4": 240,
+    "M5": 300,
+    "M6": 360,
+    "M10": 600,
+    "M12": 720,
+    "M15": 900,
+    "M20": 1200,
+    "M30": 1800,
+    "H1": 3600,
+    "H2": 7200,
+    "H3": 10800,
+    "H4": 14400,
+    "H6": 21600,
+    "H8": 28800,
+    "H12": 43200,
+    "D1": 86400,
+}
+SOURCES_FILE = "sources.json"
+
+
+def resample(bars: BarArrays, timeframe: str) -> BarArrays:
+    # One pass of ufunc.reduceat over bucket boundaries; bars must be sorted by time.
+    seconds = TIMEFRAME_SECONDS[timeframe]
+    if len(bars) == 0:
+        return BarArrays.empty()
+    bucket = np.asarray(bars.time) // seconds * seconds
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(bars)] - 1
+    return BarArrays(
+        time=bucket[starts],
+        open=np.asarray(bars.open)[starts],
+        high=np.maximum.reduceat(bars.high, starts),
+        low=np.minimum.reduceat(bars.low, starts),
+        close=np.asarray(bars.close)[ends],
+        tick_volume=np.add.reduceat(bars.tick_volume, starts),
+        # MT5 keeps the lowest spread seen inside a bar.
+        spread=np.minimum.reduceat(bars.spread, starts),
+        real_volume=np.add.reduceat(bars.real_volume, starts),
+    )
+
+
+class ResampledStore:
+    # Higher-timeframe partitions cached next to the M1 store as root/SYMBOL/<TF>/YYYY-MM.bars.
+    # sources.json per TF directory records the M1 partition digest each month was built from,
+    # so a refresh only rebuilds months whose M1 data changed.
+    def __init__(self, m1_store: BarStore, cache_root: Optional[Path] = None) -> None:
+        self.m1 = m1_store
+        self.cache_root = Path(cache_root) if cache_root else m1_store.root
+
+    def tf_store(self, timeframe: str) -> BarStore:
+        if timeframe not in TIMEFRAME_SECONDS:
+            raise ValueError(f"Unsupported timeframe: {timeframe}")
+        return BarStore(self.cache_root, timeframe)
+
+    def _load_sources(self, store: BarStore, symbol: str) -> Dict[str, str]:
+        path = store.symbol_dir(symbol) / SOURCES_FILE
+        if not path.exists():
+            return {}
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def refresh(
+        self,
+        symbol: str,
+        timeframe: str,
+        start_ts: Optional[int] = None,
+        end_ts: Optional[int] = None,
+    ) -> Tuple[int, int]:
+        # Returns (months rebuilt, months reused).
+        store = self.tf_store(timeframe)
+        sources = self._load_sources(store, symbol)
+        rebuilt = reused = 0
+        for month in self.m1.months(symbol):
+            if start_ts is not None and month_start_ts(next_month(month)) <= start_ts:
+                continue
+            if end_ts is not None and month_start_ts(month) >= end_ts:
+                continue
+            key = month.strftime("%Y-%m")
+            digest = self.m1.partition_version(symbol, month)
+            if digest is not None and sources.get(key) == digest and store.partition_path(symbol, month).exists():
+                reused += 1
+                continue
+            write_partition(store.partition_path(symbol, month), resample(self.m1.open_month(symbol, month), timeframe))
+            sources[key] = digest
+            rebuilt += 1
+        if rebuilt:
+            # Written aside and renamed, so a concurrent reader never sees a half-written file.
+            path = ensure_dir(store.symbol_dir(symbol)) / SOURCES_FILE
+            tmp = path.with_name(f"{SOURCES_FILE}.tmp{os.getpid()}")
+            dump_json(tmp, dict(sorted(sources.items())))
+            os.replace(tmp, path)
+        return rebuilt, reused
+
+    def load_range(self, symbol: str, timeframe: str, start_ts: int, end_ts: int) -> BarArrays:
+        self.refresh(symbol, timeframe, start_ts, end_ts)
+        return self.tf_store(timeframe).load_range(symbol, start_ts, end_ts)
+
+    def load_dates(self, symbol: str, timeframe: str, from_date: dt.date, to_date: dt.date) -> BarArrays:
+        return self.load_range(symbol, timeframe, date_to_ts(from_date), date_to_ts(to_date + dt.timedelta(days=1)))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build or refresh cached higher-timeframe bars from the M1 bar store.")
+    parser.add_argument("--store-dir", required=True, help="Columnar bar store root holding <SYMBOL>/M1 partitions.")
+    parser.add_argument("--cache-dir", default="", help="Optional cache root; defaults to --store-dir.")
+    parser.add_argument("--symbol", default="XAUUSD")
+    parser.add_argument("--timeframes", default="M5,M15,M30,H1,H4,D1")
+    parser.add_argument("--from-date", default="")
+    parser.add_argument("--to-date", default="")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    resampled = ResampledStore(BarStore(Path(args.store_dir)), Path(args.cache_dir) if args.cache_dir else None)
+    from_ts = date_to_ts(dt.date.fromisoformat(args.from_date)) if args.from_date else None
+    to_ts = date_to_ts(dt.date.fromisoformat(args.to_date) + dt.timedelta(days=1)) if args.to_date else None
+    timeframes: List[str] = [tf.strip().upper() for tf in args.timeframes.split(",") if tf.strip()]
+    for tf in timeframes:
+        rebuilt, reused = resampled.refresh(args.symbol, tf, from_ts, to_ts)
+        print(f"{args.symbol} {tf}: {rebuilt} months rebuilt, {reused} reused")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import datetime as dt
+import sqlite3
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+
+# bars_m1 schema versions (tracked in PRAGMA user_version):
+#   1 - legacy: TEXT ts_server '%Y-%m-%d %H:%M:%S', repeated symbol/source strings, two extra indexes.
+#   2 - INTEGER epoch-seconds ts_server keyed by (symbol_id, ts_server) in a WITHOUT ROWID table,
+#       symbols dictionary table, provenance moved to ingest_log.
+SCHEMA_VERSION = 2
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+BAR_VALUE_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("tick_volume", "<i8"),
+    ("spread", "<i4"),
+    ("real_volume", "<i8"),
+)
+
+
+def ts_to_text(ts: Optional[int]) -> Optional[str]:
+    if ts is None:
+        return None
+    return dt.datetime.fromtimestamp(int(ts), dt.UTC).strftime(TS_FORMAT)
+
+
+def text_to_ts(text: str) -> int:
+    return int(dt.datetime.strptime(text, TS_FORMAT).replace(tzinfo=dt.UTC).timestamp())
+
+
+def table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [r[1] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+
+
+def add_missing_columns(conn: sqlite3.Connection, table: str, columns: Sequence[Tuple[str, str]]) -> List[str]:
+    # Additive migration for derived tables: ALTER TABLE ADD COLUMN for each (name, decl) not present.
+    existing = set(table_columns(conn, table))
+    added = [name for name, _ in columns if name not in existing]
+    with conn:
+        for name, decl in columns:
+            if name in added:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+    return added
+
+
+def bars_schema_version(conn: sqlite3.Connection) -> int:
+    # 0 means bars_m1 does not exist yet.
+    version = int(conn.execute("PRAGMA user_version").fetchone()[0])
+    if version:
+        return version
+    cols = table_columns(conn, "bars_m1")
+    if not cols:
+        return 0
+    return 1 if "symbol" in cols else SCHEMA_VERSION
+
+
+def create_bars_v2(conn: sqlite3.Connection, table: str = "bars_m1") -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS symbols (
+            symbol_id INTEGER PRIMARY KEY,
+            symbol TEXT NOT NULL UNIQUE
+        )
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            symbol_id INTEGER NOT NULL,
+            ts_server INTEGER NOT NULL,
+            open REAL NOT NULL,
+            high REAL NOT NULL,
+            low REAL NOT NULL,
+            close REAL NOT NULL,
+            tick_volume INTEGER NOT NULL,
+            spread INTEGER NOT NULL,
+            real_volume INTEGER NOT NULL,
+            PRIMARY KEY (symbol_id, ts_server)
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ingest_log (
+            symbol_id INTEGER NOT NULL,
+            source_terminal TEXT NOT NULL,
+            ingested_at TEXT NOT NULL,
+            from_ts INTEGER,
+            to_ts INTEGER,
+            rows INTEGER NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS gap_checks (
+            symbol_id INTEGER NOT NULL,
+            gap_start INTEGER NOT NULL,
+            gap_end INTEGER NOT NULL,
+            checked_at TEXT NOT NULL,
+            PRIMARY KEY (symbol_id, gap_start, gap_end)
+        ) WITHOUT ROWID
+        """
+    )
+
+
+def create_schema(conn: sqlite3.Connection) -> None:
+    version = bars_schema_version(conn)
+    if version == 0:
+        create_bars_v2(conn)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    elif version == SCHEMA_VERSION:
+        create_bars_v2(conn)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS feature_regime_daily (
+            symbol TEXT NOT NULL,
+            day TEXT NOT NULL,
+            atr14 REAL NOT NULL,
+            adx14 REAL NOT NULL,
+            range_pct REAL NOT NULL,
+            session_bucket TEXT NOT NULL,
+            trend_state TEXT NOT NULL,
+            whipsaw_score REAL NOT NULL,
+            PRIMARY KEY (symbol, day)
+        )
+        """
+    )
+    # The state table is a resumable cache; one written before ADX state was persisted is dropped
+    # and the next incremental feature build falls back to a full rebuild.
+    state_columns = table_columns(conn, "feature_daily_state")
+    if state_columns and "adx14" not in state_columns:
+        conn.execute("DROP TABLE feature_daily_state")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS feature_daily_state (
+            symbol TEXT NOT NULL,
+            day TEXT NOT NULL,
+            open REAL NOT NULL,
+            high REAL NOT NULL,
+            low REAL NOT NULL,
+            close REAL NOT NULL,
+            ret_std REAL NOT NULL,
+            sign_changes INTEGER NOT NULL,
+            bars INTEGER NOT NULL,
+            session_bucket TEXT NOT NULL,
+            ema20 REAL NOT NULL,
+            ema50 REAL NOT NULL,
+            pdi14 REAL NOT NULL,
+            ndi14 REAL NOT NULL,
+            adx14 REAL NOT NULL,
+            PRIMARY KEY (symbol, day)
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS backtest_runs (
+            run_id TEXT NOT NULL,
+            candidate_id TEXT NOT NULL,
+            period_type TEXT NOT NULL,
+            period_label TEXT NOT NULL,
+            from_date TEXT NOT NULL,
+            to_date TEXT NOT NULL,
+            net_profit REAL NOT NULL,
+            gross_profit REAL NOT NULL,
+            gross_loss REAL NOT NULL,
+            profit_factor REAL NOT NULL,
+            max_dd_pct REAL NOT NULL,
+            trades INTEGER NOT NULL,
+            report_file TEXT NOT NULL,
+            status TEXT NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS candidates (
+            candidate_id TEXT PRIMARY KEY,
+            ea_file TEXT NOT NULL,
+            trade_mode TEXT NOT NULL,
+            tf TEXT NOT NULL,
+            fast INTEGER NOT NULL,
+            slow INTEGER NOT NULL,
+            filter INTEGER NOT NULL,
+            use_adx INTEGER NOT NULL,
+            adx_period INTEGER NOT NULL,
+            min_adx REAL NOT NULL,
+            use_atr INTEGER NOT NULL,
+            atr_period INTEGER NOT NULL,
+            min_atr REAL NOT NULL,
+            session_filter TEXT NOT NULL,
+            cooldown_bars INTEGER NOT NULL,
+            sl_atr REAL NOT NULL,
+            tp_atr REAL NOT NULL,
+            score_stage1 REAL NOT NULL DEFAULT 0,
+            score_stage2 REAL NOT NULL DEFAULT 0,
+            accepted INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    conn.commit()
+
+
+def require_v2(conn: sqlite3.Connection) -> None:
+    version = bars_schema_version(conn)
+    if version != SCHEMA_VERSION:
+        raise RuntimeError(
+            f"bars_m1 schema version {version} is not writable; run migrate_bars_m1_v2.py --db-path <db> first."
+        )
+
+
+def symbol_id(conn: sqlite3.Connection, symbol: str, create: bool = False) -> Optional[int]:
+    row = conn.execute("SELECT symbol_id FROM symbols WHERE symbol = ?", (symbol,)).fetchone()
+    if row:
+        return int(row[0])
+    if not create:
+        return None
+    cur = conn.execute("INSERT INTO symbols (symbol) VALUES (?)", (symbol,))
+    return int(cur.lastrowid)
+
+
+def record_ingest(
+    conn: sqlite3.Connection,
+    symbol: str,
+    source_terminal: str,
+    ingested_at: str,
+    from_ts: Optional[int],
+    to_ts: Optional[int],
+    rows: int,
+) -> None:
+    conn.execute(
+        "INSERT INTO ingest_log (symbol_id, source_terminal, ingested_at, from_ts, to_ts, rows) VALUES (?, ?, ?, ?, ?, ?)",
+        (symbol_id(conn, symbol, create=True), source_terminal, ingested_at, from_ts, to_ts, rows),
+    )
+    conn.commit()
+
+
+def checked_gaps(conn: sqlite3.Connection, symbol: str) -> Set[Tuple[int, int]]:
+    sid = symbol_id(conn, symbol)
+    rows = conn.execute("SELECT gap_start, gap_end FROM gap_checks WHERE symbol_id = ?", (sid,)).fetchall()
+    return {(int(a), int(b)) for a, b in rows}
+
+
+def record_gap_checks(conn: sqlite3.Connection, symbol: str, gaps: Sequence[Tuple[int, int]], checked_at: str) -> None:
+    sid = symbol_id(conn, symbol, create=True)
+    conn.executemany(
+        "INSERT OR REPLACE INTO gap_checks (symbol_id, gap_start, gap_end, checked_at) VALUES (?, ?, ?, ?)",
+        [(sid, int(a), int(b), checked_at) for a, b in gaps],
+    )
+    conn.commit()
+
+
+def sql_column_values(series) -> List[object]:
+    # Whole-column conversion of a pandas Series into sqlite3-bindable Python values.
+    values = series.to_numpy()
+    kind = values.dtype.kind
+    if kind in "biuf":
+        return values.tolist()
+    if kind == "M":
+        return series.dt.strftime(TS_FORMAT).where(series.notna(), None).tolist()
+    out: List[object] = []
+    for v in series.astype(object).where(series.notna(), None).tolist():
+        if v is None or isinstance(v, (str, int, float, bytes)):
+            out.append(v)
+        elif isinstance(v, np.generic):
+            out.append(v.item())
+        else:
+            # datetime.date and friends keep their str() form (ISO dates), as the row-wise writers did.
+            out.append(str(v))
+    return out
+
+
+def write_frame_upsert(
+    conn: sqlite3.Connection,
+    table: str,
+    df,
+    keys: Sequence[str],
+    update_columns: Optional[Sequence[str]] = None,
+) -> int:
+    # Bulk INSERT ... ON CONFLICT(keys) DO UPDATE of every DataFrame column (or update_columns)
+    # with one executemany in one transaction. Column names must match the table.
+    if df.empty:
+        return 0
+    columns = [str(c) for c in df.columns]
+    missing = [k for k in keys if k not in columns]
+    if missing:
+        raise ValueError(f"Upsert keys not in frame: {missing}")
+    updates = [c for c in (update_columns if update_columns is not None else columns) if c not in keys]
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+        f"ON CONFLICT({', '.join(keys)}) DO "
+        + (f"UPDATE SET {', '.join(f'{c}=excluded.{c}' for c in updates)}" if updates else "NOTHING")
+    )
+    rows = zip(*(sql_column_values(df[c]) for c in df.columns))
+    with conn:
+        conn.executemany(sql, rows)
+    return len(df)
+
+
+def bars_range_sql(conn: sqlite3.Connection, symbol: str, from_ts: Optional[int], to_ts: Optional[int]) -> Tuple[str, List[object]]:
+    # Returns (FROM/WHERE clause, params) and a ts expression usable by both schema versions.
+    version = bars_schema_version(conn)
+    if version == 1:
+        where = ["symbol = ?"]
+        params: List[object] = [symbol]
+        if from_ts is not None:
+            where.append("ts_server >= ?")
+            params.append(ts_to_text(from_ts))
+        if to_ts is not None:
+            where.append("ts_server < ?")
+            params.append(ts_to_text(to_ts))
+        return f"FROM bars_m1 WHERE {' AND '.join(where)}", params
+
+    sid = symbol_id(conn, symbol)
+    where = ["symbol_id = ?"]
+    params = [sid if sid is not None else -1]
+    if from_ts is not None:
+        where.append("ts_server >= ?")
+        params.append(int(from_ts))
+    if to_ts is not None:
+        where.append("ts_server < ?")
+        params.append(int(to_ts))
+    return f"FROM bars_m1 WHERE {' AND '.join(where)}", params
+
+
+def ts_expr(conn: sqlite3.Connection) -> str:
+    if bars_schema_version(conn) == 1:
+        return "CAST(strftime('%s', ts_server) AS INTEGER)"
+    return "ts_server"
+
+
+def iter_bar_columns(
+    conn: sqlite3.Connection,
+    symbol: str,
+    from_ts: Optional[int] = None,
+    to_ts: Optional[int] = None,
+    columns: Sequence[str] = tuple(name for name, _ in BAR_VALUE_COLUMNS),
+    chunk_rows: int = 200000,
+) -> Iterator[Dict[str, np.ndarray]]:
+    dtypes = dict(BAR_VALUE_COLUMNS)
+    clause, params = bars_range_sql(conn, symbol, from_ts, to_ts)
+    cur = conn.execute(f"SELECT {ts_expr(conn)}, {', '.join(columns)} {clause} ORDER BY ts_server", params)
+    while True:
+        rows = cur.fetchmany(chunk_rows)
+        if not rows:
+            break
+        cols = list(zip(*rows))
+        out = {"time": np.asarray(cols[0], dtype="<i8")}
+        for i, name in enumerate(columns, start=1):
+            out[name] = np.asarray(cols[i], dtype=dtypes[name])
+        yield out
+
+
+def read_bar_columns(
+    conn: sqlite3.Connection,
+    symbol: str,
+    from_ts: Optional[int] = None,
+    to_ts: Optional[int] = None,
+    columns: Sequence[str] = tuple(name for name, _ in BAR_VALUE_COLUMNS),
+) -> Dict[str, np.ndarray]:
+    dtypes = dict(BAR_VALUE_COLUMNS)
+    chunks = list(iter_bar_columns(conn, symbol, from_ts, to_ts, columns))
+    if not chunks:
+        out = {"time": np.empty(0, dtype="<i8")}
+        out.update({name: np.empty(0, dtype=dtypes[name]) for name in columns})
+        return out
+    return {key: np.concatenate([c[key] for c in chunks]) for key in chunks[0]}
+
+
+def bars_fingerprint(conn: sqlite3.Connection, symbol: str, from_ts: Optional[int], to_ts: Optional[int]) -> Dict[str, object]:
+    # Cheap content summary of a bar range for cache keys: any insert, delete or price revision
+    # inside the range, spread and real volume included, changes at least one of these.
+    clause, params = bars_range_sql(conn, symbol, from_ts, to_ts)
+    expr = ts_expr(conn)
+    row = conn.execute(
+        f"SELECT COUNT(*), MIN({expr}), MAX({expr}), TOTAL(open), TOTAL(high), TOTAL(low), TOTAL(close), "
+        f"TOTAL(tick_volume), TOTAL(spread), TOTAL(real_volume) {clause}",
+        params,
+    ).fetchone()
+    keys = (
+        "rows",
+        "min_ts",
+        "max_ts",
+        "sum_open",
+        "sum_high",
+        "sum_low",
+        "sum_close",
+        "sum_tick_volume",
+        "sum_spread",
+        "sum_real_volume",
+    )
+    return dict(zip(keys, row))
+
+
+def bars_min_max_count(conn: sqlite3.Connection, symbol: str) -> Tuple[Optional[int], Optional[int], int]:
+    clause, params = bars_range_sql(conn, symbol, None, None)
+    expr = ts_expr(conn)
+    row = conn.execute(f"SELECT MIN({expr}), MAX({expr}), COUNT(*) {clause}", params).fetchone()
+    if not row:
+        return None, None, 0
+    return row[0], row[1], int(row[2] or 0)
+
+
+def migrate_v1_to_v2(conn: sqlite3.Connection) -> Dict[str, int]:
+    version = bars_schema_version(conn)
+    if version == SCHEMA_VERSION:
+        return {"migrated_rows": 0, "from_version": version}
+    if version == 0:
+        create_schema(conn)
+        return {"migrated_rows": 0, "from_version": version}
+
+    conn.execute("BEGIN")
+    try:
+        create_bars_v2(conn, table="bars_m1_v2")
+        conn.execute("INSERT OR IGNORE INTO symbols (symbol) SELECT DISTINCT symbol FROM bars_m1 ORDER BY symbol")
+        cur = conn.execute(
+            """
+            INSERT INTO bars_m1_v2 (
+                symbol_id, ts_server, open, high, low, close, tick_volume, spread, real_volume
+            )
+            SELECT s.symbol_id, CAST(strftime('%s', b.ts_server) AS INTEGER),
+                   b.open, b.high, b.low, b.close, b.tick_volume, b.spread, b.real_volume
+            FROM bars_m1 b
+            JOIN symbols s ON s.symbol = b.symbol
+            ORDER BY s.symbol_id, b.ts_server
+            """
+        )
+        migrated = int(cur.rowcount)
+        conn.execute(
+            """
+            INSERT INTO ingest_log (symbol_id, source_terminal, ingested_at, from_ts, to_ts, rows)
+            SELECT s.symbol_id, b.source_terminal, MAX(b.ingested_at),
+                   MIN(CAST(strftime('%s', b.ts_server) AS INTEGER)),
+                   MAX(CAST(strftime('%s', b.ts_server) AS INTEGER)),
+                   COUNT(*)
+            FROM bars_m1 b
+            JOIN symbols s ON s.symbol = b.symbol
+            GROUP BY s.symbol_id, b.source_terminal
+            """
+        )
+        conn.execute("DROP INDEX IF EXISTS idx_bars_m1_symbol_ts")
+        conn.execute("DROP INDEX IF EXISTS idx_bars_m1_ts")
+        conn.execute("DROP TABLE bars_m1")
+        conn.execute("ALTER TABLE bars_m1_v2 RENAME TO bars_m1")
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return {"migrated_rows": migrated, "from_version": version}
@@ -0,0 +1,615 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import csv
+import dataclasses
+import datetime as dt
+import itertools
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from artifact_cache import DEFAULT_MAX_GB, ArtifactCache, open_cache
+from bar_store import BarStore, date_to_ts
+from feature_matrix import GateParams, build_matrix
+from resample_bars import ResampledStore
+from run_strategy_search import TIMEFRAME_TO_ENUM
+
+
+# ENUM_ENTRY_REJECT_REASON order from XAUUSD_RobustBreakout.mq5, keyed as in its GATE_STATS line.
+REJECT_REASONS = (
+    "r_pos_open",
+    "r_bar_wait",
+    "r_bar_missing",
+    "r_already_bar",
+    "r_cooldown",
+    "r_reentry",
+    "r_session",
+    "r_friday",
+    "r_spread",
+    "r_news",
+    "r_atr",
+    "r_vol_pctl",
+    "r_volatility",
+    "r_adx",
+    "r_trend",
+    "r_trend_slope",
+    "r_donchian",
+    "r_quotes",
+    "r_no_cross",
+    "r_breakout_excess",
+    "r_breakout",
+)
+(
+    R_POS_OPEN,
+    R_BAR_WAIT,
+    R_BAR_MISSING,
+    R_ALREADY_BAR,
+    R_COOLDOWN,
+    R_REENTRY,
+    R_SESSION,
+    R_FRIDAY,
+    R_SPREAD,
+    R_NEWS,
+    R_ATR,
+    R_VOL_PCTL,
+    R_VOLATILITY,
+    R_ADX,
+    R_TREND,
+    R_TREND_SLOPE,
+    R_DONCHIAN,
+    R_QUOTES,
+    R_NO_CROSS,
+    R_BREAKOUT_EXCESS,
+    R_BREAKOUT,
+) = range(len(REJECT_REASONS))
+# Code for bars that reach OpenTrade.
+ENTRY = len(REJECT_REASONS)
+# Position, traded-bar, cooldown and re-entry gates depend on trade history, which a stateless
+# pre-screen does not have; those counts only come from a trade simulation.
+STATEFUL_REASONS = ("r_pos_open", "r_bar_wait", "r_bar_missing", "r_already_bar", "r_cooldown", "r_reentry")
+STATELESS_REASONS = tuple(r for r in REJECT_REASONS if r not in STATEFUL_REASONS)
+COUNT_COLUMNS = ("attempts", "passed", "entries") + STATELESS_REASONS
+# ENUM_ENTRY_TRIGGER_MODE; the replay models bar-close decisions only.
+ENTRY_TRIGGER_MODES = ("INTRABAR", "BAR_CLOSE", "BAR_OPEN")
+ENTRY_TRIGGER_BAR_CLOSE = 1
+
+
+@dataclasses.dataclass(frozen=True)
+class BreakoutParams:
+    # EA input defaults; the field comments give the input name where it differs.
+    signal_tf: str = "M15"
+    trend_tf: str = "H1"
+    donchian_bars: int = 40
+    atr_period: int = 14
+    breakout_buffer_atr: float = 0.20
+    adx_period: int = 14
+    adx_min: float = 22.0
+    ema_fast: int = 50
+    ema_slow: int = 200
+    use_news_filter: bool = True
+    news_block_before_min: int = 45
+    news_block_after_min: int = 30
+    news_currencies: str = "USD"
+    session_start_hour: int = 10  # SessionStartServerHour
+    session_end_hour: int = 22  # SessionEndServerHour
+    friday_flat_hour: int = 21
+    friday_flat_minute: int = 45
+    max_spread_points: int = 350
+    max_atr_to_price_pct: float = 0.30
+    require_crossing_signal: bool = True
+    use_trend_slope_filter: bool = True
+    min_trend_slope_atr: float = 0.20
+    use_volatility_percentile_filter: bool = True
+    volatility_lookback_bars: int = 240
+    max_atr_percentile: float = 85.0
+    min_atr_percentile: float = 20.0
+    min_breakout_excess_atr: float = 0.10
+    entry_trigger_mode: int = ENTRY_TRIGGER_BAR_CLOSE
+    use_bar_close_confirmation: bool = True
+
+    def effective_trigger_mode(self) -> int:
+        # GetEffectiveEntryTriggerMode: UseBarCloseConfirmation forces bar close over EntryTriggerMode.
+        return ENTRY_TRIGGER_BAR_CLOSE if self.use_bar_close_confirmation else self.entry_trigger_mode
+
+    def gate_params(self) -> GateParams:
+        return GateParams(
+            signal_tf=self.signal_tf,
+            trend_tf=self.trend_tf,
+            atr_period=self.atr_period,
+            adx_period=self.adx_period,
+            ema_fast=self.ema_fast,
+            ema_slow=self.ema_slow,
+            volatility_lookback_bars=self.volatility_lookback_bars,
+            donchian_bars=self.donchian_bars,
+        )
+
+
+SET_FIELDS = {
+    "SignalTF": "signal_tf",
+    "TrendTF": "trend_tf",
+    "DonchianBars": "donchian_bars",
+    "AtrPeriod": "atr_period",
+    "BreakoutBufferATR": "breakout_buffer_atr",
+    "AdxPeriod": "adx_period",
+    "AdxMin": "adx_min",
+    "EmaFast": "ema_fast",
+    "EmaSlow": "ema_slow",
+    "UseNewsFilter": "use_news_filter",
+    "NewsBlockBeforeMin": "news_block_before_min",
+    "NewsBlockAfterMin": "news_block_after_min",
+    "NewsCurrencies": "news_currencies",
+    "SessionStartServerHour": "session_start_hour",
+    "SessionEndServerHour": "session_end_hour",
+    "FridayFlatHour": "friday_flat_hour",
+    "FridayFlatMinute": "friday_flat_minute",
+    "MaxSpreadPoints": "max_spread_points",
+    "MaxAtrToPricePct": "max_atr_to_price_pct",
+    "RequireCrossingSignal": "require_crossing_signal",
+    "UseTrendSlopeFilter": "use_trend_slope_filter",
+    "MinTrendSlopeAtr": "min_trend_slope_atr",
+    "UseVolatilityPercentileFilter": "use_volatility_percentile_filter",
+    "VolatilityLookbackBars": "volatility_lookback_bars",
+    "MaxAtrPercentile": "max_atr_percentile",
+    "MinAtrPercentile": "min_atr_percentile",
+    "MinBreakoutExcessAtr": "min_breakout_excess_atr",
+    "EntryTriggerMode": "entry_trigger_mode",
+    "UseBarCloseConfirmation": "use_bar_close_confirmation",
+}
+TRIGGER_FIELDS = ("entry_trigger_mode", "use_bar_close_confirmation")
+# Grid dimensions in evaluation order: the two that change the feature matrix first, then one per
+# gate in the order TryOpenEntry checks them, so each stage only sees the bars earlier ones passed.
+MATRIX_DIMS = ("atr_period", "donchian_bars")
+GATE_DIMS = (
+    "news_block_before_min",
+    "news_block_after_min",
+    "adx_min",
+    "min_trend_slope_atr",
+    "max_atr_to_price_pct",
+    "max_atr_percentile",
+    "breakout_buffer_atr",
+    "min_breakout_excess_atr",
+)
+GRID_DIMS = MATRIX_DIMS + GATE_DIMS
+ENUM_TIMEFRAMES = {value: name for name, value in TIMEFRAME_TO_ENUM.items()}
+
+
+def parse_set_value(field: str, raw: str):
+    kind = type(getattr(BreakoutParams(), field))
+    if kind is bool:
+        return raw.strip().lower() == "true"
+    if field in ("signal_tf", "trend_tf"):
+        return ENUM_TIMEFRAMES.get(int(raw), raw)
+    if kind is int:
+        return int(round(float(raw)))
+    if kind is float:
+        return float(raw)
+    return raw.strip()
+
+
+def load_opt_set(path: Path) -> Tuple[BreakoutParams, Dict[str, List]]:
+    # Tester .set lines are Name=value||start||step||stop||Y/N; Y rows on gate dimensions become the
+    # grid, everything else is pinned to its value. Exit-side inputs (SL/TP/trailing) do not change
+    # which bars pass the gates and are ignored here.
+    values: Dict[str, object] = {}
+    grid: Dict[str, List] = {}
+    for line in path.read_text(encoding="utf-8-sig").splitlines():
+        name, sep, rest = line.strip().partition("=")
+        field = SET_FIELDS.get(name)
+        if not sep or field is None:
+            continue
+        parts = rest.split("||")
+        values[field] = parse_set_value(field, parts[0])
+        if (field in GRID_DIMS or field in TRIGGER_FIELDS) and len(parts) >= 5 and parts[4].strip().upper() == "Y":
+            if isinstance(values[field], bool):
+                grid[field] = [False, True]
+                continue
+            start, step, stop = (float(p) for p in parts[1:4])
+            count = int(round((stop - start) / step)) + 1 if step > 0 else 1
+            grid[field] = sorted({parse_set_value(field, repr(round(start + k * step, 10))) for k in range(count)})
+    params = dataclasses.replace(BreakoutParams(), **values)
+    # Intrabar and bar-open entries decide at other moments than the replay does, so a set that
+    # reaches either mode, pinned or optimised, is refused rather than counted as if it were bar close.
+    modes = {
+        dataclasses.replace(params, entry_trigger_mode=mode, use_bar_close_confirmation=confirm).effective_trigger_mode()
+        for mode in grid.get("entry_trigger_mode", [params.entry_trigger_mode])
+        for confirm in grid.get("use_bar_close_confirmation", [params.use_bar_close_confirmation])
+    }
+    other = sorted(modes - {ENTRY_TRIGGER_BAR_CLOSE})
+    if other:
+        names = ", ".join(ENTRY_TRIGGER_MODES[m] if 0 <= m < len(ENTRY_TRIGGER_MODES) else str(m) for m in other)
+        raise ValueError(
+            f"{path}: EntryTriggerMode/UseBarCloseConfirmation give entry mode {names}; only BAR_CLOSE is modelled."
+        )
+    return params, {dim: grid.get(dim, [getattr(params, dim)]) for dim in GRID_DIMS}
+
+
+def load_news_times(path: Path, currencies: str) -> np.ndarray:
+    # CSV with a server-time "time" column (YYYY-MM-DD HH:MM[:SS]) and optional "currency" and
+    # "importance" columns; rows for other currencies or below high importance are dropped.
+    wanted = {c.strip().upper() for c in currencies.split(",") if c.strip()}
+    times: List[int] = []
+    with path.open("r", encoding="utf-8-sig", newline="") as handle:
+        for row in csv.DictReader(handle):
+            currency = (row.get("currency") or "").strip().upper()
+            importance = (row.get("importance") or "high").strip().lower()
+            if (currency and wanted and currency not in wanted) or importance not in ("high", "3"):
+                continue
+            stamp = dt.datetime.fromisoformat(row["time"].strip()).replace(tzinfo=dt.timezone.utc)
+            times.append(int(stamp.timestamp()))
+    return np.unique(np.asarray(times, dtype=np.int64))
+
+
+def news_blocked(now: np.ndarray, news_times: np.ndarray, before_min: int, after_min: int) -> np.ndarray:
+    # An event inside [now - before, now + after] blocks the bar, as CalendarValueHistory is queried.
+    if news_times.size == 0:
+        return np.zeros(len(now), dtype=bool)
+    lo = np.searchsorted(news_times, now - before_min * 60, side="left")
+    hi = np.searchsorted(news_times, now + after_min * 60, side="right")
+    return hi > lo
+
+
+@dataclasses.dataclass
+class DecisionBars:
+    # Row i of a feature matrix is the bar that just closed when the EA decides at `now`, the open of
+    # the next stored bar; spread is the first M1 quote at or after that open.
+    row: np.ndarray
+    now: np.ndarray
+    spread: np.ndarray
+    news_times: np.ndarray
+
+
+def decision_bars(
+    time: np.ndarray,
+    m1_time: np.ndarray,
+    m1_spread: np.ndarray,
+    start_ts: int,
+    end_ts: int,
+    news_times: Optional[np.ndarray] = None,
+) -> DecisionBars:
+    time = np.asarray(time, dtype=np.int64)
+    now = time[1:]
+    keep = (now >= start_ts) & (now < end_ts)
+    row = np.flatnonzero(keep)
+    now = now[keep]
+    spread = np.full(len(now), np.inf)
+    j = np.searchsorted(m1_time, now, side="left")
+    found = j < len(m1_time)
+    spread[found] = m1_spread[j[found]]
+    empty = np.zeros(0, dtype=np.int64)
+    return DecisionBars(row=row, now=now, spread=spread, news_times=empty if news_times is None else news_times)
+
+
+def calendar_codes(bars: DecisionBars, p: BreakoutParams) -> np.ndarray:
+    # Session, Friday-flat and spread gates depend only on the decision time and quote.
+    now = bars.now
+    minutes = (now // 60) % 1440
+    hour, minute = minutes // 60, minutes % 60
+    day_of_week = (now // 86400 + 4) % 7
+    start, end = p.session_start_hour * 60, p.session_end_hour * 60
+    if start == end:
+        in_session = np.ones(len(now), dtype=bool)
+    elif start < end:
+        in_session = (minutes >= start) & (minutes < end)
+    else:
+        in_session = (minutes >= start) | (minutes < end)
+    friday = (day_of_week == 5) & (
+        (hour > p.friday_flat_hour) | ((hour == p.friday_flat_hour) & (minute >= p.friday_flat_minute))
+    )
+    codes = np.zeros(len(now), dtype=np.uint8)
+    codes[bars.spread > p.max_spread_points] = R_SPREAD
+    codes[friday] = R_FRIDAY
+    codes[~in_session] = R_SESSION
+    return codes
+
+
+def structural_codes(matrix: Dict[str, np.ndarray], rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Gates with no threshold input, in the three places TryOpenEntry checks them: ATR before ADX;
+    # trend EMAs, Donchian and a flat trend after it; quotes (this and the previous close) after
+    # the slope filter.
+    atr = matrix["atr"][rows]
+    fast, slow = matrix["ema_fast"][rows], matrix["ema_slow"][rows]
+    prev_close = np.where(rows > 0, matrix["close"][np.maximum(rows - 1, 0)], np.nan)
+    before_adx = np.where(~(atr > 0.0), R_ATR, 0).astype(np.uint8)
+    after_adx = np.zeros(len(rows), dtype=np.uint8)
+    after_adx[fast == slow] = R_TREND
+    after_adx[~np.isfinite(matrix["donchian_high"][rows]) | ~np.isfinite(matrix["donchian_low"][rows])] = R_DONCHIAN
+    after_adx[~np.isfinite(fast) | ~np.isfinite(slow)] = R_TREND
+    quotes = np.where(~(matrix["close"][rows] > 0.0) | ~(prev_close > 0.0), R_QUOTES, 0).astype(np.uint8)
+    return before_adx, after_adx, quotes
+
+
+def breakout_codes(
+    matrix: Dict[str, np.ndarray],
+    rows: np.ndarray,
+    buffer_atr: np.ndarray,
+    excess_atr: np.ndarray,
+    require_cross: bool,
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Bar-close trigger: close[i] against the Donchian channel plus buffer, prev close for the
+    # crossing check. Broadcasts over any shape of buffer/excess values (trailing axes).
+    grid_shape = np.broadcast_shapes(np.shape(buffer_atr), np.shape(excess_atr))
+    buffer_atr = np.broadcast_to(buffer_atr, grid_shape)
+    excess_atr = np.broadcast_to(excess_atr, grid_shape)
+    shape = (len(rows),) + (1,) * len(grid_shape)
+    atr = matrix["atr"][rows].reshape(shape)
+    close = matrix["close"][rows].reshape(shape)
+    prev_close = matrix["close"][np.maximum(rows - 1, 0)].reshape(shape)
+    fast = matrix["ema_fast"][rows].reshape(shape)
+    slow = matrix["ema_slow"][rows].reshape(shape)
+    long_trigger = matrix["donchian_high"][rows].reshape(shape) + buffer_atr * atr
+    short_trigger = matrix["donchian_low"][rows].reshape(shape) - buffer_atr * atr
+
+    long_raw = (fast > slow) & (close > long_trigger)
+    short_raw = (fast < slow) & (close < short_trigger)
+    long_cross_blocked = long_raw & require_cross & (prev_close > long_trigger)
+    short_cross_blocked = short_raw & require_cross & (prev_close < short_trigger)
+    long_ok = long_raw & ~long_cross_blocked
+    short_ok = short_raw & ~short_cross_blocked
+    min_excess = np.maximum(0.0, excess_atr) * atr
+    long_excess_blocked = long_ok & (min_excess > 0.0) & (close - long_trigger < min_excess)
+    short_excess_blocked = short_ok & (min_excess > 0.0) & (short_trigger - close < min_excess)
+    long_ok &= ~long_excess_blocked
+    short_ok &= ~short_excess_blocked
+
+    codes = np.full((len(rows),) + grid_shape, R_BREAKOUT, dtype=np.uint8)
+    codes[long_cross_blocked | short_cross_blocked | (require_cross & (long_raw | short_raw))] = R_NO_CROSS
+    codes[long_excess_blocked | short_excess_blocked] = R_BREAKOUT_EXCESS
+    codes[long_ok | short_ok] = ENTRY
+    direction = np.where(long_ok, 1, np.where(short_ok, -1, 0)).astype(np.int8)
+    return codes, direction
+
+
+def gate_codes(matrix: Dict[str, np.ndarray], bars: DecisionBars, p: BreakoutParams) -> Tuple[np.ndarray, np.ndarray]:
+    # One code per decision bar for a single parameter set: the first gate that rejected it, or
+    # ENTRY (with direction +1/-1) when TryOpenEntry would call OpenTrade.
+    rows = bars.row
+    codes = calendar_codes(bars, p)
+    if p.use_news_filter:
+        news = news_blocked(bars.now, bars.news_times, p.news_block_before_min, p.news_block_after_min)
+        codes[(codes == 0) & news] = R_NEWS
+    before_adx, after_adx, quotes = structural_codes(matrix, rows)
+    codes = np.where(codes == 0, before_adx, codes)
+    adx = matrix["adx"][rows]
+    codes[(codes == 0) & ~(adx >= p.adx_min)] = R_ADX
+    codes = np.where(codes == 0, after_adx, codes)
+    if p.use_trend_slope_filter:
+        codes[(codes == 0) & (matrix["trend_slope"][rows] < p.min_trend_slope_atr)] = R_TREND_SLOPE
+    codes = np.where(codes == 0, quotes, codes)
+    if p.max_atr_to_price_pct > 0.0:
+        codes[(codes == 0) & (matrix["atr_to_price_pct"][rows] > p.max_atr_to_price_pct)] = R_VOLATILITY
+    if p.use_volatility_percentile_filter:
+        codes[(codes == 0) & ~percentile_allowed(matrix["atr_percentile"][rows], p.min_atr_percentile, p.max_atr_percentile)] = R_VOL_PCTL
+
+    direction = np.zeros(len(rows), dtype=np.int8)
+    passed = np.flatnonzero(codes == 0)
+    if passed.size:
+        stage, side = breakout_codes(
+            matrix, rows[passed], np.float64(p.breakout_buffer_atr), np.float64(p.min_breakout_excess_atr), p.require_crossing_signal
+        )
+        codes[passed] = stage.reshape(-1)
+        direction[passed] = side.reshape(-1)
+    return codes, direction
+
+
+def percentile_allowed(pct: np.ndarray, min_pct: float, max_pct: float) -> np.ndarray:
+    lo, hi = min(min_pct, max_pct), max(min_pct, max_pct)
+    return (pct >= lo) & (pct <= hi)
+
+
+def composition(codes: np.ndarray) -> Dict[str, int]:
+    counts = np.bincount(codes, minlength=ENTRY + 1)
+    entries = int(counts[ENTRY])
+    passed = entries + int(counts[R_NO_CROSS] + counts[R_BREAKOUT_EXCESS] + counts[R_BREAKOUT])
+    out = {"attempts": int(codes.size), "passed": passed, "entries": entries}
+    out.update({name: int(counts[REJECT_REASONS.index(name)]) for name in STATELESS_REASONS})
+    return out
+
+
+def grid_composition(
+    matrix: Dict[str, np.ndarray],
+    bars: DecisionBars,
+    base: BreakoutParams,
+    grid: Dict[str, Sequence],
+) -> np.ndarray:
+    # Reject counts for every combination of GATE_DIMS on one feature matrix, shape
+    # (*len(grid[dim]) for dim in GATE_DIMS, len(COUNT_COLUMNS)). Gates run in EA order and each
+    # stage narrows to the bars that passed, so a count recorded at a stage is added once to the
+    # whole sub-grid below it instead of once per combination.
+    column = {name: k for k, name in enumerate(COUNT_COLUMNS)}
+    reason_columns = np.full(ENTRY + 1, -1, dtype=np.int64)
+    for name in STATELESS_REASONS:
+        reason_columns[REJECT_REASONS.index(name)] = column[name]
+    reason_columns[ENTRY] = column["entries"]
+    counts = np.zeros(tuple(len(grid[dim]) for dim in GATE_DIMS) + (len(COUNT_COLUMNS),), dtype=np.int64)
+    counts[..., column["attempts"]] = len(bars.row)
+
+    before_adx, after_adx, quotes = structural_codes(matrix, bars.row)
+    local = np.arange(len(bars.row))
+    adx = np.asarray(matrix["adx"])[bars.row]
+    slope = np.asarray(matrix["trend_slope"])[bars.row]
+    atr_pct = np.asarray(matrix["atr_to_price_pct"])[bars.row]
+    pctl = np.asarray(matrix["atr_percentile"])[bars.row]
+
+    def record(view: np.ndarray, codes: np.ndarray) -> None:
+        tally = np.bincount(codes[codes != 0], minlength=ENTRY + 1)
+        for code in np.flatnonzero(tally):
+            view[..., reason_columns[code]] += tally[code]
+
+    def fixed(codes: np.ndarray) -> Callable:
+        return lambda idx, _value: codes[idx]
+
+    def threshold(values: np.ndarray, code: int, fails: Callable, enabled: bool) -> Callable:
+        def check(idx: np.ndarray, value) -> np.ndarray:
+            out = np.zeros(len(idx), dtype=np.uint8)
+            if enabled(value):
+                out[fails(values[idx], value)] = code
+            return out
+
+        return check
+
+    def news_stage(idx: np.ndarray, value) -> np.ndarray:
+        before, after = value
+        out = np.zeros(len(idx), dtype=np.uint8)
+        if base.use_news_filter:
+            out[news_blocked(bars.now[idx], bars.news_times, before, after)] = R_NEWS
+        return out
+
+    news_values = list(itertools.product(grid["news_block_before_min"], grid["news_block_after_min"]))
+    stages: List[Tuple[int, Sequence, Callable]] = [
+        (0, [None], fixed(calendar_codes(bars, base))),
+        (2, news_values, news_stage),
+        (0, [None], fixed(before_adx)),
+        (1, grid["adx_min"], threshold(adx, R_ADX, lambda v, t: ~(v >= t), lambda t: True)),
+        (0, [None], fixed(after_adx)),
+        (
+            1,
+            grid["min_trend_slope_atr"],
+            threshold(slope, R_TREND_SLOPE, lambda v, t: v < t, lambda t: base.use_trend_slope_filter),
+        ),
+        (0, [None], fixed(quotes)),
+        (1, grid["max_atr_to_price_pct"], threshold(atr_pct, R_VOLATILITY, lambda v, t: v > t, lambda t: t > 0.0)),
+        (
+            1,
+            grid["max_atr_percentile"],
+            threshold(
+                pctl,
+                R_VOL_PCTL,
+                lambda v, t: ~percentile_allowed(v, base.min_atr_percentile, t),
+                lambda t: base.use_volatility_percentile_filter,
+            ),
+        ),
+    ]
+    # The breakout outcome depends only on the bar and (buffer, excess), so it is classified once for
+    # every decision bar; each leaf then sums the one-hot rows of the bars that reached it.
+    buffers = np.asarray(grid["breakout_buffer_atr"], dtype=np.float64)[:, None]
+    excesses = np.asarray(grid["min_breakout_excess_atr"], dtype=np.float64)[None, :]
+    terminal, _ = breakout_codes(matrix, bars.row, buffers, excesses, base.require_crossing_signal)
+    terminal_codes = (R_NO_CROSS, R_BREAKOUT_EXCESS, R_BREAKOUT, ENTRY)
+    onehot = np.stack([terminal == code for code in terminal_codes], axis=-1).astype(np.int32)
+    terminal_columns = reason_columns[list(terminal_codes)]
+
+    def descend(stage: int, idx: np.ndarray, view: np.ndarray) -> None:
+        if idx.size == 0:
+            return
+        if stage == len(stages):
+            view[..., column["passed"]] += idx.size
+            view[..., terminal_columns] += onehot[idx].sum(axis=0)
+            return
+        dims, values, check = stages[stage]
+        for k, value in enumerate(values):
+            sub = view
+            if dims == 1:
+                sub = view[k]
+            elif dims == 2:
+                sub = view[k // len(grid["news_block_after_min"]), k % len(grid["news_block_after_min"])]
+            codes = check(idx, value)
+            record(sub, codes)
+            descend(stage + 1, idx[codes == 0], sub)
+
+    descend(0, local, counts)
+    return counts
+
+
+def grid_rows(
+    resampled: ResampledStore,
+    symbol: str,
+    base: BreakoutParams,
+    grid: Dict[str, Sequence],
+    start_ts: int,
+    end_ts: int,
+    news_times: Optional[np.ndarray] = None,
+    cache: Optional[ArtifactCache] = None,
+):
+    # Yields one dict per parameter combination: the grid values plus COUNT_COLUMNS.
+    m1 = resampled.m1.load_range(symbol, start_ts, end_ts + 86400)
+    m1_time = np.asarray(m1.time, dtype=np.int64)
+    m1_spread = np.asarray(m1.spread, dtype=np.float64)
+    for atr_period, donchian_bars in itertools.product(grid["atr_period"], grid["donchian_bars"]):
+        params = dataclasses.replace(base, atr_period=atr_period, donchian_bars=donchian_bars)
+        matrix = build_matrix(resampled, symbol, params.gate_params(), cache)
+        bars = decision_bars(matrix["time"], m1_time, m1_spread, start_ts, end_ts, news_times)
+        counts = grid_composition(matrix, bars, params, grid)
+        for index in np.ndindex(*counts.shape[:-1]):
+            row = {"atr_period": atr_period, "donchian_bars": donchian_bars}
+            row.update({dim: grid[dim][k] for dim, k in zip(GATE_DIMS, index)})
+            row.update({name: int(v) for name, v in zip(COUNT_COLUMNS, counts[index])})
+            yield row
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Replay the XAUUSD_RobustBreakout entry gates offline and count which gate rejects each bar, per parameter set."
+    )
+    parser.add_argument("--store-dir", required=True, help="Columnar bar store root holding <SYMBOL>/M1 partitions.")
+    parser.add_argument("--cache-dir", default="", help="Optional root for resampled bars; defaults to --store-dir.")
+    parser.add_argument("--artifact-cache-dir", default="", help="Defaults to <cache-dir>/artifacts.")
+    parser.add_argument("--cache-max-gb", type=float, default=DEFAULT_MAX_GB)
+    parser.add_argument("--symbol", default="XAUUSD")
+    parser.add_argument("--from-date", required=True, help="YYYY-MM-DD, first decision day.")
+    parser.add_argument("--to-date", required=True, help="YYYY-MM-DD, last decision day (inclusive).")
+    parser.add_argument(
+        "--opt-set",
+        default="",
+        help="Tester optimisation .set (e.g. config/XAUUSD_RobustBreakout.opt.set); without it only the EA defaults run.",
+    )
+    parser.add_argument("--news-csv", default="", help="Optional high-impact events (time[,currency,importance]) in server time.")
+    parser.add_argument("--out-csv", default="", help="Per-combination reject composition.")
+    parser.add_argument("--min-passed", type=int, default=0, help="Only write combinations with at least this many passed bars.")
+    parser.add_argument("--min-entries", type=int, default=0, help="Only write combinations with at least this many entries.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    cache_root = Path(args.cache_dir) if args.cache_dir else Path(args.store_dir)
+    resampled = ResampledStore(BarStore(Path(args.store_dir)), cache_root)
+    cache = open_cache(args.artifact_cache_dir or str(cache_root / "artifacts"), args.cache_max_gb)
+    if args.opt_set:
+        base, grid = load_opt_set(Path(args.opt_set))
+    else:
+        base = BreakoutParams()
+        grid = {dim: [getattr(base, dim)] for dim in GRID_DIMS}
+    news_times = load_news_times(Path(args.news_csv), base.news_currencies) if args.news_csv else None
+    if news_times is None:
+        # Same as the tester without calendar history: the news gate never fires.
+        grid["news_block_before_min"] = [base.news_block_before_min]
+        grid["news_block_after_min"] = [base.news_block_after_min]
+    start_ts = date_to_ts(dt.date.fromisoformat(args.from_date))
+    end_ts = date_to_ts(dt.date.fromisoformat(args.to_date)) + 86400
+
+    out = Path(args.out_csv) if args.out_csv else None
+    handle = None
+    writer = None
+    if out is not None:
+        out.parent.mkdir(parents=True, exist_ok=True)
+        handle = out.open("w", encoding="utf-8", newline="")
+        writer = csv.DictWriter(handle, fieldnames=list(GRID_DIMS) + list(COUNT_COLUMNS))
+        writer.writeheader()
+    total = 0
+    kept = 0
+    overall = np.zeros(len(COUNT_COLUMNS), dtype=np.int64)
+    try:
+        for row in grid_rows(resampled, args.symbol, base, grid, start_ts, end_ts, news_times, cache):
+            total += 1
+            overall += np.array([row[name] for name in COUNT_COLUMNS])
+            if row["passed"] >= args.min_passed and row["entries"] >= args.min_entries:
+                kept += 1
+                if writer is not None:
+                    writer.writerow(row)
+    finally:
+        if handle is not None:
+            handle.close()
+
+    print(f"{args.symbol} {base.signal_tf} {args.from_date}..{args.to_date}: {total} parameter sets, {kept} pass the filters")
+    if total:
+        mean = {name: overall[k] / total for k, name in enumerate(COUNT_COLUMNS)}
+        print("  mean per set: " + " ".join(f"{name}={mean[name]:.0f}" for name in COUNT_COLUMNS if mean[name] >= 0.5))
+    if out is not None:
+        print(f"  wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
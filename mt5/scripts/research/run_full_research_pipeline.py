@@ -29,6 +29,22 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--stage3-max-per-seed", type=int, default=6)
     parser.add_argument("--timeout-sec", type=int, default=900)
     parser.add_argument("--terminal-path", default=str(DEFAULT_TERMINAL_PATH))
+    parser.add_argument(
+        "--bar-db-path",
+        default="",
+        help="Persistent bar database shared across runs. When set, ingestion is incremental and "
+        "features read from it instead of a fresh <run>/data/xauusd_m1.sqlite.",
+    )
+    parser.add_argument(
+        "--artifact-cache-dir",
+        default="",
+        help="Content-addressed cache shared across runs; derived datasets with unchanged inputs are reused.",
+    )
+    parser.add_argument(
+        "--prescreen-store-dir",
+        default="",
+        help="M1 bar store root; stage 1 then scores the whole candidate grid offline before using the terminal.",
+    )
     parser.add_argument("--metaeditor-path", default=str(DEFAULT_METAEDITOR_PATH))
     parser.add_argument("--terminal-data-dir", default=str(DEFAULT_TERMINAL_DATA_DIR))
     return parser.parse_args()
@@ -72,6 +88,8 @@ def main() -> None:
         "--terminal-path",
         args.terminal_path,
     ]
+    if args.bar_db_path:
+        pull_cmd += ["--db-path", args.bar_db_path, "--incremental"]
     run_cmd(pull_cmd, cwd=repo_root)
 
     feature_cmd = [
@@ -86,6 +104,10 @@ def main() -> None:
         "--to-date",
         args.to_date,
     ]
+    if args.bar_db_path:
+        feature_cmd += ["--db-path", args.bar_db_path]
+    if args.artifact_cache_dir:
+        feature_cmd += ["--artifact-cache-dir", args.artifact_cache_dir]
     run_cmd(feature_cmd, cwd=repo_root)
 
     search_cmd = [
@@ -124,6 +146,8 @@ def main() -> None:
         "--terminal-data-dir",
         args.terminal_data_dir,
     ]
+    if args.prescreen_store_dir:
+        search_cmd += ["--prescreen-store-dir", args.prescreen_store_dir]
     run_cmd(search_cmd, cwd=repo_root)
 
     select_cmd = [
@@ -151,6 +175,7 @@ def main() -> None:
         "deposit": args.deposit,
         "leverage": args.leverage,
         "lot": args.lot,
+        "bar_db_path": args.bar_db_path,
         "target_quarter_net": args.target_quarter_net,
         "ingestion": ingestion,
         "search": search,
@@ -30,6 +30,7 @@ from common import (
     wait_for_report,
     write_ini_file,
 )
+from research_db import create_schema
 
 
 TIMEFRAME_TO_ENUM = {
@@ -125,6 +126,12 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--stage3-seeds", type=int, default=3)
     parser.add_argument("--stage3-max-per-seed", type=int, default=6)
     parser.add_argument("--timeout-sec", type=int, default=900)
+    parser.add_argument(
+        "--prescreen-store-dir",
+        default="",
+        help="M1 bar store root. When set, the whole stage-1 grid is scored offline by the Python "
+        "backtester and the best --stage1-max-candidates go to the terminal instead of a random sample.",
+    )
     return parser.parse_args()
 
 
@@ -152,7 +159,7 @@ def candidate_inputs(candidate: Candidate, tf_enum: int, lot: float) -> List[str
     ]
 
 
-def build_stage1_candidates(max_candidates: int) -> List[Candidate]:
+def stage1_grid() -> List[Candidate]:
     fast_slow_pairs = [
         (9, 30),
         (12, 50),
@@ -211,6 +218,11 @@ def build_stage1_candidates(max_candidates: int) -> List[Candidate]:
     unique = {c.candidate_id(): c for c in full}
     all_candidates = list(unique.values())
     all_candidates.sort(key=lambda c: c.candidate_id())
+    return all_candidates
+
+
+def build_stage1_candidates(max_candidates: int) -> List[Candidate]:
+    all_candidates = stage1_grid()
     if len(all_candidates) <= max_candidates:
         return all_candidates
 
@@ -220,6 +232,38 @@ def build_stage1_candidates(max_candidates: int) -> List[Candidate]:
     return sampled
 
 
+def prescreen_stage1_candidates(
+    store_dir: Path,
+    symbol: str,
+    strategy_tf: str,
+    periods: List[Tuple[str, dt.date, dt.date]],
+    max_candidates: int,
+    lot: float,
+    deposit: int,
+    out_csv: Path,
+) -> List[Candidate]:
+    # Imported here: the backtester modules import this one for Candidate and the grid.
+    from backtest_grid import backtest_grid
+    from bar_store import BarStore
+    from resample_bars import ResampledStore
+
+    grid = stage1_grid()
+    resampled = ResampledStore(BarStore(store_dir))
+    metrics = backtest_grid(resampled, symbol, strategy_tf, grid, periods, lot=lot, deposit=float(deposit))
+    scored = [(c, candidate_summary(m)) for c, m in zip(grid, metrics)]
+    scored.sort(key=lambda cs: (cs[1]["min_net"], cs[1]["avg_net"], cs[1]["avg_pf"]), reverse=True)
+    if out_csv.exists():
+        out_csv.unlink()
+    append_csv(
+        out_csv,
+        [{"candidate_id": c.candidate_id(), **{k: round(float(v), 4) for k, v in s.items()}} for c, s in scored],
+        fieldnames=["candidate_id", "min_net", "avg_net", "median_net", "avg_pf", "max_dd_pct", "periods_ok"],
+    )
+    top = [c for c, _ in scored[:max_candidates]]
+    top.sort(key=lambda c: c.candidate_id())
+    return top
+
+
 def mutate_candidate(seed: Candidate) -> List[Candidate]:
     deltas = [
         (-2, 0, 0, 0.0, 0.0, 0),
@@ -448,10 +492,23 @@ def main() -> None:
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
     try:
+        create_schema(conn)
         stage1_periods = quarter_ranges(2021, 2022)
         stage2_periods = quarter_ranges(2023, 2025)
 
-        stage1_candidates = build_stage1_candidates(args.stage1_max_candidates)
+        if args.prescreen_store_dir:
+            stage1_candidates = prescreen_stage1_candidates(
+                Path(args.prescreen_store_dir),
+                args.symbol,
+                args.strategy_tf,
+                stage1_periods,
+                args.stage1_max_candidates,
+                args.lot,
+                args.deposit,
+                summaries_dir / "stage1_prescreen.csv",
+            )
+        else:
+            stage1_candidates = build_stage1_candidates(args.stage1_max_candidates)
         stage1_scores: Dict[str, Dict[str, float]] = {}
         stage2_scores: Dict[str, Dict[str, float]] = {}
         period_records: List[Dict[str, object]] = []
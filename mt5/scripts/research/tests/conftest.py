@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The research scripts import each other as top-level modules (they run as scripts).
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
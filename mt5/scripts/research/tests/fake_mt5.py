@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import datetime as dt
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from trading_calendar import calendar_for
+
+
+RATE_DTYPE = np.dtype(
+    [
+        ("time", "<i8"),
+        ("open", "<f8"),
+        ("high", "<f8"),
+        ("low", "<f8"),
+        ("close", "<f8"),
+        ("tick_volume", "<u8"),
+        ("spread", "<i4"),
+        ("real_volume", "<u8"),
+    ]
+)
+
+
+class FakeMT5:
+    # Stand-in for the MetaTrader5 module: copy_rates_range serves one synthetic M1 bar per
+    # expected minute of the symbol's trading calendar. refuse_above makes it return None for
+    # wider requests (the terminal rejecting a window); cap truncates replies like the terminal's
+    # max-bars setting. Calls and peak concurrency are recorded for the tests.
+    TIMEFRAME_M1 = 1
+
+    def __init__(self, refuse_above: Optional[int] = None, cap: Optional[int] = None) -> None:
+        self.refuse_above = refuse_above
+        self.cap = cap
+        self.calls: List[Tuple[str, dt.datetime, dt.datetime]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def initialize(self, path: str = "") -> bool:
+        return True
+
+    def shutdown(self) -> None:
+        pass
+
+    def last_error(self) -> Tuple[int, str]:
+        return (1, "Success")
+
+    def symbol_select(self, symbol: str, enable: bool) -> bool:
+        return True
+
+    def minutes(self, symbol: str, start: dt.datetime, end: dt.datetime) -> np.ndarray:
+        ts = np.arange(int(start.timestamp()), int(end.timestamp()), 60, dtype=np.int64)
+        return ts[calendar_for(symbol).is_expected(ts)]
+
+    def copy_rates_range(self, symbol: str, timeframe: int, start: dt.datetime, end: dt.datetime):
+        with self._lock:
+            self.calls.append((symbol, start, end))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            ts = self.minutes(symbol, start, end)
+            if self.refuse_above is not None and len(ts) > self.refuse_above:
+                return None
+            if self.cap is not None:
+                ts = ts[: self.cap]
+            rates = np.zeros(len(ts), dtype=RATE_DTYPE)
+            rates["time"] = ts
+            price = 2000.0 + (ts - ts[0]) / 86400.0 if len(ts) else 0.0
+            rates["open"] = price
+            rates["high"] = price + 0.5
+            rates["low"] = price - 0.5
+            rates["close"] = price + 0.1
+            rates["tick_volume"] = 10
+            rates["spread"] = 20
+            return rates
+        finally:
+            with self._lock:
+                self.in_flight -= 1
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import math
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+
+# Buffer-at-a-time ports of the terminal's reference indicators (MovingAverages.mqh ExponentialMA,
+# ATR.mq5, ADX.mq5, ADXW.mq5, RSI.mq5) and of XAUUSD_RobustBreakout's GetDonchianLevels and
+# GetAtrPercentile, kept deliberately close to the MQL: running sums where the terminal keeps them,
+# zero-filled warm-up bars, one loop per buffer. They share nothing with indicators.py, so the
+# golden fixture written by write_golden_csv() is an independent reference for it. Its columns and
+# number format are those of ExportIndicatorGolden.mq5; a terminal export can sit next to it.
+GOLDEN_COLUMNS = (
+    "ema_50",
+    "ema_200",
+    "atr_14",
+    "adx_14",
+    "pdi_14",
+    "ndi_14",
+    "adxw_14",
+    "pdiw_14",
+    "ndiw_14",
+    "rsi_14",
+    "dchu_40",
+    "dchl_40",
+    "atrpct_240",
+)
+
+
+def exponential_ma(price: np.ndarray, period: int) -> np.ndarray:
+    out = np.zeros(len(price))
+    pr = 2.0 / (period + 1.0)
+    out[0] = price[0]
+    for i in range(1, len(price)):
+        out[i] = price[i] * pr + out[i - 1] * (1.0 - pr)
+    return out
+
+
+def true_range_buffer(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    tr = np.zeros(len(high))
+    tr[0] = high[0] - low[0]
+    for i in range(1, len(high)):
+        tr[i] = max(high[i], close[i - 1]) - min(low[i], close[i - 1])
+    return tr
+
+
+def atr_buffer(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int) -> np.ndarray:
+    # ATR.mq5: first value at bar `period` from TR[1..period], then the running add/subtract.
+    tr = true_range_buffer(high, low, close)
+    out = np.zeros(len(high))
+    if len(high) <= period:
+        return out
+    total = 0.0
+    for i in range(1, period + 1):
+        total += tr[i]
+    out[period] = total / period
+    for i in range(period + 1, len(high)):
+        out[i] = out[i - 1] + (tr[i] - tr[i - period]) / period
+    return out
+
+
+def directional_moves(high: np.ndarray, low: np.ndarray, i: int):
+    plus = max(high[i] - high[i - 1], 0.0)
+    minus = max(low[i - 1] - low[i], 0.0)
+    if plus > minus:
+        minus = 0.0
+    elif plus < minus:
+        plus = 0.0
+    else:
+        plus = minus = 0.0
+    return plus, minus
+
+
+def adx_buffers(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int):
+    # ADX.mq5: +DM/-DM as a share of the bar's TR, EMA-smoothed DI lines, EMA-smoothed DX.
+    n = len(high)
+    pdi = np.zeros(n)
+    ndi = np.zeros(n)
+    adx = np.zeros(n)
+    pr = 2.0 / (period + 1.0)
+    for i in range(1, n):
+        plus, minus = directional_moves(high, low, i)
+        tr = max(abs(high[i] - low[i]), abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+        pd_ = 100.0 * plus / tr if tr != 0.0 else 0.0
+        nd_ = 100.0 * minus / tr if tr != 0.0 else 0.0
+        pdi[i] = pd_ * pr + pdi[i - 1] * (1.0 - pr)
+        ndi[i] = nd_ * pr + ndi[i - 1] * (1.0 - pr)
+        s = pdi[i] + ndi[i]
+        dx = 100.0 * abs((pdi[i] - ndi[i]) / s) if s != 0.0 else 0.0
+        adx[i] = dx * pr + adx[i - 1] * (1.0 - pr)
+    return adx, pdi, ndi
+
+
+def smoothed(values: np.ndarray, first: int, period: int) -> np.ndarray:
+    # SMMA over values[first - period + 1 ..]: SMA seed at bar `first`, Wilder steps after; zeros before.
+    out = np.zeros(len(values))
+    if len(values) <= first:
+        return out
+    out[first] = sum(values[first - period + 1 : first + 1]) / period
+    for i in range(first + 1, len(values)):
+        out[i] = (out[i - 1] * (period - 1) + values[i]) / period
+    return out
+
+
+def adx_wilder_buffers(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int):
+    # ADXW.mq5: Wilder-smoothed TR/+DM/-DM from bar 1, DI from their ratio, Wilder-smoothed DX.
+    n = len(high)
+    tr = np.zeros(n)
+    plus = np.zeros(n)
+    minus = np.zeros(n)
+    for i in range(1, n):
+        plus[i], minus[i] = directional_moves(high, low, i)
+        tr[i] = max(abs(high[i] - low[i]), abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+    tr_s = smoothed(tr, period, period)
+    plus_s = smoothed(plus, period, period)
+    minus_s = smoothed(minus, period, period)
+    pdi = np.zeros(n)
+    ndi = np.zeros(n)
+    dx = np.zeros(n)
+    for i in range(period, n):
+        if tr_s[i] != 0.0:
+            pdi[i] = 100.0 * plus_s[i] / tr_s[i]
+            ndi[i] = 100.0 * minus_s[i] / tr_s[i]
+        s = pdi[i] + ndi[i]
+        dx[i] = 100.0 * abs((pdi[i] - ndi[i]) / s) if s != 0.0 else 0.0
+    return smoothed(dx, 2 * period - 1, period), pdi, ndi
+
+
+def rsi_buffer(close: np.ndarray, period: int) -> np.ndarray:
+    # RSI.mq5: mean gain/loss over the first `period` changes, Wilder steps after; zeros before.
+    n = len(close)
+    out = np.zeros(n)
+    if n <= period:
+        return out
+    pos = neg = 0.0
+    for i in range(1, period + 1):
+        diff = close[i] - close[i - 1]
+        pos += max(diff, 0.0)
+        neg += max(-diff, 0.0)
+    pos /= period
+    neg /= period
+    for i in range(period, n):
+        if i > period:
+            diff = close[i] - close[i - 1]
+            pos = (pos * (period - 1) + max(diff, 0.0)) / period
+            neg = (neg * (period - 1) + max(-diff, 0.0)) / period
+        out[i] = 100.0 - 100.0 / (1.0 + pos / neg) if neg != 0.0 else (100.0 if pos != 0.0 else 50.0)
+    return out
+
+
+def donchian_levels(high: np.ndarray, low: np.ndarray, bars: int):
+    # GetDonchianLevels over the `bars` bars ending at each bar; NaN until that many exist.
+    upper = np.full(len(high), math.nan)
+    lower = np.full(len(high), math.nan)
+    for i in range(bars - 1, len(high)):
+        highest = high[i - bars + 1]
+        lowest = low[i - bars + 1]
+        for k in range(i - bars + 2, i + 1):
+            highest = max(highest, high[k])
+            lowest = min(lowest, low[k])
+        upper[i] = highest
+        lower[i] = lowest
+    return upper, lower
+
+
+def atr_percentiles(atr_values: np.ndarray, lookback: int) -> np.ndarray:
+    # GetAtrPercentile for each bar's own ATR over the last `lookback` values (fewer at the start).
+    out = np.full(len(atr_values), math.nan)
+    for i in range(len(atr_values)):
+        current = atr_values[i]
+        if lookback < 20 or not current > 0.0:
+            continue
+        valid = 0
+        less_or_equal = 0
+        for value in atr_values[max(0, i - lookback + 1) : i + 1]:
+            if not math.isfinite(value) or value <= 0.0:
+                continue
+            valid += 1
+            if value <= current:
+                less_or_equal += 1
+        if valid >= 20:
+            out[i] = 100.0 * (less_or_equal / valid)
+    return out
+
+
+def synthetic_rates(count: int, seed: int = 20240304) -> Dict[str, np.ndarray]:
+    # XAUUSD-like M15 bars with 2-digit prices: a random walk with volatility regimes, so the
+    # channels, percentiles and DI lines all move through their range.
+    rng = np.random.default_rng(seed)
+    vol = np.repeat(rng.uniform(0.6, 3.0, count // 50 + 1), 50)[:count]
+    close = np.round(2000.0 + np.cumsum(rng.normal(0.0, 1.0, count) * vol), 2)
+    open_ = np.round(np.r_[close[0] - 0.5, close[:-1]] + rng.normal(0.0, 0.2, count), 2)
+    high = np.round(np.maximum(open_, close) + rng.exponential(0.8, count) * vol, 2)
+    low = np.round(np.minimum(open_, close) - rng.exponential(0.8, count) * vol, 2)
+    time = 1709510400 + 900 * np.arange(count, dtype=np.int64)
+    return {"time": time, "open": open_, "high": high, "low": low, "close": close}
+
+
+def golden_table(rates: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    h, l, c = rates["high"], rates["low"], rates["close"]
+    atr14 = atr_buffer(h, l, c, 14)
+    adx14, pdi14, ndi14 = adx_buffers(h, l, c, 14)
+    adxw14, pdiw14, ndiw14 = adx_wilder_buffers(h, l, c, 14)
+    dchu, dchl = donchian_levels(h, l, 40)
+    table = dict(rates)
+    table.update(
+        ema_50=exponential_ma(c, 50),
+        ema_200=exponential_ma(c, 200),
+        atr_14=atr14,
+        adx_14=adx14,
+        pdi_14=pdi14,
+        ndi_14=ndi14,
+        adxw_14=adxw14,
+        pdiw_14=pdiw14,
+        ndiw_14=ndiw14,
+        rsi_14=rsi_buffer(c, 14),
+        dchu_40=dchu,
+        dchl_40=dchl,
+        atrpct_240=atr_percentiles(atr14, 240),
+    )
+    return table
+
+
+def write_golden_csv(path: Path, count: int = 600) -> None:
+    table = golden_table(synthetic_rates(count))
+    lines: List[str] = [",".join(("time", "open", "high", "low", "close") + GOLDEN_COLUMNS)]
+    for i in range(count):
+        cells = [str(int(table["time"][i]))]
+        cells += [f"{table[k][i]:.10g}" for k in ("open", "high", "low", "close")]
+        cells += ["" if math.isnan(table[k][i]) else f"{table[k][i]:.17g}" for k in GOLDEN_COLUMNS]
+        lines.append(",".join(cells))
+    path.write_text("\n".join(lines) + "\n", encoding="ascii")
+
+
+if __name__ == "__main__":
+    write_golden_csv(Path(__file__).resolve().parent / "fixtures" / "indicator_golden_reference_XAUUSD_M15.csv")
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import dataclasses
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pytest
+
+from backtest_ema_research import (
+    EA_DEFAULTS,
+    EXPERT_OVERRIDES,
+    INPUT_FIELDS,
+    SYMBOL_SPECS,
+    Trade,
+    candidate_from_inputs,
+    parity_row,
+    report_trades,
+    settings_timeframe,
+    signal_arrays,
+    simulate,
+    trade_metrics,
+)
+from bar_store import BarArrays, BarStore
+from common import parse_ini_settings, parse_mt5_report, parse_report_deals, parse_report_settings
+from resample_bars import ResampledStore
+
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+EXPERTS_DIR = Path(__file__).resolve().parents[3] / "experts"
+# Saved terminal reports of the buy-only EA (H1 EMA50/75, lot 1, deposit 25000): one month with a
+# swap-carrying end-of-test close, one year with 21 trades and a 46.86% balance drawdown.
+REPORTS = ("ema50_75_200_buy_xauusd_h1_202410.htm", "baseline_h1_50_75_l1_2023.htm")
+# The tester .ini each report was run from.
+REPORT_INIS = {
+    "ema50_75_200_buy_xauusd_h1_202410.htm": "EMA_small_big_EMA200_Buy_TimeFrame_Symbol_XAUUSD_H1_EMA50_75_202410.ini",
+    "baseline_h1_50_75_l1_2023.htm": "baseline_h1_50_75_l1_2023.ini",
+}
+# Bar store holding the XAUUSD M1 history the reports were run on; the tree ships none.
+PARITY_STORE_DIR = os.environ.get("MT5_PARITY_STORE_DIR", "")
+SPEC = SYMBOL_SPECS["XAUUSD"]
+# Synthetic H1 tests start at midnight, so strategy bar j opens at hour j and at M1 index 60 * j.
+DAY = 1704153600
+BUY_ONLY = dataclasses.replace(candidate_from_inputs({}), trade_mode=0)
+BOTH_WAYS = candidate_from_inputs({})
+
+
+@pytest.mark.parametrize("name", REPORTS)
+def test_report_deals_reproduce_report_metrics(name: str) -> None:
+    # The accounting half of parity: the engine's metrics over the tester's own deals must give the
+    # tester's summary (net/gross, trade count, PF, balance drawdown in money and %).
+    report = FIXTURES / name
+    deals = parse_report_deals(report)
+    deposit = next(d.profit for d in deals if d.type == "balance")
+    ours = trade_metrics(report_trades(deals), deposit, name)
+    mt5 = parse_mt5_report(report)
+    for field in ("net_profit", "gross_profit", "gross_loss", "profit_factor", "max_drawdown_abs", "max_drawdown_pct"):
+        assert getattr(ours, field) == pytest.approx(getattr(mt5, field), abs=0.011), field
+    assert ours.total_trades == mt5.total_trades
+
+
+@pytest.mark.parametrize("name", REPORTS)
+def test_deal_profit_matches_symbol_spec(name: str) -> None:
+    # P&L = price move * contract size * volume, before swap; the engine prices trades this way.
+    spec = SYMBOL_SPECS["XAUUSD"]
+    deals = parse_report_deals(FIXTURES / name)
+    entries = {}
+    checked = 0
+    for d in deals:
+        if d.direction == "in":
+            entries["open"] = d
+        elif d.direction == "out":
+            entry = entries.pop("open")
+            sign = 1 if entry.type == "buy" else -1
+            assert round((d.price - entry.price) * sign * spec.contract_size * d.volume, 2) == pytest.approx(d.profit)
+            checked += 1
+    assert checked == parse_mt5_report(FIXTURES / name).total_trades
+
+
+def mq5_input_defaults(path: Path) -> Dict[str, str]:
+    text = path.read_text(encoding="utf-8", errors="ignore")
+    enums = {name: value for name, value in re.findall(r"^\s*(\w+)\s*=\s*(\d+)\s*,?\s*$", text, flags=re.MULTILINE)}
+    out: Dict[str, str] = {}
+    for name, value in re.findall(r"^input\s+\w+\s+(\w+)\s*=\s*([^;]+);", text, flags=re.MULTILINE):
+        out[name] = enums.get(value.strip(), value.strip())
+    return out
+
+
+def test_ea_defaults_match_research_ea_inputs() -> None:
+    inputs = mq5_input_defaults(EXPERTS_DIR / "EMA_small_big_EMA200_Buy_TimeFrame_Symbol_Research.mq5")
+    mapped = {INPUT_FIELDS[k]: v for k, v in inputs.items() if k in INPUT_FIELDS}
+    assert set(mapped) == set(EA_DEFAULTS)
+    assert dataclasses.asdict(candidate_from_inputs(inputs)) == EA_DEFAULTS
+
+
+def test_buy_only_ea_override_matches_its_source() -> None:
+    # The older EA has no filter inputs: fast/slow are its only strategy inputs, the filter EMA is a
+    # 200 constant, it only buys, and a bearish cross closes the buy. That is the research EA in
+    # TRADE_MODE_BUY_ONLY with every optional filter off, which EXPERT_OVERRIDES encodes.
+    path = EXPERTS_DIR / "EMA_small_big_EMA200_Buy_TimeFrame_Symbol.mq5"
+    text = path.read_text(encoding="utf-8", errors="ignore")
+    inputs = mq5_input_defaults(path)
+    assert set(inputs) == {"InpLotSize", "InpFastEmaPeriod", "InpSlowEmaPeriod", "InpStrategyTimeframe"}
+    assert re.search(r"const int FILTER_EMA_PERIOD = 200;", text)
+    assert "g_trade.Sell(" not in text
+    assert re.search(r"if\(has_open_buy && bearish_cross\)", text)
+    expert = "EMA_small_big_EMA200_Buy_TimeFrame_Symbol"
+    c = candidate_from_inputs(inputs, expert)
+    assert (c.trade_mode, c.fast, c.slow, c.filter_ema) == (0, 9, 15, 200)
+    assert EXPERT_OVERRIDES[expert] == {"trade_mode": 0, "fast": 9, "slow": 15}
+    assert not (c.use_adx or c.use_atr or c.session_filter or c.cooldown_bars or c.use_sltp or c.evaluate_on_every_tick)
+
+
+def test_every_tick_mode_is_rejected() -> None:
+    n = 10
+    t = np.arange(n, dtype=np.int64) * 60
+    price = np.full(n, 2000.0)
+    bars = BarArrays(t, price, price, price, price, np.ones(n, np.int64), np.zeros(n, np.int32), np.zeros(n, np.int64))
+    c = candidate_from_inputs({"InpEvaluateOnEveryTick": "true"})
+    with pytest.raises(ValueError, match="InpEvaluateOnEveryTick"):
+        simulate(bars, bars, c, SYMBOL_SPECS["XAUUSD"], 1.0)
+
+
+def flat_m1(hours: int) -> BarArrays:
+    # One M1 bar per minute, bid flat at 2000.00, 20-point (0.20) spread; tests edit single bars.
+    n = hours * 60
+    price = np.full(n, 2000.0)
+    return BarArrays(
+        DAY + 60 * np.arange(n, dtype=np.int64),
+        price.copy(),
+        price.copy(),
+        price.copy(),
+        price.copy(),
+        np.ones(n, np.int64),
+        np.full(n, 20, np.int32),
+        np.zeros(n, np.int64),
+    )
+
+
+def h1_bars(close: np.ndarray) -> BarArrays:
+    n = len(close)
+    t = DAY + 3600 * np.arange(n, dtype=np.int64)
+    return BarArrays(t, close, close, close, close, np.ones(n, np.int64), np.zeros(n, np.int32), np.zeros(n, np.int64))
+
+
+def given_signals(hours: int, bull: Iterable[int] = (), bear: Iterable[int] = (), atr: float = 0.0) -> Dict[str, np.ndarray]:
+    # Crosses on closed bars i, each on the filter's side; the EA acts on them at bar i + 1.
+    sig = {name: np.zeros(hours, dtype=bool) for name in ("bull", "bear", "above", "below")}
+    for i in bull:
+        sig["bull"][i] = sig["above"][i] = True
+    for i in bear:
+        sig["bear"][i] = sig["below"][i] = True
+    sig["atr"] = np.full(hours, atr)
+    return sig
+
+
+def run(c, m1: BarArrays, hours: int, **signals) -> List[Trade]:
+    return simulate(h1_bars(np.full(hours, 2000.0)), m1, c, SPEC, 1.0, signals=given_signals(hours, **signals))
+
+
+def test_bull_cross_buys_at_next_bar_m1_open_plus_spread() -> None:
+    # EMA2/EMA3 over a V: the bull cross closes bar 6 above EMA4, so the buy fills on the first
+    # M1 tick of bar 7 at its ask. The earlier bear cross opens nothing in buy-only mode.
+    close = np.array([10.0, 9.0, 8.0, 7.0, 6.0, 7.0, 8.0, 9.0, 10.0, 11.0])
+    bars = h1_bars(close)
+    c = dataclasses.replace(BUY_ONLY, fast=2, slow=3, filter_ema=4)
+    sig = signal_arrays(bars, c)
+    assert np.flatnonzero(sig["bull"]).tolist() == [6] and sig["above"][6]
+    m1 = flat_m1(len(close))
+    m1.open[420] = 2001.23
+    m1.spread[420] = 35
+    m1.close[-1] = 2003.00
+    (trade,) = simulate(bars, m1, c, SPEC, 1.0)
+    assert (trade.direction, trade.entry_time, trade.entry_price) == (1, DAY + 7 * 3600, 2001.58)
+    # Still open at the last tick: closed there at the bid.
+    assert (trade.exit_time, trade.exit_price, trade.exit_reason) == (int(m1.time[-1]), 2003.00, "end")
+    assert trade.profit == pytest.approx((2003.00 - 2001.58) * 100.0)
+
+
+@pytest.mark.parametrize(
+    "edit, exit_price, reason",
+    [
+        # Long from the ask 2000.20 with ATR 1: SL 1999.20, TP 2002.20, both on the bid.
+        ({"low": 1999.10}, 1999.20, "sl"),
+        ({"open": 1998.50, "high": 1998.50, "low": 1998.40}, 1998.50, "sl"),
+        ({"high": 2002.30}, 2002.20, "tp"),
+        ({"open": 2003.00, "high": 2003.10, "low": 2003.00}, 2003.00, "tp"),
+    ],
+)
+def test_long_stops_fill_at_level_or_at_an_open_beyond_it(edit: Dict[str, float], exit_price: float, reason: str) -> None:
+    c = dataclasses.replace(BUY_ONLY, use_sltp=1, sl_atr=1.0, tp_atr=2.0)
+    m1 = flat_m1(6)
+    for column, value in edit.items():
+        getattr(m1, column)[200] = value
+    (trade,) = run(c, m1, 6, bull=[1], atr=1.0)
+    assert (trade.entry_time, trade.entry_price) == (DAY + 2 * 3600, 2000.20)
+    assert (trade.exit_time, trade.exit_price, trade.exit_reason) == (int(m1.time[200]), exit_price, reason)
+
+
+def test_short_stop_is_hit_by_the_ask() -> None:
+    # Short from the bid 2000.00: SL 2001.00. A bid high of 2000.85 with a 20-point spread is an
+    # ask of 2001.05, which reaches it; the same high with a 10-point spread does not.
+    c = dataclasses.replace(BOTH_WAYS, use_sltp=1, sl_atr=1.0, tp_atr=2.0)
+    m1 = flat_m1(6)
+    m1.high[200] = 2000.85
+    m1.spread[200] = 10
+    m1.high[230] = 2000.85
+    (trade,) = run(c, m1, 6, bear=[1], atr=1.0)
+    assert (trade.direction, trade.entry_price) == (-1, 2000.00)
+    assert (trade.exit_time, trade.exit_price, trade.exit_reason) == (int(m1.time[230]), 2001.00, "sl")
+    assert trade.profit == pytest.approx(-100.0)
+
+
+def test_buy_only_bearish_cross_closes_the_buy_at_the_bid() -> None:
+    m1 = flat_m1(8)
+    m1.open[300] = 2004.00
+    trades = run(BUY_ONLY, m1, 8, bull=[1], bear=[4, 6])
+    # The bear cross after bar 4 closes the buy at bar 5's bid open; neither cross opens a short.
+    assert len(trades) == 1
+    assert (trades[0].exit_time, trades[0].exit_price, trades[0].exit_reason) == (DAY + 5 * 3600, 2004.00, "signal")
+    assert trades[0].profit == pytest.approx((2004.00 - 2000.20) * 100.0)
+
+
+def test_session_filter_skips_crosses_acted_on_outside_the_session() -> None:
+    # London (2) trades bars opening 07:00-15:59: the cross acted on at 04:00 is dropped, the one
+    # acted on at 08:00 opens.
+    c = dataclasses.replace(BUY_ONLY, session_filter=2)
+    trades = run(c, flat_m1(12), 12, bull=[3, 7])
+    assert [t.entry_time for t in trades] == [DAY + 8 * 3600]
+    assert [t.entry_time for t in run(BUY_ONLY, flat_m1(12), 12, bull=[3, 7])] == [DAY + 4 * 3600]
+
+
+def test_cooldown_ignores_signals_until_enough_bars_passed() -> None:
+    # Cooldown 3 after the buy at bar 2: the bear cross acted on at bar 3 neither closes nor
+    # reverses it; the one at bar 5 does both.
+    c = dataclasses.replace(BOTH_WAYS, cooldown_bars=3)
+    trades = run(c, flat_m1(8), 8, bull=[1], bear=[2, 4])
+    assert [(t.direction, t.entry_time, t.exit_time, t.exit_reason) for t in trades] == [
+        (1, DAY + 2 * 3600, DAY + 5 * 3600, "signal"),
+        (-1, DAY + 5 * 3600, DAY + 8 * 3600 - 60, "end"),
+    ]
+    without = run(BOTH_WAYS, flat_m1(8), 8, bull=[1], bear=[2, 4])
+    assert [(t.direction, t.entry_time) for t in without] == [(1, DAY + 2 * 3600), (-1, DAY + 3 * 3600)]
+
+
+@pytest.mark.parametrize("name", REPORTS)
+def test_ini_settings_match_report_settings(name: str) -> None:
+    # The harness replays a report from its .ini when it has one; both must describe the same run.
+    report, ini = parse_ini_settings(FIXTURES / REPORT_INIS[name])
+    settings = parse_report_settings(FIXTURES / name)
+    assert report == Path(name).stem
+    for field in ("expert", "symbol", "from_date", "to_date", "deposit"):
+        assert getattr(ini, field) == getattr(settings, field), field
+    assert settings_timeframe(ini) == settings_timeframe(settings) == "H1"
+    assert candidate_from_inputs(ini.inputs, ini.expert) == candidate_from_inputs(settings.inputs, settings.expert)
+    assert float(ini.inputs["InpLotSize"]) == float(settings.inputs["InpLotSize"])
+
+
+@pytest.mark.skipif(not PARITY_STORE_DIR, reason="set MT5_PARITY_STORE_DIR to a bar store with the reports' XAUUSD M1 history")
+@pytest.mark.parametrize("name", REPORTS)
+def test_replay_matches_saved_report(name: str) -> None:
+    resampled = ResampledStore(BarStore(Path(PARITY_STORE_DIR)))
+    _, settings = parse_ini_settings(FIXTURES / REPORT_INIS[name])
+    row = parity_row(resampled, FIXTURES / name, None, trade_tolerance=0, money_tolerance_pct=1.0, settings=settings)
+    assert row["status"] == "PASS", row
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import sqlite3
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from build_research_features import (
+    FEATURE_COLUMNS,
+    SESSION_STAT_COLUMNS,
+    build_full,
+    build_incremental,
+    read_features,
+    save_state,
+    verify_against_full,
+)
+from fake_mt5 import RATE_DTYPE
+from pull_mt5_m1_to_sqlite import insert_rates
+from research_db import add_missing_columns, bars_fingerprint, create_schema, write_frame_upsert
+from trading_calendar import calendar_for
+
+
+SYMBOL = "XAUUSD"
+FROM_DAY = dt.date(2024, 1, 2)
+TO_DAY = dt.date(2024, 3, 29)
+# The first build sees M1 up to mid-session of this day, so its last persisted day is partial.
+CUT = dt.datetime(2024, 2, 21, 13, 37, tzinfo=dt.UTC)
+
+
+def synthetic_rates(start: dt.datetime, end: dt.datetime) -> np.ndarray:
+    # One bar per expected minute: a random walk with varying volatility and spread.
+    ts = np.arange(int(start.timestamp()), int(end.timestamp()), 60, dtype=np.int64)
+    ts = ts[calendar_for(SYMBOL).is_expected(ts)]
+    rng = np.random.default_rng(11)
+    vol = np.repeat(rng.uniform(0.05, 0.6, len(ts) // 720 + 1), 720)[: len(ts)]
+    close = np.round(2000.0 + np.cumsum(rng.normal(0.0, 1.0, len(ts)) * vol), 2)
+    rates = np.zeros(len(ts), dtype=RATE_DTYPE)
+    rates["time"] = ts
+    rates["open"] = np.r_[close[0], close[:-1]]
+    rates["high"] = np.maximum(rates["open"], close) + np.round(rng.exponential(0.2, len(ts)), 2)
+    rates["low"] = np.minimum(rates["open"], close) - np.round(rng.exponential(0.2, len(ts)), 2)
+    rates["close"] = close
+    rates["tick_volume"] = rng.integers(1, 200, len(ts))
+    rates["spread"] = rng.integers(10, 60, len(ts))
+    return rates
+
+
+def persist(conn: sqlite3.Connection, features: pd.DataFrame, resume_day: Optional[dt.date]) -> None:
+    # What main() writes after a build.
+    save_state(conn, features, SYMBOL, replace=resume_day is None)
+    write_frame_upsert(conn, "feature_regime_daily", features[FEATURE_COLUMNS], keys=("symbol", "day"))
+
+
+def test_incremental_build_matches_full_rebuild(tmp_path: Path) -> None:
+    args = argparse.Namespace(symbol=SYMBOL, bar_store_dir="", dst_mode="ny", workers=1)
+    start = dt.datetime(FROM_DAY.year, FROM_DAY.month, FROM_DAY.day, tzinfo=dt.UTC)
+    end = dt.datetime(TO_DAY.year, TO_DAY.month, TO_DAY.day, tzinfo=dt.UTC) + dt.timedelta(days=1)
+    rates = synthetic_rates(start, end)
+    conn = sqlite3.connect(tmp_path / "bars.sqlite")
+    try:
+        create_schema(conn)
+        add_missing_columns(conn, "feature_regime_daily", [(c, "REAL") for c in SESSION_STAT_COLUMNS])
+
+        insert_rates(conn, SYMBOL, rates, start, CUT)
+        first = build_full(conn, args, FROM_DAY, TO_DAY)
+        persist(conn, first, None)
+
+        insert_rates(conn, SYMBOL, rates, CUT, end)
+        new, resume_day = build_incremental(conn, args, FROM_DAY, TO_DAY)
+        assert resume_day == CUT.date()
+        persist(conn, new, resume_day)
+
+        actual = read_features(conn, SYMBOL, FROM_DAY, TO_DAY)
+        expected = build_full(conn, args, FROM_DAY, TO_DAY)
+        expected["day"] = expected["day"].astype(str)
+        expected = expected[FEATURE_COLUMNS].reset_index(drop=True)
+        assert len(actual) == len(expected) > 60
+        # Only the days from the partial one on were rebuilt.
+        assert len(new) == len(expected) - len(first) + 1
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False, check_exact=True)
+        assert verify_against_full(conn, args, FROM_DAY, TO_DAY) == len(expected)
+    finally:
+        conn.close()
+
+
+def test_bars_fingerprint_sees_spread_and_real_volume_revisions(tmp_path: Path) -> None:
+    start = dt.datetime(2024, 1, 2, tzinfo=dt.UTC)
+    end = start + dt.timedelta(days=2)
+    rates = synthetic_rates(start, end)
+    conn = sqlite3.connect(tmp_path / "bars.sqlite")
+    try:
+        create_schema(conn)
+        insert_rates(conn, SYMBOL, rates, start, end)
+        seen = [bars_fingerprint(conn, SYMBOL, None, None)]
+        # Revisions that leave every price and tick volume alone.
+        for column in ("spread", "real_volume"):
+            rates[column][100] += 7
+            insert_rates(conn, SYMBOL, rates, start, end)
+            seen.append(bars_fingerprint(conn, SYMBOL, None, None))
+        assert seen[0] != seen[1] != seen[2]
+    finally:
+        conn.close()
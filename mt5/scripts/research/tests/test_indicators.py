@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+import indicators as ind
+from mql5_reference import GOLDEN_COLUMNS, golden_table, synthetic_rates
+
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+# Golden file -> leading bars skipped. The reference file is computed from its first bar, so all
+# of it compares; a terminal export (ExportIndicatorGolden.mq5) needs the CLI's 2000-bar warm-up.
+GOLDEN = {"indicator_golden_reference_XAUUSD_M15.csv": 0}
+REQUIRED = ("ema", "atr", "adx", "rsi", "dchu", "dchl", "atrpct")
+
+
+@pytest.mark.parametrize("name", sorted(GOLDEN))
+def test_indicators_match_golden_csv(name: str) -> None:
+    bars = ind.read_golden_csv(FIXTURES / name)
+    diffs = ind.golden_diffs(bars, GOLDEN[name], tolerance=1e-8)
+    assert {column.split("_")[0] for column, *_ in diffs} >= set(REQUIRED)
+    for column, diff, tol, compared in diffs:
+        assert compared > 0, column
+        assert diff <= tol, (column, diff, tol)
+
+
+def test_golden_fixture_is_current() -> None:
+    # The committed file is what mql5_reference.py writes; regenerate it there after changing either.
+    bars = ind.read_golden_csv(FIXTURES / "indicator_golden_reference_XAUUSD_M15.csv")
+    table = golden_table(synthetic_rates(len(bars["close"])))
+    for column in ("open", "high", "low", "close") + GOLDEN_COLUMNS:
+        assert bars[column] == pytest.approx(table[column], nan_ok=True, rel=1e-15), column
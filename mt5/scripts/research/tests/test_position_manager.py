@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import dataclasses
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pytest
+
+from bar_store import BarArrays
+from position_manager import EXIT_REASONS, ExitParams, PositionBook, exit_params_from_inputs, manage
+
+
+POINT = 0.01
+DIGITS = 2
+# Tuesday 2024-01-02 00:00 server time; minute k of a path is M1 bar k.
+DAY = 1704153600
+# Friday 2024-01-05 18:00, for paths that run into the Friday flat.
+FRIDAY_EVENING = 1704477600
+BE_TRAIL_PARTIAL = ExitParams(be_trigger_r=1.0, trail_start_r=1.5, trail_atr=1.0, partial_at_r=1.0, partial_pct=50.0)
+# The V1 EA with break-even at 1R and an ATR trail: H1 bars, SL moves only on their first tick, >= 2 points.
+V1 = exit_params_from_inputs({"InpBreakEvenAtR": "1.0", "InpATR_Trail_Mult": "1.0"})
+
+
+def m1_path(n: int, edits: Dict[int, Sequence[float]], base=2000.0, spread: int = 20, start: int = DAY) -> BarArrays:
+    # n flat bid bars at base (a scalar or one price per bar); edits replaces bar k's (open, high, low, close).
+    ohlc = np.repeat(np.broadcast_to(np.asarray(base, dtype=np.float64), (n,))[:, None], 4, axis=1).copy()
+    for k, row in edits.items():
+        ohlc[k] = row
+    return BarArrays(
+        start + 60 * np.arange(n, dtype=np.int64),
+        ohlc[:, 0],
+        ohlc[:, 1],
+        ohlc[:, 2],
+        ohlc[:, 3],
+        np.ones(n, np.int64),
+        np.full(n, spread, np.int32),
+        np.zeros(n, np.int64),
+    )
+
+
+def run(
+    m1: BarArrays,
+    direction: int,
+    entry: float,
+    sl: float,
+    tp: float,
+    params: ExitParams,
+    start: int = 0,
+    limit: Optional[int] = None,
+) -> PositionBook:
+    # One position with a flat ATR of 1.00, so R multiples and trail distances read off the prices.
+    book = PositionBook.open(m1, start, direction, entry, sl, tp, 1.0)
+    manage(book, m1, np.full(len(m1), 1.0), params, POINT, DIGITS, limit=limit)
+    return book
+
+
+def exit_of(book: PositionBook) -> Tuple[int, float, str]:
+    return int(book.exit_index[0]), round(float(book.exit_price[0]), 2), EXIT_REASONS[int(book.exit_reason[0])]
+
+
+def test_quiet_bars_leave_the_position_alone() -> None:
+    # No bar reaches SL, TP or 1R: the position stays open with its stop, resuming from the limit.
+    m1 = m1_path(50, {20: (2000.00, 2000.90, 1999.10, 2000.50)})
+    book = run(m1, 1, 2000.00, 1999.00, 2003.00, BE_TRAIL_PARTIAL)
+    assert exit_of(book) == (-1, 0.0, "open")
+    assert (float(book.sl[0]), int(book.start[0]), int(book.partial_index[0])) == (1999.00, 50, -1)
+
+
+def test_a_bar_touching_only_an_r_threshold_is_walked() -> None:
+    # Bar 10 closes where it opened but its high reaches 1.2R: break-even moves the stop to the
+    # entry, which bar 30's low then takes out. Skipping bar 10 as quiet would leave SL at 1999.00.
+    m1 = m1_path(50, {10: (2000.50, 2001.20, 2000.50, 2000.50), 30: (2000.50, 2000.50, 1999.50, 1999.80)}, base=2000.50)
+    params = ExitParams(be_trigger_r=1.0)
+    assert exit_of(run(m1, 1, 2000.00, 1999.00, 0.0, params)) == (30, 2000.00, "be")
+
+
+@pytest.mark.parametrize(
+    "bar, expected",
+    [
+        # Down bar, open-high-low-close: break-even at the high, then the low hits it.
+        ((2000.50, 2001.20, 1999.95, 2000.10), (1, 2000.00, "be")),
+        # Up bar, open-low-high-close: the low comes before break-even, so the position survives.
+        ((2000.10, 2001.20, 1999.95, 2000.50), (-1, 0.0, "open")),
+    ],
+)
+def test_stop_moves_follow_the_bar_path(bar: Tuple[float, ...], expected: Tuple[int, float, str]) -> None:
+    m1 = m1_path(3, {1: bar}, base=2000.50)
+    book = run(m1, 1, 2000.00, 1999.00, 0.0, ExitParams(be_trigger_r=1.0))
+    assert exit_of(book) == expected
+    assert float(book.sl[0]) == 2000.00
+
+
+def test_partial_then_break_even_then_trail_at_one_path_point() -> None:
+    # At bar 1's high (1.6R) the partial closes half, break-even lifts SL to 2000.00 and the trail
+    # (1.6R >= 1.5R) lifts it on to 2001.60 - 1.00 = 2000.60; the close at 1.5R trails no further.
+    # Bar 2's low reaches the trailed stop.
+    m1 = m1_path(
+        4,
+        {
+            1: (2000.00, 2001.60, 1999.90, 2001.50),
+            2: (2001.50, 2001.50, 2000.40, 2000.50),
+        },
+    )
+    book = run(m1, 1, 2000.00, 1999.00, 0.0, BE_TRAIL_PARTIAL)
+    assert exit_of(book) == (2, 2000.60, "trail")
+    assert (int(book.partial_index[0]), float(book.partial_price[0]), float(book.partial_volume[0])) == (1, 2001.60, 0.5)
+    assert float(book.volume[0]) == 0.5
+    assert book.profit(100.0)[0] == pytest.approx((1.60 * 0.5 + 0.60 * 0.5) * 100.0)
+
+
+def v1_path() -> BarArrays:
+    # Entry at bar 30 at 2000.00, then 2000.60 to the hour and 2001.00 after. Bar 31 reaches 1.5R
+    # mid-hour, bar 40 dips to 1999.60; bars 60 and 120 open hours 1 and 2 at 2001.50 and 2001.51;
+    # bar 121 falls to 2000.50.
+    base = np.r_[np.full(31, 2000.00), np.full(29, 2000.60), np.full(120, 2001.00)]
+    edits = {
+        31: (2000.60, 2001.50, 2000.60, 2000.60),
+        40: (2000.60, 2000.60, 1999.60, 2000.60),
+        60: (2001.50, 2001.50, 2001.00, 2001.00),
+        120: (2001.51, 2001.51, 2001.00, 2001.00),
+        121: (2001.00, 2001.00, 2000.50, 2000.60),
+    }
+    return m1_path(180, edits, base=base)
+
+
+def test_v1_moves_stops_on_new_h1_bars_only_and_by_two_points_or_more() -> None:
+    assert (V1.bar_seconds, V1.sl_on_new_bar, V1.min_sl_step_points, V1.trail_start_r) == (3600, True, 2.0, 1.0)
+    m1 = v1_path()
+    # The 1.5R of bar 31 waits for hour 1's first tick (SL 2000.50), so bar 40 does not stop it out.
+    # Hour 2's open would trail to 2000.51, one point up, which is not sent: bar 121 fills at 2000.50.
+    assert exit_of(run(m1, 1, 2000.00, 1999.00, 0.0, V1, start=30)) == (121, 2000.50, "trail")
+    every_tick = dataclasses.replace(V1, sl_on_new_bar=False)
+    assert exit_of(run(m1, 1, 2000.00, 1999.00, 0.0, every_tick, start=30)) == (40, 2000.50, "trail")
+    any_step = dataclasses.replace(V1, min_sl_step_points=0.0)
+    assert exit_of(run(m1, 1, 2000.00, 1999.00, 0.0, any_step, start=30)) == (121, 2000.51, "trail")
+
+
+def test_resuming_from_the_limit_keeps_the_moved_stop() -> None:
+    m1 = v1_path()
+    book = PositionBook.open(m1, 30, 1, 2000.00, 1999.00, 0.0, 1.0)
+    atr = np.full(len(m1), 1.0)
+    manage(book, m1, atr, V1, POINT, DIGITS, limit=100)
+    assert exit_of(book) == (-1, 0.0, "open")
+    assert (float(book.sl[0]), int(book.start[0])) == (2000.50, 100)
+    manage(book, m1, atr, V1, POINT, DIGITS)
+    assert exit_of(book) == (121, 2000.50, "trail")
+
+
+@pytest.mark.parametrize(
+    "bar, spread, expected",
+    [
+        # Short from the bid 2000.00, SL 2001.00, TP 1998.00; both are compared with the ask.
+        ((2000.00, 2000.85, 2000.00, 2000.00), 20, (1, 2001.00, "sl")),
+        ((2000.00, 2000.85, 2000.00, 2000.00), 10, (-1, 0.0, "open")),
+        ((2000.00, 2000.00, 1997.85, 2000.00), 20, (-1, 0.0, "open")),
+        ((2000.00, 2000.00, 1997.75, 2000.00), 20, (1, 1998.00, "tp")),
+        # An ask opening beyond the stop fills at that ask.
+        ((2001.50, 2001.50, 2001.00, 2001.00), 20, (1, 2001.70, "sl")),
+    ],
+)
+def test_short_levels_are_checked_against_the_ask(bar: Tuple[float, ...], spread: int, expected: Tuple[int, float, str]) -> None:
+    m1 = m1_path(3, {1: bar}, spread=spread)
+    assert exit_of(run(m1, -1, 2000.00, 2001.00, 1998.00, ExitParams())) == expected
+
+
+def test_short_closed_at_end_pays_the_spread() -> None:
+    m1 = m1_path(5, {}, spread=30)
+    book = PositionBook.open(m1, 0, -1, 2000.00, 2001.00, 1998.00, 1.0)
+    manage(book, m1, np.full(5, 1.0), ExitParams(), POINT, DIGITS, close_at_end=True)
+    assert exit_of(book) == (4, 2000.30, "end")
+
+
+def random_m1(n: int, seed: int) -> BarArrays:
+    rng = np.random.default_rng(seed)
+    close = np.round(2000.0 + np.cumsum(rng.normal(0.0, 0.3, n)), 2)
+    open_ = np.r_[close[0], close[:-1]]
+    return BarArrays(
+        FRIDAY_EVENING + 60 * np.arange(n, dtype=np.int64),
+        open_,
+        np.round(np.maximum(open_, close) + rng.exponential(0.1, n), 2),
+        np.round(np.minimum(open_, close) - rng.exponential(0.1, n), 2),
+        close,
+        np.ones(n, np.int64),
+        rng.integers(10, 40, n).astype(np.int32),
+        np.zeros(n, np.int64),
+    )
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        ExitParams(
+            be_trigger_r=1.0,
+            trail_start_r=1.2,
+            trail_atr=0.8,
+            partial_at_r=0.8,
+            partial_pct=50.0,
+            max_bars_in_trade=20,
+            bar_seconds=900,
+            friday_flat_minute=21 * 60 + 45,
+        ),
+        dataclasses.replace(V1, partial_at_r=0.8, partial_pct=50.0, max_bars_in_trade=6),
+    ],
+)
+def test_split_limits_equal_one_call(params: ExitParams) -> None:
+    # The backtester stops manage() at each decision bar and resumes it later; where it stops
+    # must not change any exit, stop, volume or partial.
+    n = 600
+    m1 = random_m1(n, 7)
+    rng = np.random.default_rng(8)
+    atr = rng.uniform(0.5, 1.5, n)
+    start = np.sort(rng.integers(0, 400, 60))
+    direction = rng.choice([-1, 1], 60)
+    entry = np.asarray(m1.open)[start] + np.where(direction > 0, np.asarray(m1.spread)[start] * POINT, 0.0)
+    risk = np.round(rng.uniform(0.5, 2.0, 60), 2)
+    sl = np.round(entry - direction * risk, 2)
+    tp = np.round(entry + direction * 3.0 * risk, 2)
+
+    def book() -> PositionBook:
+        return PositionBook.open(m1, start, direction, entry, sl, tp, 1.0)
+
+    whole = book()
+    manage(whole, m1, atr, params, POINT, DIGITS, close_at_end=True)
+    split = book()
+    for limit in [*np.sort(rng.choice(n, 8, replace=False)).tolist(), None]:
+        manage(split, m1, atr, params, POINT, DIGITS, limit=limit, close_at_end=limit is None)
+    # start is where a still-open position resumes, so it legitimately differs.
+    for field in dataclasses.fields(PositionBook):
+        if field.name != "start":
+            np.testing.assert_array_equal(getattr(split, field.name), getattr(whole, field.name), err_msg=field.name)
+    reasons = {EXIT_REASONS[r] for r in whole.exit_reason}
+    assert len(reasons) >= 3 and "open" not in reasons
+    assert (whole.partial_index >= 0).any()
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import datetime as dt
+
+import numpy as np
+
+from fake_mt5 import FakeMT5
+from pull_mt5_m1_to_sqlite import fetch_chunk, interleave_tasks, iter_fetched_chunks, plan_chunks
+from trading_calendar import calendar_for
+
+
+START = dt.date(2024, 3, 4)
+END = dt.date(2024, 4, 26)
+
+
+def fetched_times(parts) -> np.ndarray:
+    return np.concatenate([np.asarray(rates["time"]) for _, _, rates in parts if rates is not None])
+
+
+def test_plan_chunks_skips_weekends_and_respects_max_bars() -> None:
+    calendar = calendar_for("XAUUSD")
+    max_bars = 10000
+    chunks = plan_chunks(START, END, max_bars, calendar)
+    assert chunks[0][0] == dt.datetime(2024, 3, 4, tzinfo=dt.UTC)
+    assert chunks[-1][1] == dt.datetime(2024, 4, 27, tzinfo=dt.UTC)
+    for (_, prev_end), (next_start, _) in zip(chunks, chunks[1:]):
+        assert prev_end <= next_start
+    for chunk_start, chunk_end in chunks:
+        assert chunk_start.weekday() < 5
+        assert calendar.expected_minutes(int(chunk_start.timestamp()), int(chunk_end.timestamp())) <= max_bars
+
+
+def test_fetch_chunk_halves_refused_windows() -> None:
+    mt5 = FakeMT5(refuse_above=2000)
+    start = dt.datetime(2024, 3, 4, tzinfo=dt.UTC)
+    end = dt.datetime(2024, 3, 9, tzinfo=dt.UTC)
+    parts = fetch_chunk(mt5, "XAUUSD", start, end, max_bars=30000)
+    assert len(parts) > 1
+    assert parts[0][0] == start and parts[-1][1] == end
+    for (_, a_end, _), (b_start, _, _) in zip(parts, parts[1:]):
+        assert a_end == b_start
+    assert all(rates is not None for _, _, rates in parts)
+    np.testing.assert_array_equal(fetched_times(parts), mt5.minutes("XAUUSD", start, end))
+
+
+def test_fetch_chunk_splits_replies_truncated_at_max_bars() -> None:
+    mt5 = FakeMT5(cap=3000)
+    start = dt.datetime(2024, 3, 4, tzinfo=dt.UTC)
+    end = dt.datetime(2024, 3, 9, tzinfo=dt.UTC)
+    parts = fetch_chunk(mt5, "XAUUSD", start, end, max_bars=3000)
+    assert all(len(rates) < 3000 for _, _, rates in parts)
+    np.testing.assert_array_equal(fetched_times(parts), mt5.minutes("XAUUSD", start, end))
+
+
+def test_fetch_chunk_stops_splitting_at_one_day() -> None:
+    mt5 = FakeMT5(refuse_above=0)
+    start = dt.datetime(2024, 3, 4, tzinfo=dt.UTC)
+    parts = fetch_chunk(mt5, "XAUUSD", start, start + dt.timedelta(days=4), max_bars=30000)
+    assert [p[1] - p[0] for p in parts] == [dt.timedelta(days=1)] * 4
+    assert all(rates is None for _, _, rates in parts)
+
+
+def test_iter_fetched_chunks_covers_every_task_with_bounded_fan_out() -> None:
+    mt5 = FakeMT5(refuse_above=4000)
+    symbols = ("XAUUSD", "EURUSD")
+    plans = [(sym, plan_chunks(START, END, 6000, calendar_for(sym))) for sym in symbols]
+    tasks = interleave_tasks(plans)
+    assert [t[0] for t in tasks[:4]] == ["XAUUSD", "EURUSD", "XAUUSD", "EURUSD"]
+
+    workers = 3
+    got = {sym: [] for sym in symbols}
+    windows = 0
+    for symbol, parts in iter_fetched_chunks(mt5, tasks, workers, max_bars=6000):
+        windows += 1
+        got[symbol].extend(parts)
+    assert windows == len(tasks)
+    assert mt5.max_in_flight <= workers
+    for sym, chunks in plans:
+        parts = sorted(got[sym], key=lambda p: p[0])
+        expected = mt5.minutes(sym, chunks[0][0], chunks[-1][1])
+        np.testing.assert_array_equal(fetched_times(parts), expected)
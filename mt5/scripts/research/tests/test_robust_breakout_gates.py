@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import dataclasses
+import itertools
+from typing import Dict
+
+import numpy as np
+import pytest
+
+from robust_breakout_gates import (
+    COUNT_COLUMNS,
+    GATE_DIMS,
+    BreakoutParams,
+    composition,
+    decision_bars,
+    gate_codes,
+    grid_composition,
+)
+
+
+# Monday 2024-01-01 00:00 server time; the matrix is M15 bars over four weeks.
+START = 1704067200
+BARS = 4 * 7 * 96
+# Two or three values per gate dimension, including the disabling ones (no news window, no
+# ATR-to-price cap), so every stage of the tree both splits and passes bars through.
+GRID: Dict[str, list] = {
+    "news_block_before_min": [0, 45],
+    "news_block_after_min": [30, 90],
+    "adx_min": [15.0, 25.0],
+    "min_trend_slope_atr": [0.1, 0.3],
+    "max_atr_to_price_pct": [0.0, 0.3],
+    "max_atr_percentile": [60.0, 85.0],
+    "breakout_buffer_atr": [0.0, 0.2, 0.5],
+    "min_breakout_excess_atr": [0.0, 0.1],
+}
+BASE = BreakoutParams(session_start_hour=2, session_end_hour=22)
+
+
+def synthetic_matrix(seed: int = 5) -> Dict[str, np.ndarray]:
+    # Feature columns drawn so each gate rejects some bars: random-walk closes with Donchian edges
+    # within about an ATR of them, a few missing or zero values for the structural gates.
+    rng = np.random.default_rng(seed)
+    close = 2000.0 + np.cumsum(rng.normal(0.0, 2.0, BARS))
+    atr = rng.uniform(1.0, 4.0, BARS)
+    fast = close + rng.normal(0.0, 3.0, BARS)
+    slow = close + rng.normal(0.0, 3.0, BARS)
+    matrix = {
+        "time": START + 900 * np.arange(BARS, dtype=np.int64),
+        "close": close,
+        "atr": atr,
+        "ema_fast": fast,
+        "ema_slow": slow,
+        "donchian_high": close + rng.normal(0.0, 0.5, BARS) * atr,
+        "donchian_low": close + rng.normal(0.0, 0.5, BARS) * atr,
+        "adx": rng.uniform(10.0, 40.0, BARS),
+        "trend_slope": rng.uniform(0.0, 0.6, BARS),
+        "atr_to_price_pct": rng.uniform(0.05, 0.5, BARS),
+        "atr_percentile": rng.uniform(0.0, 100.0, BARS),
+    }
+    for name, value in (("atr", 0.0), ("adx", np.nan), ("donchian_low", np.nan), ("close", np.nan), ("atr_percentile", np.nan)):
+        matrix[name][rng.choice(BARS, 15, replace=False)] = value
+    tied = rng.choice(BARS, 15, replace=False)
+    matrix["ema_fast"][tied] = matrix["ema_slow"][tied]
+    return matrix
+
+
+def synthetic_bars(matrix: Dict[str, np.ndarray], seed: int = 6):
+    rng = np.random.default_rng(seed)
+    time = matrix["time"]
+    spread = rng.integers(100, 420, BARS).astype(np.float64)
+    news = np.sort(rng.choice(time, 60, replace=False) + rng.integers(-900, 900, 60))
+    return decision_bars(time, time, spread, int(time[0]), int(time[-1]) + 900, news)
+
+
+@pytest.mark.parametrize(
+    "base",
+    [
+        BASE,
+        dataclasses.replace(
+            BASE,
+            use_news_filter=False,
+            use_trend_slope_filter=False,
+            use_volatility_percentile_filter=False,
+            require_crossing_signal=False,
+        ),
+    ],
+)
+def test_grid_composition_equals_gate_codes_per_combination(base: BreakoutParams) -> None:
+    matrix = synthetic_matrix()
+    bars = synthetic_bars(matrix)
+    counts = grid_composition(matrix, bars, base, GRID)
+    assert counts.shape == tuple(len(GRID[dim]) for dim in GATE_DIMS) + (len(COUNT_COLUMNS),)
+    seen = np.zeros(len(COUNT_COLUMNS), dtype=np.int64)
+    for index in itertools.product(*(range(len(GRID[dim])) for dim in GATE_DIMS)):
+        p = dataclasses.replace(base, **{dim: GRID[dim][k] for dim, k in zip(GATE_DIMS, index)})
+        codes, _ = gate_codes(matrix, bars, p)
+        expected = composition(codes)
+        assert counts[index].tolist() == [expected[name] for name in COUNT_COLUMNS], p
+        seen += counts[index]
+    # Every stateless gate the base leaves on fired somewhere in the grid.
+    off = set() if base is BASE else {"r_news", "r_trend_slope", "r_vol_pctl", "r_no_cross"}
+    fired = {name for name, total in zip(COUNT_COLUMNS, seen) if total > 0}
+    assert fired >= {name for name in COUNT_COLUMNS if name not in off}
+    assert fired.isdisjoint(off)
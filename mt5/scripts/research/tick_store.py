@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import datetime as dt
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from common import ensure_dir
+
+
+# One compressed .npz per symbol/day. Prices are quantized to integer points and, like
+# time_msc, stored as first value + narrow-int deltas, which zlib then compresses well.
+TICK_FORMAT_VERSION = 1
+DAY_SUFFIX = ".ticks.npz"
+
+
+@dataclasses.dataclass
+class TickArrays:
+    time_msc: np.ndarray
+    bid: np.ndarray
+    ask: np.ndarray
+    flags: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.time_msc.shape[0])
+
+    @classmethod
+    def empty(cls) -> "TickArrays":
+        return cls(
+            time_msc=np.empty(0, dtype=np.int64),
+            bid=np.empty(0, dtype=np.float64),
+            ask=np.empty(0, dtype=np.float64),
+            flags=np.empty(0, dtype=np.uint32),
+        )
+
+    @classmethod
+    def from_ticks(cls, ticks) -> "TickArrays":
+        # Accepts the numpy record array returned by MetaTrader5.copy_ticks_range.
+        if ticks is None or len(ticks) == 0:
+            return cls.empty()
+        return cls(
+            time_msc=np.ascontiguousarray(ticks["time_msc"], dtype=np.int64),
+            bid=np.ascontiguousarray(ticks["bid"], dtype=np.float64),
+            ask=np.ascontiguousarray(ticks["ask"], dtype=np.float64),
+            flags=np.ascontiguousarray(ticks["flags"], dtype=np.uint32),
+        )
+
+    @classmethod
+    def concat(cls, parts: List["TickArrays"]) -> "TickArrays":
+        parts = [p for p in parts if len(p) > 0]
+        if not parts:
+            return cls.empty()
+        if len(parts) == 1:
+            return parts[0]
+        return cls(
+            **{f.name: np.concatenate([getattr(p, f.name) for p in parts]) for f in dataclasses.fields(cls)}
+        )
+
+    def slice(self, start: int, stop: int) -> "TickArrays":
+        return TickArrays(**{f.name: getattr(self, f.name)[start:stop] for f in dataclasses.fields(self)})
+
+    def between_msc(self, start_msc: int, end_msc: int) -> "TickArrays":
+        lo = int(np.searchsorted(self.time_msc, start_msc, side="left"))
+        hi = int(np.searchsorted(self.time_msc, end_msc, side="left"))
+        return self.slice(lo, hi)
+
+    def spread_points(self, digits: int) -> np.ndarray:
+        return np.rint((self.ask - self.bid) * 10**digits).astype(np.int64)
+
+
+def narrow_int(values: np.ndarray) -> np.ndarray:
+    # Smallest signed dtype that holds every value; deltas of sorted ticks are mostly tiny.
+    if values.size == 0:
+        return values.astype(np.int8)
+    lo, hi = int(values.min()), int(values.max())
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return values.astype(dtype)
+    return values.astype(np.int64)
+
+
+def delta_encode(values: np.ndarray) -> np.ndarray:
+    out = np.empty_like(values)
+    if values.size:
+        out[0] = 0
+        np.subtract(values[1:], values[:-1], out=out[1:])
+    return narrow_int(out)
+
+
+def delta_decode(first: int, deltas: np.ndarray) -> np.ndarray:
+    out = np.cumsum(deltas, dtype=np.int64)
+    out += first
+    return out
+
+
+def encode_day(ticks: TickArrays, digits: int) -> Dict[str, np.ndarray]:
+    scale = 10**digits
+    bid_q = np.rint(ticks.bid * scale).astype(np.int64)
+    ask_q = np.rint(ticks.ask * scale).astype(np.int64)
+    first = np.array(
+        [
+            ticks.time_msc[0] if len(ticks) else 0,
+            bid_q[0] if len(ticks) else 0,
+            ask_q[0] if len(ticks) else 0,
+        ],
+        dtype=np.int64,
+    )
+    return {
+        "meta": np.array([TICK_FORMAT_VERSION, digits, len(ticks)], dtype=np.int64),
+        "first": first,
+        "time_msc": delta_encode(ticks.time_msc),
+        "bid": delta_encode(bid_q),
+        # ask is stored relative to bid: the quantized spread varies far less than the price.
+        "spread": narrow_int(ask_q - bid_q),
+        "flags": narrow_int(ticks.flags.astype(np.int64)),
+    }
+
+
+def decode_day(arrays: Dict[str, np.ndarray]) -> TickArrays:
+    version, digits, rows = (int(x) for x in arrays["meta"])
+    if version != TICK_FORMAT_VERSION:
+        raise ValueError(f"Unsupported tick format version {version}")
+    if rows == 0:
+        return TickArrays.empty()
+    first = arrays["first"]
+    scale = float(10**digits)
+    bid_q = delta_decode(int(first[1]), arrays["bid"])
+    # Dividing the exact integer point count reproduces the broker's decimal price bit-for-bit.
+    return TickArrays(
+        time_msc=delta_decode(int(first[0]), arrays["time_msc"]),
+        bid=bid_q / scale,
+        ask=(bid_q + arrays["spread"]) / scale,
+        flags=arrays["flags"].astype(np.uint32),
+    )
+
+
+def day_start_ms(day: dt.date) -> int:
+    return int(dt.datetime(day.year, day.month, day.day, tzinfo=dt.UTC).timestamp()) * 1000
+
+
+class TickStore:
+    # root/SYMBOL/ticks/YYYY/YYYY-MM-DD.ticks.npz; each day file is replaced as a whole.
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+
+    def symbol_dir(self, symbol: str) -> Path:
+        return self.root / symbol / "ticks"
+
+    def day_path(self, symbol: str, day: dt.date) -> Path:
+        return self.symbol_dir(symbol) / f"{day.year:04d}" / f"{day.isoformat()}{DAY_SUFFIX}"
+
+    def days(self, symbol: str) -> List[dt.date]:
+        sdir = self.symbol_dir(symbol)
+        if not sdir.exists():
+            return []
+        out: List[dt.date] = []
+        for p in sdir.glob(f"*/*{DAY_SUFFIX}"):
+            try:
+                out.append(dt.date.fromisoformat(p.name[: -len(DAY_SUFFIX)]))
+            except ValueError:
+                continue
+        return sorted(out)
+
+    def write_day(self, symbol: str, day: dt.date, ticks: TickArrays, digits: int) -> int:
+        if len(ticks) > 1 and np.any(np.diff(ticks.time_msc) < 0):
+            order = np.argsort(ticks.time_msc, kind="stable")
+            ticks = TickArrays(**{f.name: getattr(ticks, f.name)[order] for f in dataclasses.fields(ticks)})
+        ticks = ticks.between_msc(day_start_ms(day), day_start_ms(day + dt.timedelta(days=1)))
+        path = self.day_path(symbol, day)
+        ensure_dir(path.parent)
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez_compressed(tmp, **encode_day(ticks, digits))
+        os.replace(tmp, path)
+        return len(ticks)
+
+    def read_day(self, symbol: str, day: dt.date) -> TickArrays:
+        path = self.day_path(symbol, day)
+        if not path.exists():
+            return TickArrays.empty()
+        with np.load(path) as npz:
+            return decode_day({name: npz[name] for name in npz.files})
+
+    def iter_ticks(
+        self,
+        symbol: str,
+        from_date: dt.date,
+        to_date: dt.date,
+        batch_size: Optional[int] = None,
+    ) -> Iterator[TickArrays]:
+        # Streams one decoded day at a time (optionally in batch_size slices), so peak memory
+        # is bounded by the busiest single day rather than the requested range.
+        for day in self.days(symbol):
+            if day < from_date or day > to_date:
+                continue
+            ticks = self.read_day(symbol, day)
+            if not batch_size:
+                if len(ticks):
+                    yield ticks
+                continue
+            for i in range(0, len(ticks), batch_size):
+                yield ticks.slice(i, i + batch_size)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Daily tick/spread summary from the compressed tick store.")
+    parser.add_argument("--store-dir", required=True)
+    parser.add_argument("--symbol", default="XAUUSD")
+    parser.add_argument("--from-date", default="2021-01-01")
+    parser.add_argument("--to-date", default="2025-12-31")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    store = TickStore(Path(args.store_dir))
+    from_day = dt.date.fromisoformat(args.from_date)
+    to_day = dt.date.fromisoformat(args.to_date)
+    print("day,ticks,spread_mean_pts,spread_p95_pts,spread_max_pts,file_bytes")
+    for day in store.days(args.symbol):
+        if day < from_day or day > to_day:
+            continue
+        path = store.day_path(args.symbol, day)
+        with np.load(path) as npz:
+            digits = int(npz["meta"][1])
+            ticks = decode_day({name: npz[name] for name in npz.files})
+        if len(ticks) == 0:
+            print(f"{day},0,,,,{path.stat().st_size}")
+            continue
+        spread = ticks.spread_points(digits)
+        print(
+            f"{day},{len(ticks)},{spread.mean():.2f},{np.percentile(spread, 95):.0f},"
+            f"{spread.max()},{path.stat().st_size}"
+        )
+
+
+if __name__ == "__main__":
+    main()
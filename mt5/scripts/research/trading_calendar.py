@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+from typing import Dict, List, Set, Tuple, Union
+
+import numpy as np
+
+
+MINUTES_PER_DAY = 1440
+BYTES_PER_DAY = MINUTES_PER_DAY // 8
+
+# Session buckets by broker-server hour, as used for the daily session_bucket feature.
+SESSION_NAMES: Tuple[str, ...] = ("ASIA", "LONDON", "NEWYORK", "OFFHOURS")
+SESSION_ASIA, SESSION_LONDON, SESSION_NEWYORK, SESSION_OFFHOURS = range(4)
+SESSION_BY_HOUR = np.array(
+    [SESSION_ASIA] * 9 + [SESSION_LONDON] * 7 + [SESSION_NEWYORK] * 7 + [SESSION_OFFHOURS],
+    dtype=np.uint8,
+)
+
+# "ny":    server clock follows US DST (GMT+2/GMT+3), so the schedule is constant in server time.
+# "fixed": server clock never shifts, so the whole schedule moves one hour earlier during US DST.
+DST_MODES = ("ny", "fixed")
+
+
+def easter_sunday(year: int) -> dt.date:
+    # Anonymous Gregorian algorithm.
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return dt.date(year, month, day + 1)
+
+
+def nth_weekday(year: int, month: int, weekday: int, n: int) -> dt.date:
+    first = dt.date(year, month, 1)
+    return first + dt.timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+
+
+def us_dst_active(day: dt.date) -> bool:
+    # Second Sunday of March through the day before the first Sunday of November, at day resolution.
+    return nth_weekday(day.year, 3, 6, 2) <= day < nth_weekday(day.year, 11, 6, 1)
+
+
+def epoch_day(d: dt.date) -> int:
+    return (d - dt.date(1970, 1, 1)).days
+
+
+class TradingCalendar:
+    # Broker-server-time schedule for one symbol with a precomputed bitmap of expected M1 minutes.
+    # The daily break straddles midnight, so each trading day is one [open_minute, close_minute) window.
+    def __init__(
+        self,
+        symbol: str = "XAUUSD",
+        dst_mode: str = "ny",
+        open_minute: int = 65,
+        close_minute: int = 23 * 60 + 55,
+        trading_weekdays: Tuple[int, ...] = (0, 1, 2, 3, 4),
+        fixed_holidays: Tuple[Tuple[int, int], ...] = ((12, 25), (1, 1)),
+        good_friday: bool = True,
+    ) -> None:
+        if dst_mode not in DST_MODES:
+            raise ValueError(f"Unknown DST mode {dst_mode!r}; expected one of {DST_MODES}.")
+        self.symbol = symbol
+        self.dst_mode = dst_mode
+        self.open_minute = open_minute
+        self.close_minute = close_minute
+        self.trading_weekdays = frozenset(trading_weekdays)
+        self.fixed_holidays = frozenset(fixed_holidays)
+        self.good_friday = good_friday
+        self._first_year = 0
+        self._first_day = 0
+        self._bits = np.zeros((0, BYTES_PER_DAY), dtype=np.uint8)
+        self._day_minutes = np.zeros(0, dtype=np.int16)
+
+    def shift_minutes(self, day: dt.date) -> int:
+        return -60 if self.dst_mode == "fixed" and us_dst_active(day) else 0
+
+    def is_holiday(self, day: dt.date) -> bool:
+        if (day.month, day.day) in self.fixed_holidays:
+            return True
+        return self.good_friday and day == easter_sunday(day.year) - dt.timedelta(days=2)
+
+    def is_trading_day(self, day: dt.date) -> bool:
+        return day.weekday() in self.trading_weekdays and not self.is_holiday(day)
+
+    def day_mask(self, day: dt.date) -> np.ndarray:
+        mask = np.zeros(MINUTES_PER_DAY, dtype=bool)
+        if self.is_trading_day(day):
+            shift = self.shift_minutes(day)
+            lo = min(max(self.open_minute + shift, 0), MINUTES_PER_DAY)
+            hi = min(max(self.close_minute + shift, 0), MINUTES_PER_DAY)
+            mask[lo:hi] = True
+        return mask
+
+    def _ensure_days(self, lo_day: int, hi_day: int) -> None:
+        # Bitmap covers whole calendar years; it is rebuilt (rarely) when a query falls outside it.
+        if len(self._day_minutes) and lo_day >= self._first_day and hi_day < self._first_day + len(self._day_minutes):
+            return
+        epoch = dt.date(1970, 1, 1)
+        years = [(epoch + dt.timedelta(days=int(x))).year for x in (lo_day, hi_day)]
+        if len(self._day_minutes):
+            years += [self._first_year, (epoch + dt.timedelta(days=self._first_day + len(self._day_minutes) - 1)).year]
+        first, last = dt.date(min(years), 1, 1), dt.date(max(years), 12, 31)
+        days = [first + dt.timedelta(days=i) for i in range((last - first).days + 1)]
+        masks = np.stack([self.day_mask(d) for d in days])
+        self._first_year = first.year
+        self._first_day = epoch_day(first)
+        self._bits = np.packbits(masks, axis=1)
+        self._day_minutes = masks.sum(axis=1).astype(np.int16)
+
+    def bitmap(self, from_day: dt.date, to_day: dt.date) -> np.ndarray:
+        # Packed (days, 180) uint8 view: bit m of row d is set when minute m of that server day should have a bar.
+        lo, hi = epoch_day(from_day), epoch_day(to_day)
+        self._ensure_days(lo, hi)
+        return self._bits[lo - self._first_day : hi - self._first_day + 1]
+
+    def is_expected(self, ts: Union[int, np.ndarray]) -> Union[bool, np.ndarray]:
+        arr = np.asarray(ts, dtype=np.int64)
+        if arr.size == 0:
+            return np.zeros(arr.shape, dtype=bool)
+        days = arr // 86400
+        self._ensure_days(int(days.min()), int(days.max()))
+        minute = (arr % 86400) // 60
+        byte = self._bits[days - self._first_day, minute >> 3]
+        hit = (byte >> (7 - (minute & 7)).astype(np.uint8)) & 1
+        return bool(hit) if arr.ndim == 0 else hit.astype(bool)
+
+    def expected_minutes(self, from_ts: int, to_ts: int) -> int:
+        # Expected M1 bars in [from_ts, to_ts); whole days use the cached per-day counts.
+        if to_ts <= from_ts:
+            return 0
+        first_day, last_day = from_ts // 86400, (to_ts - 1) // 86400
+        self._ensure_days(first_day, last_day)
+        rows = slice(first_day - self._first_day, last_day - self._first_day + 1)
+        total = int(self._day_minutes[rows].sum(dtype=np.int64))
+        head = (from_ts % 86400 + 59) // 60
+        tail = -(-(to_ts - last_day * 86400) // 60)
+        if head:
+            total -= int(np.unpackbits(self._bits[rows.start])[:head].sum())
+        if tail < MINUTES_PER_DAY:
+            total -= int(np.unpackbits(self._bits[rows.stop - 1])[tail:].sum())
+        return total
+
+    def trading_days(self, start: dt.date, end: dt.date) -> List[dt.date]:
+        if end < start:
+            return []
+        lo, hi = epoch_day(start), epoch_day(end)
+        self._ensure_days(lo, hi)
+        open_idx = np.flatnonzero(self._day_minutes[lo - self._first_day : hi - self._first_day + 1] > 0)
+        return [start + dt.timedelta(days=int(i)) for i in open_idx]
+
+    def session_codes(self, ts: np.ndarray) -> np.ndarray:
+        # uint8 session code per timestamp through a 24-entry hour lookup; DST-shifted in "fixed" mode.
+        arr = np.asarray(ts, dtype=np.int64)
+        if self.dst_mode == "fixed" and arr.size:
+            arr = arr + 3600 * np.isin(arr // 86400, self._dst_days(arr))
+        return SESSION_BY_HOUR[(arr % 86400) // 3600]
+
+    def _dst_days(self, arr: np.ndarray) -> np.ndarray:
+        days = np.unique(arr // 86400)
+        epoch = dt.date(1970, 1, 1)
+        return np.array([d for d in days if us_dst_active(epoch + dt.timedelta(days=int(d)))], dtype=np.int64)
+
+    def classify_gap(self, gap_start: int, gap_end: int) -> Tuple[str, int]:
+        # gap_start/gap_end are the last bar before and the first bar after the hole.
+        # Returns the closure kind and the number of expected minutes that are actually missing.
+        missing = self.expected_minutes(gap_start + 60, gap_end)
+        if missing > 0:
+            return "missing", missing
+        first = dt.datetime.fromtimestamp(gap_start + 60, dt.UTC).date()
+        last = dt.datetime.fromtimestamp(gap_end - 60, dt.UTC).date()
+        days = [first + dt.timedelta(days=i) for i in range((last - first).days + 1)]
+        if any(d.weekday() not in self.trading_weekdays for d in days):
+            return "weekend", 0
+        if any(self.is_holiday(d) for d in days):
+            return "holiday", 0
+        return "daily_break", 0
+
+
+_CALENDARS: Dict[Tuple[str, str], TradingCalendar] = {}
+
+
+def calendar_for(symbol: str, dst_mode: str = "ny") -> TradingCalendar:
+    # XAUUSD hours are used for every symbol until another schedule is needed.
+    key = (symbol, dst_mode)
+    if key not in _CALENDARS:
+        _CALENDARS[key] = TradingCalendar(symbol=symbol, dst_mode=dst_mode)
+    return _CALENDARS[key]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Print the expected trading schedule for a symbol.")
+    parser.add_argument("--symbol", default="XAUUSD")
+    parser.add_argument("--from-date", default="2021-01-01")
+    parser.add_argument("--to-date", default="2025-12-31")
+    parser.add_argument("--dst-mode", choices=DST_MODES, default="ny")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    cal = calendar_for(args.symbol, args.dst_mode)
+    start = dt.date.fromisoformat(args.from_date)
+    end = dt.date.fromisoformat(args.to_date)
+    days = cal.trading_days(start, end)
+    holidays: Set[dt.date] = {
+        start + dt.timedelta(days=i)
+        for i in range((end - start).days + 1)
+        if cal.is_holiday(start + dt.timedelta(days=i))
+        and (start + dt.timedelta(days=i)).weekday() in cal.trading_weekdays
+    }
+    from_ts = epoch_day(start) * 86400
+    to_ts = (epoch_day(end) + 1) * 86400
+    print(f"{args.symbol} ({args.dst_mode}) {start} -> {end}")
+    print(f"Trading days: {len(days)}")
+    print(f"Expected M1 bars: {cal.expected_minutes(from_ts, to_ts)}")
+    print(f"Weekday holidays: {', '.join(str(d) for d in sorted(holidays)) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,14 +7,17 @@ import argparse
 import csv
 import json
 import re
+import sys
+from calendar import timegm
 from collections import Counter, defaultdict
 from dataclasses import dataclass, asdict
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
 
 PROFIT_RE = re.compile(r"profit=([-+]?\d+(?:\.\d+)?)")
+RESEARCH_SCRIPTS_DIR = Path(__file__).resolve().parents[1] / "mt5" / "scripts" / "research"
 
 
 @dataclass
@@ -50,6 +53,12 @@ def parse_args() -> argparse.Namespace:
         default="outputs/trade_log_analysis",
         help="Output prefix for JSON/CSV artifacts (default: outputs/trade_log_analysis).",
     )
+    parser.add_argument(
+        "--regime-labels",
+        default="",
+        help="Optional regime_labels_<SYMBOL>_<TF>.npz from mt5/scripts/research/regime_labels.py; "
+        "adds per-label trade metrics (requires numpy).",
+    )
     return parser.parse_args()
 
 
@@ -93,6 +102,34 @@ def is_late_regime(ts: datetime) -> bool:
     return datetime(2025, 11, 1, 0, 0, 0) <= ts <= datetime(2026, 2, 28, 23, 59, 59)
 
 
+def regime_label_metrics(labels_path: Path, deals: List[Tuple[datetime, float]]) -> Dict[str, object]:
+    # Buckets closed deals by the regime labels in force when each deal closed. The import is
+    # deferred (it needs numpy) and appended to sys.path so it cannot shadow stdlib or
+    # site-packages modules; the rest of the script stays stdlib-only.
+    if str(RESEARCH_SCRIPTS_DIR) not in sys.path:
+        sys.path.append(str(RESEARCH_SCRIPTS_DIR))
+    try:
+        from regime_labels import RegimeLabels
+    except ImportError as exc:
+        raise RuntimeError(f"--regime-labels needs numpy and {RESEARCH_SCRIPTS_DIR / 'regime_labels.py'}") from exc
+    labels = RegimeLabels.load(labels_path)
+    # Log timestamps are broker server time, the same clock the labels are keyed on.
+    stamps = [timegm(ts.timetuple()) for ts, _ in deals]
+    per_deal = labels.labels_at(stamps)
+    metrics: Dict[str, Dict[str, TradeBucket]] = {dim: defaultdict(TradeBucket) for dim in per_deal}
+    for dim, names in per_deal.items():
+        for name, (_, profit) in zip(names, deals):
+            metrics[dim][str(name)].update(profit)
+    return {
+        "labels_path": str(labels_path),
+        "timeframe": labels.timeframe,
+        "by_label": {
+            dim: {name: bucket_to_payload(bucket) for name, bucket in sorted(buckets.items())}
+            for dim, buckets in metrics.items()
+        },
+    }
+
+
 def ensure_output_parent(prefix: Path) -> None:
     prefix.parent.mkdir(parents=True, exist_ok=True)
 
@@ -167,6 +204,7 @@ def main() -> int:
     late = TradeBucket()
     gate_rows: List[Dict[str, str]] = []
     regime_rows: List[Dict[str, str]] = []
+    deals: List[Tuple[datetime, float]] = []
 
     with log_path.open("r", encoding="utf-8-sig", newline="") as handle:
         reader = csv.DictReader(handle, delimiter=";")
@@ -197,6 +235,7 @@ def main() -> int:
                 continue
 
             overall.update(profit)
+            deals.append((timestamp, profit))
             month_key = timestamp.strftime("%Y-%m")
             monthly[month_key].update(profit)
 
@@ -229,6 +268,8 @@ def main() -> int:
         "regime_stats_rows": len(regime_rows),
         "regime_stats_latest": latest_regime,
     }
+    if args.regime_labels:
+        payload["regime_label_metrics"] = regime_label_metrics(Path(args.regime_labels), deals)
 
     prefix = Path(args.output_prefix)
     ensure_output_parent(prefix)
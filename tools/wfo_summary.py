@@ -26,6 +26,8 @@ class ReportMetrics:
     trades: int | None
     net_profit: float | None
     pf_degradation_from_best_is_pct: float | None = None
+    # Set by cost_model.py stress reports: PF lost against the same candidate's cost-free Python run.
+    pf_degradation_from_base_pct: float | None = None
 
 
 def parse_args() -> argparse.Namespace:
@@ -82,12 +84,37 @@ def classify_split(path: Path) -> str:
     return "unknown"
 
 
+def parse_tagged_report(path: Path, split: str, root: ET.Element) -> ReportMetrics:
+    # <mt5_report> files carry one element per metric: the trade-log fallback written by
+    # run_mt5_backtest.ps1 and the offline cost-model stress runs (cost_model.py).
+    def value(tag: str) -> float | None:
+        node = root.find(tag)
+        if node is None or node.text is None:
+            return None
+        if node.text.strip().upper() == "INF":
+            return float("inf")
+        return normalize_number(node.text.strip())
+
+    trades_val = value("trades")
+    return ReportMetrics(
+        path=str(path),
+        split=split,
+        profit_factor=value("profit_factor"),
+        drawdown_pct=value("drawdown_pct"),
+        trades=int(trades_val) if trades_val is not None else None,
+        net_profit=value("net_profit"),
+        pf_degradation_from_base_pct=value("pf_degradation_pct"),
+    )
+
+
 def parse_report(path: Path) -> ReportMetrics:
     split = classify_split(path)
     text = ""
 
     try:
         root = ET.parse(path).getroot()
+        if root.tag == "mt5_report":
+            return parse_tagged_report(path, split, root)
         text = " ".join(fragment.strip() for fragment in root.itertext() if fragment and fragment.strip())
     except ET.ParseError:
         # Keep text empty, resulting fields become None.
@@ -203,10 +230,11 @@ def check_acceptance(metrics: list[ReportMetrics], args: argparse.Namespace) ->
             if m.net_profit is not None and m.net_profit <= 0:
                 stress_pass = False
                 break
-            if (
-                m.pf_degradation_from_best_is_pct is not None
-                and m.pf_degradation_from_best_is_pct > args.stress_pf_degrade_max_pct
-            ):
+            # A Python stress run is judged against its own base run, not the terminal's IS reports.
+            degrade = m.pf_degradation_from_base_pct
+            if degrade is None:
+                degrade = m.pf_degradation_from_best_is_pct
+            if degrade is not None and degrade > args.stress_pf_degrade_max_pct:
                 stress_pass = False
                 break
 
@@ -240,6 +268,7 @@ def write_csv(path: Path, metrics: list[ReportMetrics]) -> None:
                 "trades",
                 "net_profit",
                 "pf_degradation_from_best_is_pct",
+                "pf_degradation_from_base_pct",
             ],
         )
         writer.writeheader()